@@ -1,4 +1,5 @@
 import json
+import asyncio
 import socket
 import argparse
 from typing import Dict, Tuple, Optional, Any, List
@@ -49,4 +50,29 @@ def send_http_request(addr: Address, method, path, data: Any) -> Any:
     if len(parts) < 2:
         return {}
 
-    return json.loads(parts[1])
\ No newline at end of file
+    return json.loads(parts[1])
+
+async def async_send_http_request(addr: Address, method, path, data: Any, timeout: float = 5) -> Any:
+    reader, writer = await asyncio.wait_for(asyncio.open_connection(*addr), timeout)
+
+    try:
+        body = json.dumps(data) if data else ""
+        request = "{} {} HTTP/1.1\r\n".format(method, path)
+        request += f"Host: {addr[0]}:{addr[1]}\r\n"
+        request += "Content-Type: application/json\r\n"
+        request += f"Content-Length: {len(body.encode())}\r\n"
+        request += "Connection: close\r\n"
+        request += f"\r\n{body}"
+
+        writer.write(request.encode())
+        await writer.drain()
+
+        res = await asyncio.wait_for(reader.read(), timeout)
+    finally:
+        writer.close()
+
+    parts = res.decode('utf-8').split('\r\n\r\n', 1)
+    if len(parts) < 2 or not parts[1]:
+        return {}
+
+    return json.loads(parts[1])
@@ -0,0 +1,650 @@
+#
+# Copyright (C) 2025 pdnguyen of HCMC University of Technology VNU-HCM.
+# All rights reserved.
+# This file is part of the CO3093/CO3094 course.
+#
+# WeApRous release
+#
+# The authors hereby grant to Licensee personal permission to use
+# and modify the Licensed Source Code for the sole purpose of studying
+# while attending the course
+#
+
+"""
+daemon.asyncproxy
+~~~~~~~~~~~~~~~~~
+
+This module provides an asyncio engine for the proxy, built on
+:func:`asyncio.start_server`. Client and backend sockets are served
+non-blockingly by one event loop: a proxied connection waiting on a slow
+backend costs a suspended coroutine and two sockets instead of a thread, so a
+single process holds tens of thousands of them. With ``workers=N``, see
+:func:`create_proxy <daemon.proxy.create_proxy>`, each of N pre-forked
+processes runs its own loop on the shared port.
+
+Requests are routed exactly as by the thread engine, with
+:func:`resolve_routing_policy <daemon.proxy.resolve_routing_policy>` over the
+same balancers and health checks, and relayed the same way: the request body
+is streamed to the backend while its response is awaited, so an early answer
+stops the upload, and the response body is streamed back to the client with
+``drain()`` back-pressure. Backend connections are kept alive in a per-loop
+:class:`AsyncUpstreamPool`.
+
+Requirements:
+--------------
+- asyncio: event loop and streams.
+- framing: incremental request and response framing.
+- proxy: routing, header rewriting and balancers shared with the thread engine.
+- upstream: the pool settings and errors of the thread engine.
+
+Usage Example:
+--------------
+>>> run_proxy_async("0.0.0.0", 8080, {"app1.local": ("127.0.0.1:9001", "round-robin")})
+
+"""
+
+import asyncio
+import collections
+import select
+import time
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+from .framing import (RequestFramer, ResponseFramer, BodyFramer, FramingError, RECV_SIZE,
+                      UNTIL_CLOSE, CONTINUE)
+from .proxy import (parse_head, rewrite_head, build_routes, resolve_routing_policy,
+                    start_health_checks, gateway_error, NOT_FOUND, MAX_BODY_SIZE)
+from .response import Response
+from .upstream import (UpstreamError, DownstreamError, MAX_IDLE, IDLE_TIMEOUT,
+                       CONNECT_TIMEOUT, READ_TIMEOUT, IDEMPOTENT_METHODS)
+from .log import get_logger, DEBUG
+
+log = get_logger(__name__)
+
+#: Listen backlog used by the asyncio proxy.
+BACKLOG = 4096
+#: Connections open to a backend, idle or in use; they cost no thread here.
+MAX_CONNECTIONS = 10240
+#: Seconds a client may take to send the request head.
+HEAD_TIMEOUT = 30.0
+
+
+class AsyncUpstreamConnection:
+    """
+    One keep-alive connection to a backend, served by the event loop.
+
+    :param reader (asyncio.StreamReader): backend input stream.
+    :param writer (asyncio.StreamWriter): backend output stream.
+
+    :attrs requests (int): requests completed on the connection.
+    :attrs received (int): bytes received for the current request.
+    :attrs idle_since (float): monotonic time the connection became idle.
+    :attrs interrupted (bool): the last request was not sent or its response
+        not read in full, so the connection cannot be reused.
+    """
+
+    __slots__ = ("reader", "writer", "framer", "requests", "received", "idle_since",
+                 "interrupted")
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.framer = ResponseFramer()
+        self.requests = 0
+        self.received = 0
+        self.idle_since = None
+        self.interrupted = False
+
+    def is_usable(self):
+        """
+        :rtype bool: ``True`` if the backend has not closed the idle connection.
+        """
+        return not (self.reader.at_eof() or self.writer.is_closing())
+
+    async def send_request(self, head, data, body, client, method, timeout):
+        """
+        Sends a request, relays its body from the client while the response
+        is awaited, and reads the response head. A backend answering before
+        the whole body is sent stops the upload.
+
+        :param head (bytes): request header block.
+        :param data (bytes): body bytes received with the head.
+        :param body (BodyFramer): framing of the body, already fed with ``data``.
+        :param client (asyncio.StreamReader): client input stream.
+        :param method (str): request method.
+        :param timeout (float): seconds the backend may stay silent.
+
+        :rtype tuple: ``(head, length)`` of the response.
+
+        :raises OSError: If the connection fails.
+        :raises asyncio.TimeoutError: If the backend stays silent.
+        :raises FramingError: If the response head is malformed.
+        :raises DownstreamError: If the client fails, closes mid-body or
+            sends a malformed body.
+        """
+        self.received = 0
+        self.interrupted = True
+        self.framer.method = method
+        self.writer.write(head + data if data else head)
+        if body.done:
+            await self.writer.drain()
+            response = await self.read_head(timeout)
+            self.interrupted = False
+            return response
+
+        upload = asyncio.ensure_future(self._upload(body, client))
+        answer = asyncio.ensure_future(self.read_head(None))
+        try:
+            pending = {upload, answer}
+            while answer in pending:
+                # The backend may stay silent while the body arrives, not after
+                done, pending = await asyncio.wait(
+                    pending, timeout=None if upload in pending else timeout,
+                    return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    raise asyncio.TimeoutError()
+                if upload in done and isinstance(upload.exception(), DownstreamError):
+                    raise upload.exception()
+                # Otherwise the backend stopped reading the body, e.g. after
+                # answering early: the answer, or its absence, tells
+            response = answer.result()
+        finally:
+            for task in (upload, answer):
+                if not task.done():
+                    task.cancel()
+                elif not task.cancelled():
+                    # Retrieved, so a second failure is not reported as lost
+                    task.exception()
+        # After an early answer the rest of the body was not sent
+        self.interrupted = not (upload.done() and not upload.cancelled()
+                                and upload.exception() is None and body.done)
+        return response
+
+    async def _upload(self, body, client):
+        """Relays the request body from the client to the backend."""
+        poller = select.poll()
+        poller.register(self.writer.get_extra_info("socket"), select.POLLIN)
+        while not body.done:
+            try:
+                data = await client.read(RECV_SIZE)
+            except OSError as e:
+                raise DownstreamError("client failed mid-request: {}".format(e)) from e
+            if not data:
+                raise DownstreamError("client closed mid-request")
+            if self.received or poller.poll(0):
+                # Early answer: writing on could reset the connection, and
+                # the transport would drop the answer with it
+                return
+            try:
+                take = body.feed(data)
+            except FramingError as e:
+                raise DownstreamError("invalid request body: {}".format(e)) from e
+            self.writer.write(data[:take] if take < len(data) else data)
+            await self.writer.drain()
+
+    async def read_head(self, timeout):
+        """
+        Reads the head of the response, skipping interim ``1xx`` responses.
+
+        :param timeout (float): seconds the backend may stay silent, ``None``
+            for no limit.
+
+        :rtype tuple: ``(head, length)``, ``length`` as for
+            :class:`BodyFramer <BodyFramer>`.
+        """
+        framer = self.framer
+        while True:
+            message = framer.next_head()
+            if message is not None:
+                return message
+            data = await asyncio.wait_for(self.reader.read(RECV_SIZE), timeout)
+            if not data:
+                raise FramingError("connection closed before the response")
+            self.received += len(data)
+            framer.feed(data)
+
+    async def relay_body(self, length, client, timeout):
+        """
+        Passes the response body on to the client as it arrives, unchanged.
+
+        :param length (int): body length from :meth:`read_head`.
+        :param client (asyncio.StreamWriter): client output stream.
+        :param timeout (float): seconds the backend may stay silent.
+
+        :rtype int: body bytes relayed.
+
+        :raises OSError: If the backend connection fails.
+        :raises asyncio.TimeoutError: If the backend stays silent.
+        :raises FramingError: If the backend closed the connection mid-body.
+        :raises DownstreamError: If the client fails.
+        """
+        body = BodyFramer(length)
+        buffered = self.framer.buffer
+        if buffered and not body.done:
+            # Body bytes received along with the head
+            n = body.feed(buffered)
+            await _deliver(client, bytes(buffered[:n]))
+            del buffered[:n]
+        while not body.done:
+            data = await asyncio.wait_for(self.reader.read(RECV_SIZE), timeout)
+            if not data:
+                if length != UNTIL_CLOSE:
+                    raise FramingError("connection closed mid-response")
+                break
+            self.received += len(data)
+            take = body.feed(data)
+            await _deliver(client, data if take == len(data) else data[:take])
+            if take < len(data):
+                # Bytes after the response: the connection is not reused
+                buffered += data[take:]
+        self.requests += 1
+        return body.received
+
+    def reusable(self):
+        """
+        :rtype bool: ``True`` if the last response left the connection open
+            with nothing else buffered.
+        """
+        return (not self.interrupted and self.framer.keep_alive
+                and not self.framer.in_progress())
+
+    def close(self):
+        self.writer.close()
+
+
+async def _deliver(client, data):
+    """Sends relayed bytes to the client, telling its failures apart."""
+    try:
+        client.write(data)
+        await client.drain()
+    except OSError as e:
+        raise DownstreamError("client failed mid-response: {}".format(e)) from e
+
+
+class AsyncUpstreamPool:
+    """
+    The connections of one event loop to one backend. Like
+    :class:`UpstreamPool <UpstreamPool>`, without locks: it is only used from
+    its loop.
+
+    :param address (tuple): backend ``(host, port)``.
+    :param max_idle (int): idle connections kept for reuse.
+    :param max_connections (int): connections open at once, idle or in use;
+        further requests wait for one to be released.
+    :param idle_timeout (float): seconds an idle connection is kept.
+    :param connect_timeout (float): seconds allowed to connect.
+    :param timeout (float): seconds the backend may stay silent mid-response.
+    """
+
+    __attrs__ = [
+        "address",
+        "max_idle",
+        "max_connections",
+        "idle_timeout",
+        "connect_timeout",
+        "timeout",
+        "created",
+        "reused",
+    ]
+
+    def __init__(self, address, max_idle=MAX_IDLE, max_connections=MAX_CONNECTIONS,
+                 idle_timeout=IDLE_TIMEOUT, connect_timeout=CONNECT_TIMEOUT,
+                 timeout=READ_TIMEOUT):
+        self.address = address
+        self.max_idle = max_idle
+        self.max_connections = max_connections
+        self.idle_timeout = idle_timeout
+        self.connect_timeout = connect_timeout
+        self.timeout = timeout
+        #: Connections opened so far.
+        self.created = 0
+        #: Requests sent on an already used connection.
+        self.reused = 0
+        # Idle connections, the most recently released last
+        self._idle = collections.deque()
+        self._open = 0
+        # Futures of the requests waiting for a connection slot
+        self._waiters = collections.deque()
+
+    async def acquire(self, fresh=False):
+        """
+        Takes an idle usable connection, or opens a new one.
+
+        :param fresh (bool): always open a new connection.
+
+        :rtype AsyncUpstreamConnection: a connection for one request.
+
+        :raises UpstreamError: If ``max_connections`` are busy for ``timeout``
+            seconds.
+        :raises OSError: If the backend cannot be reached.
+        """
+        deadline = None
+        while True:
+            while self._idle and not fresh:
+                conn = self._idle.pop()
+                if time.monotonic() - conn.idle_since < self.idle_timeout and conn.is_usable():
+                    self.reused += 1
+                    return conn
+                self._discard(conn)
+            if self._open < self.max_connections:
+                break
+            if deadline is None:
+                deadline = time.monotonic() + self.timeout
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await asyncio.wait_for(waiter, deadline - time.monotonic())
+            except asyncio.TimeoutError:
+                raise UpstreamError("all {} connections to {}:{} are busy".format(
+                    self.max_connections, *self.address)) from None
+            finally:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+
+        self._open += 1
+        self.created += 1
+        try:
+            reader, writer = await asyncio.wait_for(
+                asyncio.open_connection(*self.address, limit=RECV_SIZE), self.connect_timeout)
+        except BaseException:
+            self._open -= 1
+            self._wake()
+            raise
+        return AsyncUpstreamConnection(reader, writer)
+
+    def release(self, conn, reusable):
+        """
+        Returns a connection after its request.
+
+        :param conn (AsyncUpstreamConnection): connection from :meth:`acquire`.
+        :param reusable (bool): ``False`` closes it, e.g. after an error.
+        """
+        now = time.monotonic()
+        if reusable and len(self._idle) < self.max_idle:
+            conn.idle_since = now
+            self._idle.append(conn)
+        else:
+            self._discard(conn)
+        # Close connections idle for too long, the oldest first
+        while self._idle and now - self._idle[0].idle_since >= self.idle_timeout:
+            self._discard(self._idle.popleft())
+        self._wake()
+
+    def _discard(self, conn):
+        """Closes a connection taken out of the pool."""
+        conn.close()
+        self._open -= 1
+
+    def _wake(self):
+        """Hands a free slot or idle connection to the oldest waiting request."""
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+
+    async def start_exchange(self, head, data, body, client, method):
+        """
+        Sends a request on a pooled connection, relaying its body from the
+        client, and reads the response head; see
+        :meth:`UpstreamPool.start_exchange <UpstreamPool.start_exchange>`.
+
+        :rtype tuple: ``(conn, head, length)``.
+        """
+        replayable = body.done
+        fresh = False
+        while True:
+            conn = await self.acquire(fresh)
+            try:
+                response_head, length = await conn.send_request(
+                    head, data, body, client, method, self.timeout)
+            except DownstreamError:
+                self.release(conn, False)
+                raise
+            except (OSError, asyncio.TimeoutError, FramingError):
+                self.release(conn, False)
+                # A reused connection closed by the backend meanwhile
+                if (replayable and not fresh and conn.requests and not conn.received
+                        and method in IDEMPOTENT_METHODS):
+                    log.debug("retry on new connection", backend="{}:{}".format(*self.address))
+                    fresh = True
+                    continue
+                raise
+            except BaseException:
+                self.release(conn, False)
+                raise
+            return conn, response_head, length
+
+
+class AsyncUpstreamPools:
+    """
+    One :class:`AsyncUpstreamPool` per backend address, created on first use.
+
+    :param options: :class:`AsyncUpstreamPool` settings shared by every pool.
+    """
+
+    __attrs__ = [
+        "options",
+    ]
+
+    def __init__(self, **options):
+        self.options = options
+        self._pools = {}
+
+    def get(self, address):
+        """
+        :param address (tuple): backend ``(host, port)``.
+
+        :rtype AsyncUpstreamPool: the pool of the backend.
+        """
+        pool = self._pools.get(address)
+        if pool is None:
+            pool = self._pools[address] = AsyncUpstreamPool(address, **self.options)
+        return pool
+
+
+async def relay(reader, writer, host, port, head, framer, length, method, pools,
+                fail_open=False):
+    """
+    Relays a request to a backend and its response back to the client,
+    streaming both bodies; the asyncio counterpart of
+    :func:`relay <daemon.proxy.relay>`.
+
+    :param reader (asyncio.StreamReader): client input stream, past the head.
+    :param writer (asyncio.StreamWriter): client output stream.
+    :param host (str): IP address of the backend server.
+    :param port (int): port number of the backend server.
+    :param head (bytes): request header block to send.
+    :param framer (RequestFramer): framer of the client, holding the body
+        bytes received with the head.
+    :param length (int): request body length, ``None`` when chunked.
+    :param method (str): request method.
+    :param pools (AsyncUpstreamPools): backend connection pools.
+    :param fail_open (bool): the backend was chosen while every upstream is
+        down.
+
+    :raises OSError: If the backend cannot be reached or fails. The client
+        is sent :func:`gateway_error <daemon.proxy.gateway_error>` when
+        nothing was relayed to it yet.
+    :raises asyncio.TimeoutError: If the backend stays silent.
+    :raises FramingError: If the response is malformed.
+    :raises DownstreamError: If the client fails, leaves or sends a malformed
+        body.
+    """
+    pool = pools.get((host, port))
+    body = BodyFramer(length, MAX_BODY_SIZE)
+    pending = framer.buffer
+    try:
+        data = bytes(pending[:body.feed(pending)])
+    except FramingError as e:
+        raise DownstreamError("invalid request body: {}".format(e)) from e
+    del pending[:len(data)]
+
+    try:
+        upstream, response_head, response_length = await pool.start_exchange(
+            head, data, body, reader, method)
+    except (OSError, asyncio.TimeoutError, FramingError) as e:
+        if not isinstance(e, DownstreamError):
+            writer.write(gateway_error(e, fail_open))
+        raise
+
+    reusable = False
+    try:
+        status_line, headers = parse_head(response_head)
+        await _deliver(writer, rewrite_head(status_line, headers, 'close'))
+        await upstream.relay_body(response_length, writer, pool.timeout)
+        reusable = upstream.reusable()
+    finally:
+        pool.release(upstream, reusable)
+
+
+async def handle_connection(reader, writer, routes, pools):
+    """
+    Serves one client connection: reads the request head, routes it with
+    :func:`resolve_routing_policy <daemon.proxy.resolve_routing_policy>`
+    and relays the exchange. The client is closed after the response, as by
+    :func:`handle_client <daemon.proxy.handle_client>`.
+
+    :param reader (asyncio.StreamReader): client input stream.
+    :param writer (asyncio.StreamWriter): client output stream.
+    :param routes (dict): hostname -> balancer, see
+        :func:`build_routes <daemon.proxy.build_routes>`.
+    :param pools (AsyncUpstreamPools): backend connection pools.
+    """
+    addr = writer.get_extra_info("peername")
+    framer = RequestFramer(max_body_size=MAX_BODY_SIZE, spool_size=None)
+    try:
+        while True:
+            message = framer.next_head()
+            if message is not None:
+                break
+            data = await asyncio.wait_for(reader.read(RECV_SIZE), HEAD_TIMEOUT)
+            if not data:
+                if framer.in_progress():
+                    raise FramingError("connection closed mid-request")
+                return
+            framer.feed(data)
+        if framer.continue_needed():
+            writer.write(CONTINUE)
+    except FramingError as e:
+        writer.write(Response().build_error(e.status))
+        writer.close()
+        return
+    except (asyncio.TimeoutError, ConnectionError):
+        writer.close()
+        return
+
+    head, length = message
+    request_line, headers = parse_head(head)
+    # 100 Continue was answered above
+    headers.pop('Expect', None)
+    hostname = headers.get('Host', '')
+
+    balancer, upstream = resolve_routing_policy(hostname, routes, addr[0], headers)
+    if upstream is None:
+        writer.write(NOT_FOUND)
+        writer.close()
+        return
+
+    if log.enabled(DEBUG):
+        log.debug("forward", client=addr, host=hostname, backend=str(upstream))
+    failed = True
+    try:
+        await relay(reader, writer, upstream.host, upstream.port,
+                    rewrite_head(request_line, headers, 'keep-alive'), framer, length,
+                    request_line.split(' ', 1)[0], pools, fail_open=not upstream.up)
+        failed = False
+    except DownstreamError as e:
+        failed = False
+        if isinstance(e.__cause__, FramingError):
+            # Malformed or oversized body: answered before any response byte
+            writer.write(Response().build_error(e.__cause__.status))
+        log.debug("client gone", client=addr, error=str(e))
+    except UpstreamError as e:
+        # Every connection to the backend is busy, it did not fail
+        failed = False
+        log.warning("backend busy", backend=str(upstream), error=str(e))
+    except (OSError, asyncio.TimeoutError, FramingError) as e:
+        log.error("backend unreachable", backend=str(upstream), error=str(e) or type(e).__name__)
+    finally:
+        # A failure counts towards ejecting the upstream
+        balancer.release(upstream, failed)
+        writer.close()
+
+
+def raise_fd_limit():
+    """
+    Raises the soft limit of open files to the hard limit: every proxied
+    connection holds two sockets.
+
+    :rtype int: the limit now in force, ``None`` where it cannot be read.
+    """
+    if resource is None:
+        return None
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft != hard:
+        try:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+            soft = hard
+        except (ValueError, OSError):
+            pass
+    return soft
+
+
+async def serve_proxy_async(ip, port, routes, server=None, health_checker=None,
+                            **upstream_options):
+    """
+    Runs the asyncio proxy until cancelled.
+
+    :param ip (str): IP address to bind the proxy server.
+    :param port (int): port number to listen on.
+    :param routes (dict): hostname -> ``(proxy_pass, dist_policy[, health_check])``
+        or balancer.
+    :param server (socket.socket, optional): An already listening socket.
+    :param health_checker (HealthChecker, optional): shared checker of a
+        pre-fork master to follow, see :func:`start_health_checks
+        <daemon.proxy.start_health_checks>`.
+    :param upstream_options: :class:`AsyncUpstreamPool` settings.
+    """
+    routes = build_routes(routes)
+    start_health_checks(routes, health_checker)
+    pools = AsyncUpstreamPools(**upstream_options)
+
+    def client_connected(reader, writer):
+        return handle_connection(reader, writer, routes, pools)
+
+    if server is None:
+        srv = await asyncio.start_server(client_connected, ip, port, limit=RECV_SIZE,
+                                         backlog=BACKLOG, reuse_address=True)
+    else:
+        srv = await asyncio.start_server(client_connected, sock=server, limit=RECV_SIZE,
+                                         backlog=BACKLOG)
+
+    log.info("listening", engine="proxy-asyncio", ip=ip, port=port, max_files=raise_fd_limit())
+    async with srv:
+        await srv.serve_forever()
+
+
+def run_proxy_async(ip, port, routes, server=None, health_checker=None, **upstream_options):
+    """
+    Starts the proxy server in asyncio mode.
+
+    :param ip (str): IP address to bind the proxy server.
+    :param port (int): port number to listen on.
+    :param routes (dict): hostname -> ``(proxy_pass, dist_policy[, health_check])``.
+    :param server (socket.socket, optional): An already listening socket, e.g.
+        inherited from a pre-fork master. Defaults to binding a new one.
+    :param health_checker (HealthChecker, optional): shared checker of a
+        pre-fork master to follow. Defaults to probing from this process.
+    :param upstream_options: backend connection pool settings (``max_idle``,
+        ``max_connections``, ``idle_timeout``, ``connect_timeout``,
+        ``timeout``), see :class:`AsyncUpstreamPool`.
+    """
+    try:
+        asyncio.run(serve_proxy_async(ip, port, routes, server, health_checker,
+                                      **upstream_options))
+    except OSError as e:
+        log.error("socket error", port=port, error=str(e))
@@ -0,0 +1,200 @@
+#
+# Copyright (C) 2025 pdnguyen of HCMC University of Technology VNU-HCM.
+# All rights reserved.
+# This file is part of the CO3093/CO3094 course.
+#
+# WeApRous release
+#
+# The authors hereby grant to Licensee personal permission to use
+# and modify the Licensed Source Code for the sole purpose of studying
+# while attending the course
+#
+
+"""
+daemon.asyncserver
+~~~~~~~~~~~~~~~~~
+
+This module provides an asyncio serving engine for the backend daemon, built on
+:func:`asyncio.start_server`. Every connection is a coroutine; ``async def``
+route handlers are awaited on the loop, so a handler waiting on outbound peer
+requests costs a suspended coroutine instead of a blocked thread. Plain route
+handlers keep working: they are run in a thread pool executor.
+
+Requirements:
+--------------
+- asyncio: event loop, streams and executors.
+- framing: incremental request framing.
+- httpadapter: the class for handling HTTP requests.
+
+Usage Example:
+--------------
+>>> run_backend_async("127.0.0.1", 9000, routes={})
+
+"""
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .httpadapter import HttpAdapter
+from .response import Response
+from .framing import RequestFramer, FramingError, RECV_SIZE, CONTINUE
+from . import metrics
+from .log import get_logger
+from . import streaming
+
+log = get_logger(__name__)
+
+#: Listen backlog used by the asyncio engine.
+BACKLOG = 1024
+
+
+async def send_file(writer, file_body):
+    """
+    Streams a static file body with ``loop.sendfile`` (``os.sendfile`` when
+    the transport supports it).
+
+    :param writer (asyncio.StreamWriter): client output stream.
+    :param file_body (tuple): ``(filepath, offset, count)`` from the response.
+
+    :rtype int: bytes sent.
+    """
+    filepath, offset, count = file_body
+    with open(filepath, "rb") as file:
+        return await asyncio.get_running_loop().sendfile(writer.transport, file, offset, count)
+
+
+async def send_stream(writer, stream_body, executor=None):
+    """
+    Sends a handler stream chunk by chunk, draining the writer after each one
+    so a slow client suspends the producer instead of buffering the body.
+
+    :param writer (asyncio.StreamWriter): client output stream.
+    :param stream_body (tuple): ``(chunks, chunked)`` from the response.
+    :param executor (Executor): Executor producing the chunks of a sync
+        iterator, as for sync route handlers.
+
+    :rtype int: bytes sent.
+    """
+    sent = 0
+    async for data in streaming.aiter_wire(*stream_body, executor=executor):
+        writer.write(data)
+        await writer.drain()
+        sent += len(data)
+    return sent
+
+
+async def handle_connection(reader, writer, ip, port, routes, executor=None):
+    """
+    Serves one client connection until it is closed or idles out.
+
+    Connections are persistent like in :meth:`HttpAdapter.handle_client`.
+
+    :param reader (asyncio.StreamReader): client input stream.
+    :param writer (asyncio.StreamWriter): client output stream.
+    :param ip (str): IP address of the server.
+    :param port (int): Port number the server is listening on.
+    :param routes (dict): Dictionary of route handlers.
+    :param executor (Executor): Executor for sync route handlers.
+    """
+    addr = writer.get_extra_info("peername")
+    framer = RequestFramer(HttpAdapter.max_header_size, HttpAdapter.max_body_size,
+                            HttpAdapter.spool_size)
+    served = 0
+    metrics.CONNECTIONS.inc()
+    metrics.ACTIVE_CONNECTIONS.inc()
+
+    try:
+        while True:
+            message = framer.next_message()
+            if message is None:
+                if framer.continue_needed():
+                    writer.write(CONTINUE)
+                data = await asyncio.wait_for(reader.read(RECV_SIZE),
+                                              HttpAdapter.keepalive_timeout)
+                if not data:
+                    break
+                metrics.RECEIVED_BYTES.inc(len(data))
+                framer.feed(data)
+                continue
+
+            served += 1
+            metrics.observe_stage("recv", time.monotonic() - framer.received_at)
+            adapter = HttpAdapter(ip, port, None, addr, routes)
+            response = await adapter.handle_request_async(
+                message, routes,
+                keep_alive=served < HttpAdapter.max_requests, executor=executor)
+
+            start = time.perf_counter()
+            writer.write(response)
+            await writer.drain()
+            sent = len(response)
+            if adapter.response.file_body is not None:
+                sent += await send_file(writer, adapter.response.file_body)
+            elif adapter.response.stream_body is not None:
+                sent += await send_stream(writer, adapter.response.stream_body, executor)
+            metrics.SENT_BYTES.inc(sent)
+            metrics.observe_stage("send", time.perf_counter() - start)
+            if not adapter.request.keep_alive:
+                break
+    except FramingError as e:
+        writer.write(Response().build_error(e.status))
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+    except (asyncio.TimeoutError, ConnectionError):
+        pass
+    finally:
+        metrics.ACTIVE_CONNECTIONS.dec()
+        writer.close()
+
+
+async def serve_async(ip, port, routes, server=None, executor_workers=None):
+    """
+    Runs the asyncio server until cancelled.
+
+    :param ip (str): IP address to bind the server.
+    :param port (int): Port number to listen on.
+    :param routes (dict): Dictionary of route handlers.
+    :param server (socket.socket, optional): An already listening socket.
+    :param executor_workers (int, optional): Threads running sync route handlers.
+    """
+    executor = ThreadPoolExecutor(max_workers=executor_workers,
+                                  thread_name_prefix="Backend-sync")
+
+    def client_connected(reader, writer):
+        return handle_connection(reader, writer, ip, port, routes, executor)
+
+    if server is None:
+        srv = await asyncio.start_server(client_connected, ip, port,
+                                         backlog=BACKLOG, reuse_address=True)
+    else:
+        srv = await asyncio.start_server(client_connected, sock=server, backlog=BACKLOG)
+
+    log.info("listening", engine="asyncio", port=port)
+    if routes != {}:
+        log.info("routes", routes=sorted(routes))
+
+    try:
+        async with srv:
+            await srv.serve_forever()
+    finally:
+        executor.shutdown(wait=False)
+
+
+def run_backend_async(ip, port, routes, server=None, executor_workers=None):
+    """
+    Starts the backend server in asyncio mode.
+
+    :param ip (str): IP address to bind the server.
+    :param port (int): Port number to listen on.
+    :param routes (dict): Dictionary of route handlers.
+    :param server (socket.socket, optional): An already listening socket, e.g.
+        inherited from a pre-fork master. Defaults to binding a new one.
+    :param executor_workers (int, optional): Threads running sync route handlers.
+    """
+    try:
+        asyncio.run(serve_async(ip, port, routes, server, executor_workers))
+    except OSError as e:
+        log.error("socket error", port=port, error=str(e))
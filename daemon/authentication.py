@@ -1,42 +1,176 @@
+#
+# Copyright (C) 2025 pdnguyen of HCMC University of Technology VNU-HCM.
+# All rights reserved.
+# This file is part of the CO3093/CO3094 course.
+#
+# WeApRous release
+#
+# The authors hereby grant to Licensee personal permission to use
+# and modify the Licensed Source Code for the sole purpose of studying
+# while attending the course
+#
+
+"""
+daemon.authentication
+~~~~~~~~~~~~~~~~~
+
+This module provides the credential store behind ``/login``. The credential
+file (``username:password`` lines) is read on first use and again only when its
+mtime changes, checked at most once per :data:`CHECK_INTERVAL`. Passwords are
+kept as salted HMAC verifiers in a dict indexed by user name, so a login is a
+dict lookup and a constant-time digest comparison. Successful logins open a
+session in a :class:`SessionTable <SessionTable>`.
+
+Usage Example:
+--------------
+>>> auth = Authentication("static/database/auth_table.txt")
+>>> session = auth.login({"username": "admin", "password": "password"})
+>>> auth.user(session.sid)
+'admin'
+
+"""
+
+import hashlib
+import hmac
+import os
+import threading
+import time
+from urllib.parse import parse_qsl
+
+from .log import get_logger
+from .session import SessionTable
+
+log = get_logger(__name__)
+
+#: Default credential file, relative to the working directory.
+AUTH_TABLE = "static/database/auth_table.txt"
+#: Seconds between two mtime checks of the credential file.
+CHECK_INTERVAL = 1.0
+
+
 class Authentication():
+    """
+    A credential store reloaded when its file changes, with the session table
+    of the logged in clients.
+
+    :param filepath (str): credential file of ``username:password`` lines.
+    :param check_interval (float): seconds during which the file is not
+        checked for changes again.
+    :param sessions (SessionTable): session table, a new one by default.
+    """
+
     __attrs__ = [
-            "auth_table"
+            "filepath",
+            "check_interval",
+            "sessions",
     ]
 
-    def __init__(self, filepath="static/database/auth_table.txt"):
-        file = open(filepath, "r")
-        content = file.read()
-        lines = content.split("\n")
-        self.auth_table = {}
+    def __init__(self, filepath=AUTH_TABLE, check_interval=CHECK_INTERVAL, sessions=None):
+        self.filepath = filepath
+        self.check_interval = check_interval
+        self.sessions = SessionTable() if sessions is None else sessions
+        # Per-process key of the password verifiers
+        self._salt = os.urandom(16)
+        self._verifiers = {}
+        self._mtime_ns = None
+        self._checked = None
+        self._lock = threading.Lock()
+
+    def _verifier(self, password):
+        """Salted digest stored instead of the password."""
+        return hmac.new(self._salt, password.encode('utf-8'), hashlib.sha256).digest()
+
+    def reload(self):
+        """
+        Re-reads the credential file if its mtime changed since the last load.
+        A file that cannot be read keeps the previous credentials.
 
-        for line in lines:
-            split_line = line.split(":")
-            if(len(split_line) == 2):
-                [key, value] = split_line
-                self.auth_table[key] = value
+        :rtype bool: ``True`` if the credentials were reloaded.
+        """
+        with self._lock:
+            self._checked = time.monotonic()
+            try:
+                mtime_ns = os.stat(self.filepath).st_mtime_ns
+                if mtime_ns == self._mtime_ns:
+                    return False
+                with open(self.filepath, "r") as file:
+                    lines = file.read().split("\n")
+            except OSError as e:
+                log.error("credentials unreadable", path=self.filepath, error=str(e))
+                return False
 
-        print(self.auth_table)
+            verifiers = {}
+            for line in lines:
+                split_line = line.split(":")
+                if(len(split_line) == 2):
+                    [key, value] = split_line
+                    verifiers[key] = self._verifier(value)
+
+            self._verifiers = verifiers
+            self._mtime_ns = mtime_ns
+        log.info("credentials loaded", path=self.filepath, count=len(verifiers))
+        return True
+
+    def verify(self, username, password):
+        """
+        Checks a username and password against the credential file.
+
+        :param username (str): user name.
+        :param password (str): password.
+
+        :rtype bool: ``True`` if they match.
+        """
+        if self._checked is None or time.monotonic() - self._checked >= self.check_interval:
+            self.reload()
+        expected = self._verifiers.get(username)
+        if expected is None:
+            return False
+        return hmac.compare_digest(expected, self._verifier(password))
 
     def authenticate(self, body):
-        body_arr = body.split('&')
-        body_dict = {}
-
-        for line in body_arr:
-            split_line = line.split('=')
-            if len(split_line) == 2:
-                [key, value] = split_line 
-                body_dict[key] = value
-
-        username = body_dict["username"]
-        password = body_dict["password"]
-        print(username + ":" + password)
-        if(self.auth_table.get(username, '') == password):
-            return True
-        else: 
+        """
+        Checks login credentials.
+
+        :param body (dict | str): parsed form fields (see :attr:`Request.form`)
+            or a raw ``username=...&password=...`` body.
+
+        :rtype bool: ``True`` if the username and password match.
+        """
+        body_dict = dict(parse_qsl(body)) if isinstance(body, str) else body
+
+        username = body_dict.get("username")
+        password = body_dict.get("password")
+        if username is None or password is None:
             return False
+        return self.verify(username, password)
+
+    def login(self, body):
+        """
+        Checks login credentials and opens a session when they match.
+
+        :param body (dict | str): form fields, see :meth:`authenticate`.
+
+        :rtype Session: the new session, or ``None`` if the login failed.
+        """
+        if not self.authenticate(body):
+            return None
+        body_dict = dict(parse_qsl(body)) if isinstance(body, str) else body
+        return self.sessions.create(body_dict["username"])
+
+    def user(self, sid):
+        """
+        Validates a session identifier without any file access.
+
+        :param sid (str): identifier from the session cookie.
+
+        :rtype str: the logged in user, or ``None`` for an unknown or expired
+            session.
+        """
+        session = self.sessions.get(sid)
+        return None if session is None else session.username
 
 
 if __name__ == "__main__":
     auth = Authentication("../static/database/auth_table.txt")
 
-    auth.authenticate("username=admin&password=password")
+    print(auth.authenticate("username=admin&password=password"))
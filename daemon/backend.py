@@ -23,16 +23,28 @@ Requirements:
 --------------
 - socket: provide socket networking interface.
 - threading: Enables concurrent client handling via threads.
+- workerpool: bounded worker threads with 503 load shedding.
 - response: response utilities.
 - httpadapter: the class for handling HTTP requests.
+- eventloop: the selectors based serving engine.
+- asyncserver: the asyncio serving engine.
+- prefork: multi-process supervisor sharing the listening port.
+- router: compiled routing table with typed path parameters.
+- staticcache: in-memory cache of static files.
+- authentication: credential store and session table behind ``/login``.
 - CaseInsensitiveDict: provides dictionary for managing headers or routes.
 
 
 Notes:
 ------
-- The server create daemon threads for client handling.
+- Client handling runs on a bounded pool of daemon worker threads; idle
+  persistent connections wait on the pool's watcher thread, not on a worker.
 - The current implementation error handling is minimal, socket errors are printed to the console.
 - The actual request processing is delegated to the HttpAdapter class.
+- ``create_backend(..., mode="eventloop")`` serves every connection from a
+  single selector loop instead of one thread per connection.
+- ``create_backend(..., mode="asyncio")`` awaits ``async def`` route handlers.
+- ``create_backend(..., workers=N)`` forks N worker processes sharing the port.
 
 Usage Example:
 --------------
@@ -46,7 +58,19 @@ import argparse
 
 from .response import *
 from .httpadapter import HttpAdapter
+from .request import Request
+from .authentication import Authentication, AUTH_TABLE
+from .session import SessionTable, SESSION_TTL
+from .eventloop import run_backend_eventloop
+from .asyncserver import run_backend_async
+from .prefork import run_prefork
+from .router import Router
+from .staticcache import StaticCache
+from .workerpool import WorkerPool, MAX_WORKERS, QUEUE_SIZE, QUEUE_TIMEOUT
 from .dictionary import CaseInsensitiveDict
+from .log import get_logger, configure as configure_logging
+
+log = get_logger(__name__)
 
 def handle_client(ip, port, conn, addr, routes):
     """
@@ -57,53 +81,125 @@ def handle_client(ip, port, conn, addr, routes):
     :param conn (socket.socket): Client connection socket.
     :param addr (tuple): client address (IP, port).
     :param routes (dict): Dictionary of route handlers.
+
+    :rtype tuple: ``(resume, close)`` of the idle persistent connection handed
+        back to the :class:`WorkerPool`, or ``None`` once it is closed.
     """
     daemon = HttpAdapter(ip, port, conn, addr, routes)
 
-    # Handle client
-    daemon.handle_client(conn, addr, routes)
+    # Handle client, the pool watches it between requests
+    return daemon.handle_client(conn, addr, routes, park=True)
 
-def run_backend(ip, port, routes):
+def run_backend(ip, port, routes, max_workers=MAX_WORKERS, queue_size=QUEUE_SIZE,
+                queue_timeout=QUEUE_TIMEOUT, server=None):
     """
     Starts the backend server, binds to the specified IP and port, and listens for incoming
-    connections. Each connection is handled in a separate thread. The backend accepts incoming
-    connections and spawns a thread for each client.
+    connections. Each connection is handled by a thread of a bounded :class:`WorkerPool`.
+    When the pool queue is full the client is answered with ``503 Service Unavailable``.
+    An idle persistent connection is watched by the pool and holds no thread.
 
     :param ip (str): IP address to bind the server.
     :param port (int): Port number to listen on.
     :param routes (dict): Dictionary of route handlers.
+    :param max_workers (int): Number of worker threads.
+    :param queue_size (int): Maximum number of accepted connections waiting for a worker.
+    :param queue_timeout (float): Maximum seconds a connection may wait for a worker.
+    :param server (socket.socket, optional): An already listening socket, e.g.
+        inherited from a pre-fork master. Defaults to binding a new one.
     """
-    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-
     try:
-        server.bind((ip, port))
-        server.listen(50)
-        print("[Backend] Listening on port {}".format(port))
+        if server is None:
+            server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            server.bind((ip, port))
+            server.listen(50)
+        log.info("listening", engine="thread", port=port)
         if routes != {}:
-            print("[Backend] route settings {}".format(routes))
+            log.info("routes", routes=sorted(routes))
+
+        pool = WorkerPool(lambda conn, addr: handle_client(ip, port, conn, addr, routes),
+                          max_workers=max_workers, queue_size=queue_size,
+                          queue_timeout=queue_timeout,
+                          idle_timeout=HttpAdapter.keepalive_timeout, name="Backend")
 
         while True:
             conn, addr = server.accept()
-
-            #
-            #  TODO: implement the step of the client incoming connection
-            #        using multi-thread programming with the
-            #        provided handle_client routine
-            #
-
-            t = threading.Thread(target=handle_client, args=(ip, port, conn, addr, routes))
-            t.start()
+            pool.submit(conn, addr)
 
     except socket.error as e:
-      print("Socket error: {}".format(e))
+      log.error("socket error", port=port, error=str(e))
+
+#: Serving engines selectable from :func:`create_backend`.
+MODES = ("thread", "eventloop", "asyncio")
 
-def create_backend(ip, port, routes={}):
+def create_backend(ip, port, routes={}, mode="thread", workers=1, **options):
     """
     Entry point for creating and running the backend server.
 
     :param ip (str): IP address to bind the server.
     :param port (int): Port number to listen on.
     :param routes (dict, optional): Dictionary of route handlers. Defaults to empty dict.
+    :param mode (str, optional): Serving engine, ``"thread"`` (one thread per
+        connection), ``"eventloop"`` (selectors based) or ``"asyncio"``
+        (awaits ``async def`` handlers). Defaults to ``"thread"``.
+    :param workers (int, optional): Number of pre-forked worker processes sharing
+        the port. Defaults to 1 (serve from this process).
+    :param options: Engine options:
+        ``max_workers``, ``queue_size`` and ``queue_timeout`` for the thread engine,
+        ``loops`` for the event loop,
+        ``executor_workers`` for the asyncio engine,
+        ``reuse_port`` to let each worker process bind with ``SO_REUSEPORT``,
+        ``static_cache_bytes`` for the byte budget of the static file cache,
+        ``auth_table`` for the credential file,
+        ``session_ttl`` for the lifetime of login sessions in seconds,
+        ``log_level`` and ``log_levels`` for the daemon logger levels (see
+        :func:`configure <daemon.log.configure>`),
+        ``access_sample`` for the fraction of requests written to the access
+        log (off by default).
+
+    :raises ValueError: If the mode is unknown.
+    """
+
+    if mode not in MODES:
+        raise ValueError("Unknown backend mode {!r}, expected one of {}".format(mode, MODES))
+
+    if not isinstance(routes, Router):
+        routes = Router(routes)
+
+    if "static_cache_bytes" in options:
+        Response.static_cache = StaticCache(max_bytes=options.pop("static_cache_bytes"))
+
+    if "auth_table" in options or "session_ttl" in options:
+        Request.authentication = Authentication(
+            options.pop("auth_table", AUTH_TABLE),
+            sessions=SessionTable(options.pop("session_ttl", SESSION_TTL)))
+
+    if "log_level" in options or "log_levels" in options or "access_sample" in options:
+        configure_logging(level=options.pop("log_level", None),
+                          levels=options.pop("log_levels", None),
+                          access_sample=options.pop("access_sample", None))
+
+    if workers > 1:
+        reuse_port = options.pop("reuse_port", False)
+        run_prefork(ip, port, workers,
+                    lambda server: serve_backend(ip, port, routes, mode, server=server, **options),
+                    reuse_port=reuse_port)
+    else:
+        serve_backend(ip, port, routes, mode, **options)
+
+def serve_backend(ip, port, routes, mode="thread", **options):
+    """
+    Runs the selected serving engine in the current process.
+
+    :param ip (str): IP address to bind the server.
+    :param port (int): Port number to listen on.
+    :param routes (dict): Dictionary of route handlers.
+    :param mode (str): Serving engine, ``"thread"``, ``"eventloop"`` or ``"asyncio"``.
+    :param options: Engine options, including an optional listening ``server`` socket.
     """
 
-    run_backend(ip, port, routes)
+    if mode == "thread":
+        run_backend(ip, port, routes, **options)
+    elif mode == "eventloop":
+        run_backend_eventloop(ip, port, routes, **options)
+    elif mode == "asyncio":
+        run_backend_async(ip, port, routes, **options)
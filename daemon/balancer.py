@@ -0,0 +1,434 @@
+#
+# Copyright (C) 2025 pdnguyen of HCMC University of Technology VNU-HCM.
+# All rights reserved.
+# This file is part of the CO3093/CO3094 course.
+#
+# WeApRous release
+#
+# The authors hereby grant to Licensee personal permission to use
+# and modify the Licensed Source Code for the sole purpose of studying
+# while attending the course
+#
+
+"""
+daemon.balancer
+~~~~~~~~~~~~~~~~~
+
+This module provides the load balancing of the proxy: a :class:`Balancer` per
+virtual host spreads requests over the ``proxy_pass`` upstreams according to
+its ``dist_policy``:
+
+- ``round-robin``: each upstream in turn.
+- ``weighted-round-robin``: in proportion to the ``weight=N`` of each upstream,
+  interleaved (smooth weighted round-robin).
+- ``least-connections``: the upstream with the fewest requests in flight per
+  unit of weight.
+- ``two-choices``: the less loaded of two upstreams drawn at random.
+- ``hash [key]``: consistent hashing of the client IP (``$remote_addr``, the
+  default) or of a request header, so a client keeps its upstream and only
+  ``1/n`` of the clients move when an upstream is added or removed.
+  ``ip-hash`` is ``hash $remote_addr``.
+
+Every balancer is thread-safe and counts the requests in flight per upstream
+between :meth:`Balancer.acquire` and :meth:`Balancer.release`.
+
+Only the upstreams that are up are chosen. An upstream goes down when the
+active health checks of :mod:`daemon.health` fail, or, passively, after
+``max_fails`` consecutive requests failed on it: it is then ejected for
+``fail_timeout`` seconds, twice as long after each new ejection (up to
+:data:`MAX_EJECTION`), and readmitted for a trial request once the time is up.
+When every upstream is down the requests are spread over all of them rather
+than refused.
+
+Usage Example:
+--------------
+>>> balancer = create_balancer(["10.0.0.2:9002", "10.0.0.3:9003 weight=2"],
+...                            "weighted-round-robin")
+>>> upstream = balancer.acquire("192.168.1.20")
+>>> upstream.host, upstream.port
+('10.0.0.3', 9003)
+>>> balancer.release(upstream, failed=False)
+
+"""
+
+import bisect
+import hashlib
+import itertools
+import random
+import threading
+import time
+
+from .health import parse_health_check
+from .log import get_logger
+
+log = get_logger(__name__)
+
+#: Points per unit of weight of an upstream on the consistent hash ring.
+VNODES = 160
+#: Hash key naming the client IP address.
+REMOTE_ADDR = "$remote_addr"
+#: Consecutive failed requests that eject an upstream, ``0`` never ejects.
+MAX_FAILS = 3
+#: Seconds of the first ejection of an upstream; doubled on each new one.
+FAIL_TIMEOUT = 10.0
+#: Longest ejection in seconds.
+MAX_EJECTION = 300.0
+
+
+class Upstream:
+    """
+    One ``proxy_pass`` target of a virtual host.
+
+    :param host (str): backend IP address or name.
+    :param port (int): backend port.
+    :param weight (int): relative share of the requests.
+    :param max_fails (int): consecutive failed requests that eject it.
+    :param fail_timeout (float): seconds of its first ejection.
+
+    :attrs active (int): requests in flight.
+    :attrs healthy (bool): result of the active health checks.
+    :attrs fails (int): consecutive failed requests.
+    :attrs ejections (int): ejections since the last successful request.
+    :attrs down_until (float): monotonic time the current ejection ends.
+    :attrs up (bool): neither unhealthy nor ejected, see :meth:`Balancer.refresh`.
+    """
+
+    __slots__ = ("host", "port", "weight", "max_fails", "fail_timeout", "active",
+                 "current_weight", "healthy", "fails", "ejections", "down_until", "up")
+
+    def __init__(self, host, port, weight=1, max_fails=MAX_FAILS, fail_timeout=FAIL_TIMEOUT):
+        self.host = host
+        self.port = port
+        self.weight = weight
+        self.max_fails = max_fails
+        self.fail_timeout = fail_timeout
+        self.active = 0
+        # Running weight of the smooth weighted round-robin
+        self.current_weight = 0
+        self.healthy = True
+        self.fails = 0
+        self.ejections = 0
+        self.down_until = 0.0
+        self.up = True
+
+    def failed(self, now):
+        """
+        Counts a failed request and ejects the upstream after ``max_fails``
+        in a row.
+
+        :param now (float): monotonic time.
+
+        :rtype bool: ``True`` if the upstream was just ejected.
+        """
+        self.fails += 1
+        if not self.max_fails or self.fails < self.max_fails or now < self.down_until:
+            return False
+        seconds = min(self.fail_timeout * 2 ** min(self.ejections, 16), MAX_EJECTION)
+        self.down_until = now + seconds
+        self.ejections += 1
+        # Once readmitted, a single failure ejects it again
+        self.fails = self.max_fails - 1
+        log.warning("upstream ejected", backend=str(self), seconds=seconds,
+                    ejections=self.ejections)
+        return True
+
+    def succeeded(self):
+        """Ends the failure streak after a successful request."""
+        self.fails = 0
+        self.ejections = 0
+
+    def __str__(self):
+        return "{}:{}".format(self.host, self.port)
+
+    def __repr__(self):
+        return "Upstream({!r}, {!r}, weight={!r})".format(self.host, self.port, self.weight)
+
+
+def parse_upstream(spec):
+    """
+    Parses a ``proxy_pass`` target.
+
+    :param spec (str): ``"host:port"`` optionally followed by ``weight=N``,
+        ``max_fails=N`` and ``fail_timeout=S`` (seconds, ``10`` or ``10s``).
+
+    :rtype Upstream: the upstream.
+
+    :raises ValueError: If the port or a parameter is invalid.
+    """
+    address, *params = spec.split()
+    host, _, port = address.rpartition(":")
+    options = {"weight": "1", "max_fails": str(MAX_FAILS), "fail_timeout": str(FAIL_TIMEOUT)}
+    for param in params:
+        name, _, value = param.partition("=")
+        if name not in options:
+            raise ValueError("Unknown proxy_pass parameter {!r}".format(param))
+        options[name] = value
+    try:
+        weight = int(options["weight"])
+        max_fails = int(options["max_fails"])
+        fail_timeout = float(options["fail_timeout"].rstrip("s"))
+    except ValueError as e:
+        raise ValueError("Invalid proxy_pass {!r}".format(spec)) from e
+    if not host or not port.isdigit() or weight <= 0 or max_fails < 0 or fail_timeout <= 0:
+        raise ValueError("Invalid proxy_pass {!r}".format(spec))
+    return Upstream(host, int(port), weight, max_fails, fail_timeout)
+
+
+class Balancer:
+    """
+    Base class of the load balancing policies.
+
+    :param upstreams (list): :class:`Upstream` targets.
+    :param key (str): policy argument, e.g. the hash key.
+    :param health_check (HealthCheck): active health check of the upstreams,
+        run by a :class:`HealthChecker <HealthChecker>`; ``None`` for none.
+
+    :attrs live (list): the upstreams that are up, all of them when none is.
+    """
+
+    __attrs__ = [
+        "upstreams",
+        "key",
+        "health_check",
+    ]
+
+    def __init__(self, upstreams, key=None, health_check=None):
+        self.upstreams = list(upstreams)
+        self.key = key
+        self.health_check = health_check
+        self.live = list(self.upstreams)
+        self._lock = threading.Lock()
+        # Monotonic time an ejection ends and the live list must be rebuilt
+        self._refresh_at = float("inf")
+
+    def acquire(self, client=None, headers=None):
+        """
+        Picks the upstream of a request among those up and counts it in
+        flight.
+
+        :param client (str): client IP address.
+        :param headers (Headers): request headers.
+
+        :rtype Upstream: the chosen upstream, ``None`` if there is none.
+        """
+        if not self.upstreams:
+            return None
+        with self._lock:
+            if self._refresh_at <= time.monotonic():
+                self.refresh()
+            upstream = self.select(client, headers)
+            upstream.active += 1
+        return upstream
+
+    def release(self, upstream, failed=False):
+        """
+        Ends a request started with :meth:`acquire`.
+
+        :param upstream (Upstream): the upstream it was sent to.
+        :param failed (bool): the upstream could not be reached or did not
+            answer; counts towards its ejection.
+        """
+        with self._lock:
+            upstream.active -= 1
+            if failed:
+                if upstream.failed(time.monotonic()):
+                    self.refresh()
+            elif upstream.fails:
+                upstream.succeeded()
+
+    def set_healthy(self, upstream, healthy):
+        """
+        Records the result of the active health checks of an upstream.
+
+        :param upstream (Upstream): one of :attr:`upstreams`.
+        :param healthy (bool): ``False`` takes it out of rotation.
+        """
+        with self._lock:
+            upstream.healthy = healthy
+            if healthy:
+                # Back according to the checks: forget the passive ejection
+                upstream.down_until = 0.0
+                upstream.succeeded()
+            self.refresh()
+
+    def refresh(self):
+        """
+        Rebuilds :attr:`live` from the health of the upstreams; called with
+        the lock held.
+        """
+        now = time.monotonic()
+        live = []
+        refresh_at = float("inf")
+        for upstream in self.upstreams:
+            if not upstream.healthy:
+                up = False
+            elif upstream.down_until > now:
+                up = False
+                refresh_at = min(refresh_at, upstream.down_until)
+            else:
+                up = True
+                live.append(upstream)
+            if up != upstream.up:
+                log.info("upstream up" if up else "upstream down", backend=str(upstream))
+            upstream.up = up
+        if not live:
+            log.warning("all upstreams down", upstreams=[str(u) for u in self.upstreams])
+            live = list(self.upstreams)
+        self.live = live
+        self._refresh_at = refresh_at
+
+    def select(self, client, headers):
+        """
+        Chooses an upstream among :attr:`live`; called with the lock held and
+        at least one upstream configured.
+
+        :rtype Upstream: the chosen upstream.
+        """
+        raise NotImplementedError
+
+
+class RoundRobin(Balancer):
+    """Sends each request to the next upstream in turn."""
+
+    def __init__(self, upstreams, key=None, health_check=None):
+        super().__init__(upstreams, key, health_check)
+        self._turn = itertools.count()
+
+    def select(self, client, headers):
+        live = self.live
+        return live[next(self._turn) % len(live)]
+
+
+class WeightedRoundRobin(Balancer):
+    """
+    Smooth weighted round-robin: an upstream of weight 3 next to one of
+    weight 1 gets three requests out of four, not three in a row.
+    """
+
+    def select(self, client, headers):
+        best = None
+        total = 0
+        for upstream in self.live:
+            upstream.current_weight += upstream.weight
+            total += upstream.weight
+            if best is None or upstream.current_weight > best.current_weight:
+                best = upstream
+        best.current_weight -= total
+        return best
+
+
+class LeastConnections(Balancer):
+    """
+    Sends a request to the upstream with the fewest requests in flight per
+    unit of weight; ties are broken in turn.
+    """
+
+    def __init__(self, upstreams, key=None, health_check=None):
+        super().__init__(upstreams, key, health_check)
+        self._turn = itertools.count()
+
+    def select(self, client, headers):
+        upstreams = self.live
+        start = next(self._turn) % len(upstreams)
+        best = None
+        for i in range(len(upstreams)):
+            upstream = upstreams[(start + i) % len(upstreams)]
+            if best is None or upstream.active * best.weight < best.active * upstream.weight:
+                best = upstream
+        return best
+
+
+class TwoChoices(Balancer):
+    """
+    Draws two upstreams at random and sends the request to the one with
+    fewer requests in flight per unit of weight.
+    """
+
+    def select(self, client, headers):
+        live = self.live
+        if len(live) == 1:
+            return live[0]
+        a, b = random.sample(live, 2)
+        return b if b.active * a.weight < a.active * b.weight else a
+
+
+def _hash(value):
+    """64-bit position of a value on the hash ring."""
+    return int.from_bytes(hashlib.md5(value.encode('utf-8')).digest()[:8], 'big')
+
+
+class ConsistentHash(Balancer):
+    """
+    Consistent hashing of the client IP or of a request header on a ring of
+    :data:`VNODES` points per unit of weight.
+
+    :param key (str): :data:`REMOTE_ADDR` (default) or a header name, also
+        accepted as ``$http_<name>``; requests without the header hash their
+        client IP. The keys of an upstream that is down move to the next
+        points of the ring, the other keys keep their upstream.
+    """
+
+    def __init__(self, upstreams, key=None, health_check=None):
+        super().__init__(upstreams, key or REMOTE_ADDR, health_check)
+        if self.key.lower().startswith("$http_"):
+            self.key = self.key[len("$http_"):].replace("_", "-")
+        ring = sorted((_hash("{}#{}".format(upstream, i)), n)
+                      for n, upstream in enumerate(self.upstreams)
+                      for i in range(VNODES * upstream.weight))
+        self._points = [point for point, _ in ring]
+        self._owners = [self.upstreams[n] for _, n in ring]
+
+    def select(self, client, headers):
+        value = None
+        if self.key != REMOTE_ADDR and headers is not None:
+            value = headers.get(self.key)
+        if value is None:
+            value = client or ""
+        owners = self._owners
+        i = bisect.bisect(self._points, _hash(value))
+        for j in range(i, i + len(owners)):
+            owner = owners[j % len(owners)]
+            if owner.up:
+                return owner
+        return owners[i % len(owners)]
+
+
+#: ``dist_policy`` names -> balancer class.
+POLICIES = {
+    "round-robin": RoundRobin,
+    "weighted-round-robin": WeightedRoundRobin,
+    "least-connections": LeastConnections,
+    "least-conn": LeastConnections,
+    "two-choices": TwoChoices,
+    "random-two-choices": TwoChoices,
+    "hash": ConsistentHash,
+    "ip-hash": ConsistentHash,
+}
+
+
+def create_balancer(proxy_pass, policy="round-robin", health_check=None):
+    """
+    Builds the balancer of a virtual host from its configuration.
+
+    :param proxy_pass (str | list): one or more ``"host:port [weight=N]"``,
+        see :func:`parse_upstream`.
+    :param policy (str): ``dist_policy`` value, a name from :data:`POLICIES`
+        optionally followed by its argument, e.g. ``"hash X-User-Id"``.
+    :param health_check (str): ``health_check`` value, e.g.
+        ``"uri=/health interval=5"``, see :func:`parse_health_check`; ``None`` disables the active checks.
+
+    :rtype Balancer: the balancer.
+
+    :raises ValueError: If the policy, an upstream or the health check is
+        invalid.
+    """
+    if isinstance(proxy_pass, str):
+        proxy_pass = [proxy_pass]
+    name, _, key = (policy or "round-robin").strip().partition(" ")
+    cls = POLICIES.get(name.lower())
+    if cls is None:
+        raise ValueError("Unknown dist_policy {!r}, expected one of {}".format(
+            name, sorted(POLICIES)))
+    if health_check is not None:
+        health_check = parse_health_check(health_check)
+    return cls([parse_upstream(spec) for spec in proxy_pass], key.strip() or None, health_check)
@@ -0,0 +1,135 @@
+#
+# Copyright (C) 2025 pdnguyen of HCMC University of Technology VNU-HCM.
+# All rights reserved.
+# This file is part of the CO3093/CO3094 course.
+#
+# WeApRous release
+#
+# The authors hereby grant to Licensee personal permission to use
+# and modify the Licensed Source Code for the sole purpose of studying
+# while attending the course
+#
+
+"""
+daemon.compression
+~~~~~~~~~~~~~~~~~
+
+This module provides HTTP content encoding for responses: ``Accept-Encoding``
+negotiation and ``gzip`` / ``deflate`` compression with the standard
+:mod:`zlib` module. Only textual content types of at least :data:`MIN_SIZE`
+bytes are compressed; smaller bodies gain nothing over the header overhead.
+
+Usage Example:
+--------------
+>>> negotiate("gzip;q=0.5, deflate")
+'deflate'
+>>> compress(b"..." * 1000, "gzip")
+b'\\x1f\\x8b...'
+
+"""
+
+import zlib
+
+#: Encodings the server can produce, in order of preference.
+ENCODINGS = ("gzip", "deflate")
+#: Bodies smaller than this are sent uncompressed.
+MIN_SIZE = 1024
+#: zlib compression level (1 fastest, 9 smallest).
+LEVEL = 6
+
+#: Content types worth compressing besides ``text/*``.
+COMPRESSIBLE_TYPES = frozenset((
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+))
+
+# zlib ``wbits`` producing each encoding's container format.
+_WBITS = {
+    "gzip": 16 + zlib.MAX_WBITS,
+    "deflate": zlib.MAX_WBITS,
+}
+
+
+def is_compressible(content_type):
+    """
+    Tells whether a content type benefits from compression.
+
+    :param content_type (str): ``Content-Type`` value, parameters allowed.
+
+    :rtype bool: ``True`` for ``text/*`` and the :data:`COMPRESSIBLE_TYPES`.
+    """
+    mime = content_type.split(";", 1)[0].strip().lower()
+    return mime.startswith("text/") or mime in COMPRESSIBLE_TYPES
+
+
+def negotiate(accept_encoding, available=ENCODINGS):
+    """
+    Chooses a content encoding from an ``Accept-Encoding`` header.
+
+    Codings are ranked by their ``q`` value, ties broken by the order of
+    ``available``. ``*`` applies to every coding not listed explicitly.
+
+    :param accept_encoding (str): ``Accept-Encoding`` value, may be empty.
+    :param available (iterable): encodings the caller can produce.
+
+    :rtype str: the chosen encoding, or ``None`` to send the identity body.
+    """
+    if not accept_encoding:
+        return None
+
+    weights = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.partition(";")
+        coding = coding.strip().lower()
+        q = 1.0
+        params = params.strip()
+        if params[:2].lower() == "q=":
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if coding:
+            weights[coding] = q
+
+    best, best_q = None, 0.0
+    for encoding in available:
+        q = weights.get(encoding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def compress(data, encoding, level=LEVEL):
+    """
+    Compresses a body with the given content encoding.
+
+    :param data (bytes): identity body.
+    :param encoding (str): ``"gzip"`` or ``"deflate"`` (zlib format, RFC 9110).
+    :param level (int): zlib compression level.
+
+    :rtype bytes: encoded body.
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, _WBITS[encoding])
+    return compressor.compress(data) + compressor.flush()
+
+
+def encode_body(body, content_type, accept_encoding):
+    """
+    Compresses a dynamic response body when the client accepts it and the
+    content is compressible and large enough.
+
+    :param body (bytes): identity body.
+    :param content_type (str): ``Content-Type`` of the body.
+    :param accept_encoding (str): ``Accept-Encoding`` request header.
+
+    :rtype tuple: ``(body, encoding)``; ``encoding`` is ``None`` when the
+        body is returned unchanged.
+    """
+    if len(body) < MIN_SIZE or not is_compressible(content_type):
+        return body, None
+    encoding = negotiate(accept_encoding)
+    if encoding is None:
+        return body, None
+    return compress(body, encoding), encoding
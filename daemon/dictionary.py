@@ -10,8 +10,49 @@
 # while attending the course
 #
 
+import sys
 from collections.abc import MutableMapping
 
+#: Header names interned at import and shared by every :class:`Headers`.
+COMMON_HEADERS = (
+    "Accept", "Accept-Encoding", "Accept-Language", "Accept-Ranges", "Authorization",
+    "Cache-Control", "Connection", "Content-Disposition", "Content-Encoding",
+    "Content-Length", "Content-Range", "Content-Type", "Cookie", "Date", "ETag",
+    "Expect", "Host", "If-Modified-Since", "If-None-Match", "If-Range", "Keep-Alive",
+    "Last-Modified", "Location", "Origin", "Pragma", "Proxy-Connection", "Range",
+    "Referer", "Retry-After", "Server", "Set-Cookie", "TE", "Trailer",
+    "Transfer-Encoding", "Upgrade", "User-Agent", "Vary", "Via", "X-Forwarded-For",
+    "X-Forwarded-Host", "X-Forwarded-Proto", "X-Real-IP", "X-Requested-With",
+)
+#: Maximum header name spellings remembered, common ones included.
+MAX_HEADER_NAMES = 1024
+
+# Header name as sent -> interned lower-cased key
+_header_keys = {}
+for _name in COMMON_HEADERS:
+    _key = sys.intern(_name.lower())
+    _header_keys[_name] = _header_keys[_key] = _key
+del _name, _key
+
+
+def header_key(name):
+    """
+    Returns the lookup key of a header name. Spellings already seen are
+    resolved by one dict lookup instead of lower-casing the name again.
+
+    :param name (str): header name in any case.
+
+    :rtype str: the interned lower-cased name.
+    """
+    try:
+        return _header_keys[name]
+    except KeyError:
+        key = name.lower()
+        if len(_header_keys) < MAX_HEADER_NAMES:
+            key = _header_keys[name] = sys.intern(key)
+        return key
+
+
 class CaseInsensitiveDict(MutableMapping):
     """The :class:`CaseInsensitiveDict<MutableMapping>` object, which 
     contains a custom behavior of MutuableMapping.
@@ -50,3 +91,129 @@ class CaseInsensitiveDict(MutableMapping):
 
     def __len__(self):
         return len(self.store)
+
+
+class Headers(CaseInsensitiveDict):
+    """The :class:`Headers <Headers>` object, a :class:`CaseInsensitiveDict`
+    for HTTP header fields that keeps the name as it was sent and every value
+    of a repeated field.
+
+    Each field is stored once, under its interned lower-cased name (see
+    :func:`header_key`), as a tuple ``(name, value, value...)``. Reading a
+    repeated field returns its values joined by ``", "``; :meth:`getlist`
+    and :meth:`multi_items` return them separately.
+
+    Usage::
+
+      >>> headers = Headers.parse(["Host: example.com", "Via: a", "Via: b"])
+      >>> headers['host']
+      'example.com'
+      >>> headers['VIA']
+      'a, b'
+      >>> headers.getlist('via')
+      ['a', 'b']
+      >>> list(headers)
+      ['Host', 'Via']
+
+    """
+
+    def __init__(self, fields=None, **kwargs):
+        self.store = {}
+        if fields is not None:
+            if isinstance(fields, Headers):
+                fields = fields.multi_items()
+            elif hasattr(fields, 'items'):
+                fields = fields.items()
+            for name, value in fields:
+                self.add(name, value)
+        for name, value in kwargs.items():
+            self.add(name, value)
+
+    @classmethod
+    def parse(cls, lines):
+        """
+        Builds the headers of a message from its header lines.
+
+        :param lines (list): ``name: value`` lines without CRLF; lines
+            without a colon are ignored.
+
+        :rtype Headers: the parsed headers.
+        """
+        headers = cls.__new__(cls)
+        store = headers.store = {}
+        keys = _header_keys
+        for line in lines:
+            name, sep, value = line.partition(':')
+            if sep:
+                name = name.strip()
+                key = keys.get(name) or header_key(name)
+                if key in store:
+                    store[key] += (value.strip(),)
+                else:
+                    store[key] = (name, value.strip())
+        return headers
+
+    # Reads look the key up in _header_keys inline: it is the hot path.
+
+    def __getitem__(self, key):
+        entry = self.store[_header_keys.get(key) or header_key(key)]
+        return entry[1] if len(entry) == 2 else ", ".join(entry[1:])
+
+    def get(self, key, default=None):
+        entry = self.store.get(_header_keys.get(key) or header_key(key))
+        if entry is None:
+            return default
+        return entry[1] if len(entry) == 2 else ", ".join(entry[1:])
+
+    def __contains__(self, key):
+        return (_header_keys.get(key) or header_key(key)) in self.store
+
+    def __setitem__(self, key, value):
+        self.store[header_key(key)] = (key, value)
+
+    def __delitem__(self, key):
+        del self.store[header_key(key)]
+
+    def __iter__(self):
+        return (entry[0] for entry in self.store.values())
+
+    def add(self, key, value):
+        """
+        Appends a value, keeping the values already set for the field.
+
+        :param key (str): header name.
+        :param value (str): header value.
+        """
+        name = header_key(key)
+        entry = self.store.get(name)
+        self.store[name] = (key, value) if entry is None else entry + (value,)
+
+    def getlist(self, key):
+        """
+        :param key (str): header name.
+
+        :rtype list: every value of the field, ``[]`` if it is absent.
+        """
+        entry = self.store.get(header_key(key))
+        return [] if entry is None else list(entry[1:])
+
+    def multi_items(self):
+        """
+        :rtype iterator: ``(name, value)`` for every value, repeated fields
+            included, with the names as they were sent.
+        """
+        for entry in self.store.values():
+            name = entry[0]
+            for value in entry[1:]:
+                yield name, value
+
+    def copy(self):
+        """
+        :rtype Headers: a copy with the same fields and values.
+        """
+        headers = Headers.__new__(Headers)
+        headers.store = dict(self.store)
+        return headers
+
+    def __repr__(self):
+        return "Headers({!r})".format(list(self.multi_items()))
@@ -0,0 +1,315 @@
+#
+# Copyright (C) 2025 pdnguyen of HCMC University of Technology VNU-HCM.
+# All rights reserved.
+# This file is part of the CO3093/CO3094 course.
+#
+# WeApRous release
+#
+# The authors hereby grant to Licensee personal permission to use
+# and modify the Licensed Source Code for the sole purpose of studying
+# while attending the course
+#
+
+"""
+daemon.eventloop
+~~~~~~~~~~~~~~~~~
+
+This module provides a non-blocking serving engine for the backend daemon.
+Instead of spawning one thread per accepted connection, every client socket is
+multiplexed on a :mod:`selectors` event loop (epoll on Linux, kqueue on BSD)
+and complete requests are dispatched to :class:`HttpAdapter <HttpAdapter>`.
+
+Requirements:
+--------------
+- selectors: readiness notification for many sockets on one thread.
+- httpadapter: the class for handling HTTP requests.
+
+Notes:
+------
+- An idle connection costs one socket, one small :class:`_Connection` object
+  and an empty buffer, so thousands of idle pollers keep memory flat.
+- Route handlers run on the loop thread; a slow handler stalls every other
+  connection of that loop. Use ``loops > 1`` to keep a few loops serving.
+- Holding 10k connections needs a matching ``ulimit -n``.
+
+Usage Example:
+--------------
+>>> run_backend_eventloop("127.0.0.1", 9000, routes={})
+
+"""
+
+import os
+import socket
+import selectors
+import threading
+import time
+
+from .httpadapter import HttpAdapter
+from .response import Response
+from .framing import RequestFramer, FramingError, RECV_SIZE, CONTINUE
+from . import metrics
+from .log import get_logger
+from . import streaming
+
+log = get_logger(__name__)
+
+#: Seconds between two sweeps for idle persistent connections.
+SWEEP_INTERVAL = 1.0
+
+#: Listen backlog used by the event loop engine.
+BACKLOG = 1024
+
+#: Bytes of a streamed response buffered per write event.
+STREAM_BUFFER = 64 * 1024
+
+
+class _Connection:
+    """Per-client state kept by the event loop."""
+
+    __slots__ = ("sock", "addr", "framer", "outbuf", "file", "stream", "served", "closing", "last_active")
+
+    def __init__(self, sock, addr):
+        self.sock = sock
+        self.addr = addr
+        self.framer = RequestFramer(HttpAdapter.max_header_size, HttpAdapter.max_body_size,
+                                     HttpAdapter.spool_size)
+        self.outbuf = bytearray()
+        #: ``[file, offset, remaining]`` of a static body being sent with sendfile.
+        self.file = None
+        #: Wire chunks of a streamed handler result still to be sent.
+        self.stream = None
+        #: Requests answered on this connection.
+        self.served = 0
+        #: Close once ``outbuf`` is flushed.
+        self.closing = False
+        #: Monotonic time of the last socket activity.
+        self.last_active = time.monotonic()
+
+
+class EventLoop:
+    """
+    A selector based event loop serving one listening socket.
+
+    Connections are persistent like in :meth:`HttpAdapter.handle_client`:
+    pipelined requests are answered in order, and a connection is closed on
+    ``Connection: close``, after :attr:`HttpAdapter.keepalive_timeout` idle
+    seconds or after :attr:`HttpAdapter.max_requests` requests.
+
+    :param server (socket.socket): non-blocking listening socket.
+    :param ip (str): IP address of the server.
+    :param port (int): Port number the server is listening on.
+    :param routes (dict): Dictionary of route handlers.
+    """
+
+    def __init__(self, server, ip, port, routes):
+        self.server = server
+        self.ip = ip
+        self.port = port
+        self.routes = routes
+        self.selector = selectors.DefaultSelector()
+        # Receive buffer shared by every connection of this loop.
+        self._chunk = bytearray(RECV_SIZE)
+        self._view = memoryview(self._chunk)
+
+    def serve_forever(self):
+        """Runs the loop until the listening socket fails."""
+        self.selector.register(self.server, selectors.EVENT_READ, None)
+        next_sweep = time.monotonic() + SWEEP_INTERVAL
+        while True:
+            for key, mask in self.selector.select(SWEEP_INTERVAL):
+                if key.data is None:
+                    self._accept()
+                    continue
+                if mask & selectors.EVENT_READ:
+                    self._read(key.data)
+                elif mask & selectors.EVENT_WRITE:
+                    self._write(key.data)
+
+            now = time.monotonic()
+            if now >= next_sweep:
+                self._sweep(now)
+                next_sweep = now + SWEEP_INTERVAL
+
+    def _accept(self):
+        """Accepts every pending connection on the listening socket."""
+        while True:
+            try:
+                sock, addr = self.server.accept()
+            except (BlockingIOError, InterruptedError):
+                return
+            sock.setblocking(False)
+            metrics.CONNECTIONS.inc()
+            metrics.ACTIVE_CONNECTIONS.inc()
+            self.selector.register(sock, selectors.EVENT_READ, _Connection(sock, addr))
+
+    def _read(self, c):
+        """Reads available bytes and dispatches every complete request."""
+        try:
+            n = c.sock.recv_into(self._chunk)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError:
+            self._close(c)
+            return
+
+        if not n:
+            self._close(c)
+            return
+
+        c.last_active = time.monotonic()
+        metrics.RECEIVED_BYTES.inc(n)
+        c.framer.feed(self._view[:n])
+        self._dispatch(c)
+
+    def _dispatch(self, c):
+        """
+        Answers the complete requests buffered on a connection, in order.
+
+        Dispatching pauses after a response with a sendfile or streamed body,
+        so that the next pipelined response is not queued before it is sent.
+        """
+        try:
+            while not c.closing and c.file is None and c.stream is None:
+                message = c.framer.next_message()
+                if message is None:
+                    if c.framer.continue_needed():
+                        c.outbuf += CONTINUE
+                    break
+                c.served += 1
+                metrics.observe_stage("recv", time.monotonic() - c.framer.received_at)
+
+                adapter = HttpAdapter(self.ip, self.port, c.sock, c.addr, self.routes)
+                c.outbuf += adapter.handle_request(
+                    message, self.routes, keep_alive=c.served < HttpAdapter.max_requests)
+                c.closing = not adapter.request.keep_alive
+
+                file_body = adapter.response.file_body
+                if file_body is not None:
+                    filepath, offset, count = file_body
+                    c.file = [open(filepath, "rb"), offset, count]
+                elif adapter.response.stream_body is not None:
+                    c.stream = streaming.iter_wire(*adapter.response.stream_body)
+        except FramingError as e:
+            c.outbuf += Response().build_error(e.status)
+            c.closing = True
+        except OSError:
+            self._close(c)
+            return
+
+        if c.outbuf or c.file is not None or c.stream is not None:
+            self.selector.modify(c.sock, selectors.EVENT_WRITE, c)
+            self._write(c)
+        else:
+            self.selector.modify(c.sock, selectors.EVENT_READ, c)
+
+    def _write(self, c):
+        """Flushes as much of the pending response as the socket accepts."""
+        try:
+            if c.outbuf:
+                sent = c.sock.send(c.outbuf)
+                metrics.SENT_BYTES.inc(sent)
+                del c.outbuf[:sent]
+                if c.outbuf:
+                    c.last_active = time.monotonic()
+                    return
+
+            if c.file is not None:
+                file, offset, remaining = c.file
+                sent = os.sendfile(c.sock.fileno(), file.fileno(), offset, remaining)
+                if sent == 0:
+                    raise OSError("file truncated while sending")
+                metrics.SENT_BYTES.inc(sent)
+                c.file[1] += sent
+                c.file[2] -= sent
+                if c.file[2] > 0:
+                    c.last_active = time.monotonic()
+                    return
+                file.close()
+                c.file = None
+
+            if c.stream is not None:
+                # Pull chunks only while the socket keeps up, one buffer per
+                # write event so a long stream does not starve other clients
+                try:
+                    while len(c.outbuf) < STREAM_BUFFER:
+                        c.outbuf += next(c.stream)
+                except StopIteration:
+                    c.stream = None
+                if c.outbuf:
+                    sent = c.sock.send(c.outbuf)
+                    metrics.SENT_BYTES.inc(sent)
+                    del c.outbuf[:sent]
+                if c.outbuf or c.stream is not None:
+                    c.last_active = time.monotonic()
+                    return
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError:
+            self._close(c)
+            return
+
+        c.last_active = time.monotonic()
+        if c.closing:
+            self._close(c)
+        else:
+            # Serve requests that were pipelined behind this response
+            self._dispatch(c)
+
+    def _sweep(self, now):
+        """Closes persistent connections idle for longer than the keep-alive timeout."""
+        deadline = now - HttpAdapter.keepalive_timeout
+        idle = [key.data for key in self.selector.get_map().values()
+                if key.data is not None and not key.data.outbuf and key.data.file is None
+                and key.data.stream is None and key.data.last_active < deadline]
+        for c in idle:
+            self._close(c)
+
+    def _close(self, c):
+        """Unregisters and closes a client connection."""
+        if c.sock.fileno() < 0:
+            return
+        metrics.ACTIVE_CONNECTIONS.dec()
+        try:
+            self.selector.unregister(c.sock)
+        except (KeyError, ValueError):
+            pass
+        if c.file is not None:
+            c.file[0].close()
+            c.file = None
+        if c.stream is not None:
+            c.stream.close()
+            c.stream = None
+        c.sock.close()
+
+
+def run_backend_eventloop(ip, port, routes, loops=1, server=None):
+    """
+    Starts the backend server in event loop mode. The listening socket is
+    shared by ``loops`` loop threads; each accepts and serves its own clients.
+
+    :param ip (str): IP address to bind the server.
+    :param port (int): Port number to listen on.
+    :param routes (dict): Dictionary of route handlers.
+    :param loops (int): Number of event loop threads.
+    :param server (socket.socket, optional): An already listening socket, e.g.
+        inherited from a pre-fork master. Defaults to binding a new one.
+    """
+    try:
+        if server is None:
+            server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            server.bind((ip, port))
+            server.listen(BACKLOG)
+        server.setblocking(False)
+        log.info("listening", engine="eventloop", port=port, loops=loops)
+        if routes != {}:
+            log.info("routes", routes=sorted(routes))
+
+        for _ in range(loops - 1):
+            loop = EventLoop(server, ip, port, routes)
+            threading.Thread(target=loop.serve_forever, daemon=True).start()
+
+        EventLoop(server, ip, port, routes).serve_forever()
+
+    except socket.error as e:
+      log.error("socket error", port=port, error=str(e))
@@ -0,0 +1,664 @@
+#
+# Copyright (C) 2025 pdnguyen of HCMC University of Technology VNU-HCM.
+# All rights reserved.
+# This file is part of the CO3093/CO3094 course.
+#
+# WeApRous release
+#
+# The authors hereby grant to Licensee personal permission to use
+# and modify the Licensed Source Code for the sole purpose of studying
+# while attending the course
+#
+
+"""
+daemon.framing
+~~~~~~~~~~~~~~~~~
+
+This module provides incremental HTTP request framing. A :class:`RequestFramer`
+is fed bytes as they arrive and hands out complete requests: the header block up
+to the blank line, then exactly ``Content-Length`` body bytes, or a decoded
+``Transfer-Encoding: chunked`` body. A :class:`RequestReader` drives a framer
+from a blocking socket with ``recv_into`` on one reusable buffer. A
+:class:`ResponseFramer` frames the responses of upstream servers the same way.
+
+Chunked requests are normalized: the returned head carries a ``Content-Length``
+header instead of ``Transfer-Encoding``, so every consumer sees the same framing.
+
+Bodies larger than the spool size are not accumulated in memory: they are
+written to a :class:`tempfile.SpooledTemporaryFile` as they arrive and handed
+out as that (rewound) file instead of ``bytes``, so an upload costs at most one
+receive buffer of memory whatever its size.
+
+Relays such as the proxy take only the header block with
+:meth:`RequestFramer.next_head` and pass the body on as it arrives, unchanged;
+a :class:`BodyFramer` finds where it ends without buffering or decoding it.
+
+Usage Example:
+--------------
+>>> framer = RequestFramer()
+>>> framer.feed(b"POST /echo HTTP/1.1\\r\\nContent-Length: 2\\r\\n\\r\\nhi")
+>>> framer.next_message()
+(b'POST /echo HTTP/1.1\\r\\nContent-Length: 2\\r\\n\\r\\n', b'hi')
+
+"""
+
+import tempfile
+import time
+
+#: Maximum size of the request line plus headers.
+MAX_HEADER_SIZE = 64 * 1024
+#: Maximum size of a request body.
+MAX_BODY_SIZE = 16 * 1024 * 1024
+#: Maximum size of a chunk size line (hex size plus extensions).
+MAX_CHUNK_LINE = 1024
+#: Size of the reusable ``recv_into`` buffer.
+RECV_SIZE = 65536
+#: Bodies larger than this are spooled to a temporary file instead of memory.
+SPOOL_SIZE = 1024 * 1024
+
+#: Maximum size of a response body read from an upstream server.
+MAX_RESPONSE_SIZE = 1024 * 1024 * 1024
+#: Body length of a response delimited by the end of the connection.
+UNTIL_CLOSE = -1
+
+#: Interim response sent to clients waiting on ``Expect: 100-continue``.
+CONTINUE = b"HTTP/1.1 100 Continue\r\n\r\n"
+
+
+class FramingError(Exception):
+    """The request cannot be framed; answered with :attr:`status`."""
+
+    status = "400 Bad Request"
+
+
+class HeaderTooLarge(FramingError):
+    """The header block exceeds the configured limit."""
+
+    status = "431 Request Header Fields Too Large"
+
+
+class BodyTooLarge(FramingError):
+    """The body exceeds the configured limit."""
+
+    status = "413 Payload Too Large"
+
+
+class RequestFramer:
+    """
+    Sans-IO incremental request framer.
+
+    :param max_header_size (int): limit of the header block in bytes.
+    :param max_body_size (int): limit of the (decoded) body in bytes.
+    :param spool_size (int): bodies larger than this are returned as a spooled
+        file; ``None`` keeps every body in memory.
+    """
+
+    __attrs__ = [
+        "buffer",
+        "max_header_size",
+        "max_body_size",
+        "spool_size",
+    ]
+
+    def __init__(self, max_header_size=MAX_HEADER_SIZE, max_body_size=MAX_BODY_SIZE,
+                 spool_size=SPOOL_SIZE):
+        #: Bytes received but not consumed yet.
+        self.buffer = bytearray()
+        self.max_header_size = max_header_size
+        self.max_body_size = max_body_size
+        self.spool_size = spool_size
+        #: ``time.monotonic()`` when the first byte of the last framed request arrived.
+        self.received_at = None
+        self._reset()
+
+    def _reset(self):
+        """Forgets the state of the message being framed."""
+        # Offset where the search for the header terminator resumes.
+        self._scan = 0
+        # Header block of the current message once it is complete.
+        self._head = None
+        # Declared body length, or None for chunked bodies.
+        self._length = 0
+        # Decoded chunked body (the part not spooled yet).
+        self._body = None
+        # Temporary file receiving a large body.
+        self._spool = None
+        # Whether the client waits for 100 Continue before sending the body.
+        self._expect = False
+        # Arrival of the first byte of the current message (pipelined: now)
+        self._started = time.monotonic() if self.buffer else None
+
+    def feed(self, data):
+        """
+        Appends received bytes.
+
+        :param data (bytes | memoryview): bytes read from the connection.
+        """
+        if self._started is None:
+            self._started = time.monotonic()
+        self.buffer += data
+
+    def in_progress(self):
+        """
+        Tells whether part of a request has been received.
+
+        :rtype bool: ``True`` if bytes of an unfinished request are buffered.
+        """
+        return bool(self.buffer) or self._head is not None
+
+    def continue_needed(self):
+        """
+        Tells, once per request, that the client sent ``Expect: 100-continue``
+        and waits for :data:`CONTINUE` before sending the body.
+
+        :rtype bool: ``True`` if the interim response must be sent now.
+        """
+        if self._expect:
+            self._expect = False
+            return True
+        return False
+
+    def next_message(self):
+        """
+        Extracts the next complete request from the buffer.
+
+        :rtype tuple: ``(head, body)``, or ``None`` if more data is needed.
+            ``body`` is ``bytes``, or a spooled file positioned at its start
+            when larger than :attr:`spool_size`.
+
+        :raises FramingError: If the request is malformed or exceeds a limit.
+        """
+        if self._head is None and not self._parse_head():
+            return None
+
+        if self._length is None:
+            if not self._parse_chunks():
+                return None
+            if self._spool is not None:
+                self._spool.write(self._body)
+                head = _dechunk_head(self._head, self._spool.tell())
+                body = self._spool
+                body.seek(0)
+            else:
+                head = _dechunk_head(self._head, len(self._body))
+                body = bytes(self._body)
+        elif self._spool is not None:
+            if not self._fill_spool():
+                return None
+            head = self._head
+            body = self._spool
+            body.seek(0)
+        else:
+            if len(self.buffer) < self._length:
+                return None
+            head = self._head
+            body = bytes(self.buffer[:self._length])
+            del self.buffer[:self._length]
+
+        self.received_at = self._started
+        self._reset()
+        return head, body
+
+    def next_head(self):
+        """
+        Extracts the next complete header block only. The body is left in
+        :attr:`buffer`, to be relayed as received with a :class:`BodyFramer`;
+        the framer then expects a new message after it.
+
+        :rtype tuple: ``(head, length)``, ``length`` being as for
+            :class:`BodyFramer`, or ``None`` if more data is needed.
+
+        :raises FramingError: If the header block is malformed or exceeds a limit.
+        """
+        if self._head is None and not self._parse_head():
+            return None
+        head, length, expect = self._head, self._length, self._expect
+        self.received_at = self._started
+        self._reset()
+        # Still reported by continue_needed()
+        self._expect = expect
+        return head, length
+
+    def _parse_head(self):
+        """Locates the header terminator and reads the body framing headers."""
+        buf = self.buffer
+        end = buf.find(b"\r\n\r\n", self._scan)
+        if end < 0:
+            if len(buf) > self.max_header_size:
+                raise HeaderTooLarge("header block exceeds {} bytes".format(self.max_header_size))
+            self._scan = max(0, len(buf) - 3)
+            return False
+
+        end += 4
+        if end > self.max_header_size:
+            raise HeaderTooLarge("header block exceeds {} bytes".format(self.max_header_size))
+
+        head = bytes(buf[:end])
+        del buf[:end]
+
+        length = self._body_length(head)
+        if length is not None and length > self.max_body_size:
+            raise BodyTooLarge("body exceeds {} bytes".format(self.max_body_size))
+
+        self._head = head
+        self._length = length
+        if length is None:
+            self._body = bytearray()
+        elif self.spool_size is not None and length > self.spool_size:
+            self._spool = tempfile.SpooledTemporaryFile(max_size=self.spool_size)
+        self._expect = (length != 0 and b"\r\nexpect: 100-continue" in head.lower()
+                        and head.split(b"\r\n", 1)[0].endswith(b"/1.1"))
+        return True
+
+    def _body_length(self, head):
+        """
+        Reads the body framing headers of a header block.
+
+        :param head (bytes): complete header block.
+
+        :rtype int: the declared ``Content-Length`` (0 when absent), or
+            ``None`` for a chunked body.
+        """
+        length = 0
+        for line in head.split(b"\r\n")[1:]:
+            name, sep, value = line.partition(b":")
+            if not sep:
+                continue
+            name = name.strip().lower()
+            if name == b"transfer-encoding" and b"chunked" in value.lower():
+                return None
+            if name == b"content-length":
+                length = _content_length(value)
+        return length
+
+    def _fill_spool(self):
+        """Moves buffered body bytes to the spool; True once the body is complete."""
+        buf = self.buffer
+        take = min(self._length - self._spool.tell(), len(buf))
+        if take:
+            self._spool.write(buf[:take])
+            del buf[:take]
+        return self._spool.tell() == self._length
+
+    def _parse_chunks(self):
+        """Decodes as many complete chunks as buffered; True once the last one is read."""
+        buf = self.buffer
+        while True:
+            line_end = buf.find(b"\r\n")
+            if line_end < 0:
+                if len(buf) > MAX_CHUNK_LINE:
+                    raise FramingError("chunk size line too long")
+                return False
+
+            size_field = bytes(buf[:line_end]).split(b";", 1)[0].strip()
+            try:
+                size = int(size_field, 16)
+            except ValueError:
+                raise FramingError("invalid chunk size {!r}".format(size_field))
+
+            if size == 0:
+                # Last chunk: skip optional trailers up to the blank line.
+                if buf[line_end + 2:line_end + 4] == b"\r\n":
+                    del buf[:line_end + 4]
+                    return True
+                trailer_end = buf.find(b"\r\n\r\n", line_end + 2)
+                if trailer_end < 0:
+                    return False
+                del buf[:trailer_end + 4]
+                return True
+
+            spooled = self._spool.tell() if self._spool is not None else 0
+            if spooled + len(self._body) + size > self.max_body_size:
+                raise BodyTooLarge("body exceeds {} bytes".format(self.max_body_size))
+
+            start = line_end + 2
+            if len(buf) < start + size + 2:
+                return False
+            self._body += buf[start:start + size]
+            del buf[:start + size + 2]
+
+            if self.spool_size is not None and len(self._body) > self.spool_size:
+                if self._spool is None:
+                    self._spool = tempfile.SpooledTemporaryFile(max_size=self.spool_size)
+                self._spool.write(self._body)
+                self._body.clear()
+
+
+def _content_length(value):
+    """
+    :param value (bytes): ``Content-Length`` header value.
+
+    :rtype int: the parsed length.
+
+    :raises FramingError: If the value is not a non-negative integer.
+    """
+    try:
+        length = int(value.strip())
+    except ValueError:
+        raise FramingError("invalid Content-Length {!r}".format(value))
+    if length < 0:
+        raise FramingError("negative Content-Length")
+    return length
+
+
+class ResponseFramer(RequestFramer):
+    """
+    Sans-IO incremental framer of the responses of an upstream server.
+
+    Bodies are framed by ``Content-Length`` or chunked coding as for requests.
+    Responses to ``HEAD`` and ``1xx``/``204``/``304`` responses have no body;
+    interim ``1xx`` responses are skipped. A response with neither header
+    ends when the server closes the connection, see :meth:`finish`.
+
+    :param max_header_size (int): limit of the header block in bytes.
+    :param max_body_size (int): limit of the (decoded) body in bytes.
+    :param spool_size (int): bodies larger than this are returned as a spooled
+        file; ``None`` keeps every body in memory.
+
+    :attrs method (str): method of the request the next response answers.
+    :attrs status (int): status code of the last response head.
+    :attrs keep_alive (bool): whether the server keeps the connection open
+        after the last response.
+    """
+
+    def __init__(self, max_header_size=MAX_HEADER_SIZE, max_body_size=MAX_RESPONSE_SIZE,
+                 spool_size=None):
+        super().__init__(max_header_size, max_body_size, spool_size)
+        self.method = "GET"
+        self.status = None
+        self.keep_alive = True
+
+    def next_message(self):
+        while True:
+            if self._head is None and not self._parse_head():
+                return None
+            if self.status >= 200 or self.status == 101:
+                break
+            # Interim response (100 Continue, 103 Early Hints): skip it
+            self._reset()
+
+        if self._length == UNTIL_CLOSE:
+            if len(self.buffer) > self.max_body_size:
+                raise BodyTooLarge("body exceeds {} bytes".format(self.max_body_size))
+            return None
+        return super().next_message()
+
+    def next_head(self):
+        while True:
+            message = super().next_head()
+            if message is None or self.status >= 200 or self.status == 101:
+                return message
+            # Interim response: its head is dropped, see next_message()
+
+    def finish(self):
+        """
+        Completes the response once the server closed the connection.
+
+        :rtype tuple: ``(head, body)`` of a response delimited by the end of
+            the connection, or ``None`` if no response was in progress.
+
+        :raises FramingError: If the connection closed mid-response.
+        """
+        if self._head is None and not self._parse_head():
+            if self.buffer:
+                raise FramingError("connection closed mid-response")
+            return None
+        if self._length != UNTIL_CLOSE:
+            raise FramingError("connection closed mid-response")
+        head, body = self._head, bytes(self.buffer)
+        self.buffer.clear()
+        self._reset()
+        return head, body
+
+    def _body_length(self, head):
+        status_line = head.split(b"\r\n", 1)[0].split(None, 2)
+        try:
+            self.status = int(status_line[1])
+        except (IndexError, ValueError):
+            raise FramingError("malformed status line {!r}".format(head[:64]))
+
+        length = UNTIL_CLOSE
+        connection = b""
+        for line in head.split(b"\r\n")[1:]:
+            name, sep, value = line.partition(b":")
+            if not sep:
+                continue
+            name = name.strip().lower()
+            if name == b"transfer-encoding" and b"chunked" in value.lower():
+                length = None
+            elif name == b"content-length" and length is not None:
+                length = _content_length(value)
+            elif name == b"connection":
+                connection = value.strip().lower()
+
+        if status_line[0] == b"HTTP/1.0":
+            self.keep_alive = b"keep-alive" in connection
+        else:
+            self.keep_alive = b"close" not in connection
+        if self.status < 200 or self.status in (204, 304) or self.method == "HEAD":
+            return 0
+        if length == UNTIL_CLOSE:
+            self.keep_alive = False
+        return length
+
+
+def _dechunk_head(head, length):
+    """
+    Rewrites a chunked header block to declare the decoded body length.
+
+    :param head (bytes): original header block.
+    :param length (int): decoded body length.
+
+    :rtype bytes: header block with ``Content-Length`` instead of ``Transfer-Encoding``.
+    """
+    lines = [line for line in head[:-4].split(b"\r\n")
+             if not line.lower().startswith((b"transfer-encoding:", b"content-length:"))]
+    lines.append(b"Content-Length: %d" % length)
+    return b"\r\n".join(lines) + b"\r\n\r\n"
+
+
+class BodyFramer:
+    """
+    Sans-IO tracker of the end of a body relayed as it arrives. The bytes are
+    passed on unchanged, chunked coding included, and only counted: memory
+    does not depend on the size of the body.
+
+    :param length (int): the declared ``Content-Length``, ``None`` for a
+        chunked body, or :data:`UNTIL_CLOSE` for a response delimited by the
+        end of the connection.
+    :param max_size (int): limit of the body bytes as sent, chunk framing
+        included; ``None`` for no limit.
+
+    :attrs received (int): body bytes seen so far.
+    :attrs done (bool): whether the whole body has been seen.
+    """
+
+    __slots__ = ("length", "max_size", "received", "done", "_remaining", "_line", "_trailers")
+
+    def __init__(self, length, max_size=None):
+        self.length = length
+        self.max_size = max_size
+        self.received = 0
+        self.done = length == 0
+        # Chunk data and CRLF left of the current chunk
+        self._remaining = 0
+        # Start of a chunk size line or trailer line split across reads
+        self._line = bytearray()
+        self._trailers = False
+
+    def feed(self, data):
+        """
+        Accounts for received bytes.
+
+        :param data (bytes | bytearray | memoryview): bytes read from the peer.
+
+        :rtype int: how many leading bytes of ``data`` belong to the body;
+            the others follow the message.
+
+        :raises FramingError: If the chunked coding is malformed.
+        :raises BodyTooLarge: If the body exceeds :attr:`max_size`.
+        """
+        if self.done:
+            return 0
+        length = self.length
+        if length is None:
+            n = self._feed_chunks(data)
+        elif length == UNTIL_CLOSE:
+            n = len(data)
+        else:
+            n = min(len(data), length - self.received)
+            self.done = self.received + n == length
+        self.received += n
+        if self.max_size is not None and self.received > self.max_size:
+            raise BodyTooLarge("body exceeds {} bytes".format(self.max_size))
+        return n
+
+    def _feed_chunks(self, data):
+        """Follows the chunked coding over ``data``; returns the bytes consumed."""
+        pos = 0
+        end = len(data)
+        while pos < end:
+            if self._remaining:
+                take = min(self._remaining, end - pos)
+                self._remaining -= take
+                pos += take
+                continue
+
+            # A size or trailer line; only its start is copied
+            window = bytes(data[pos:pos + MAX_CHUNK_LINE + 2 - len(self._line)])
+            line_end = window.find(b"\n")
+            if line_end < 0:
+                self._line += window
+                if len(self._line) > MAX_CHUNK_LINE:
+                    raise FramingError("chunk size line too long")
+                pos += len(window)
+                continue
+            line = bytes(self._line + window[:line_end]).rstrip(b"\r")
+            self._line.clear()
+            pos += line_end + 1
+
+            if self._trailers:
+                if not line:
+                    self.done = True
+                    return pos
+                continue
+            size_field = line.split(b";", 1)[0].strip()
+            try:
+                size = int(size_field, 16)
+            except ValueError:
+                raise FramingError("invalid chunk size {!r}".format(size_field))
+            if size == 0:
+                # Last chunk: optional trailers up to the blank line
+                self._trailers = True
+            else:
+                self._remaining = size + 2
+        return pos
+
+
+class RequestReader:
+    """
+    Reads complete requests from a blocking socket.
+
+    :param conn (socket.socket): the client connection.
+    :param max_header_size (int): limit of the header block in bytes.
+    :param max_body_size (int): limit of the body in bytes.
+    :param spool_size (int): bodies larger than this are spooled to a file.
+    """
+
+    __attrs__ = [
+        "conn",
+        "framer",
+        "received",
+    ]
+
+    def __init__(self, conn, max_header_size=MAX_HEADER_SIZE, max_body_size=MAX_BODY_SIZE,
+                 spool_size=SPOOL_SIZE):
+        self.conn = conn
+        self.framer = RequestFramer(max_header_size, max_body_size, spool_size)
+        #: Bytes received on the connection.
+        self.received = 0
+        self._chunk = bytearray(RECV_SIZE)
+        self._view = memoryview(self._chunk)
+
+    def read_message(self):
+        """
+        Blocks until a complete request is framed.
+
+        Clients waiting on ``Expect: 100-continue`` are sent :data:`CONTINUE`.
+
+        :rtype tuple: ``(head, body)`` as returned by
+            :meth:`RequestFramer.next_message`, or ``None`` when the peer closed
+            the connection between requests.
+
+        :raises FramingError: If the request is malformed, truncated or too large.
+        """
+        while True:
+            message = self.framer.next_message()
+            if message is not None:
+                return message
+            if self.framer.continue_needed():
+                self.conn.sendall(CONTINUE)
+
+            n = self.conn.recv_into(self._chunk)
+            if n == 0:
+                if self.framer.in_progress():
+                    raise FramingError("connection closed mid-request")
+                return None
+            self.received += n
+            self.framer.feed(self._view[:n])
+
+    def read_head(self):
+        """
+        Blocks until the header block of a request is framed, for relaying:
+        the body bytes received with it stay in ``framer.buffer``, and the
+        rest is read with :meth:`recv_into`. Clients waiting on
+        ``Expect: 100-continue`` are sent :data:`CONTINUE`.
+
+        :rtype tuple: ``(head, length)`` as returned by
+            :meth:`RequestFramer.next_head`, or ``None`` when the peer closed
+            the connection between requests.
+
+        :raises FramingError: If the header block is malformed, truncated or
+            too large.
+        """
+        while True:
+            message = self.framer.next_head()
+            if message is not None:
+                if self.framer.continue_needed():
+                    self.conn.sendall(CONTINUE)
+                return message
+
+            n = self.conn.recv_into(self._chunk)
+            if n == 0:
+                if self.framer.in_progress():
+                    raise FramingError("connection closed mid-request")
+                return None
+            self.received += n
+            self.framer.feed(self._view[:n])
+
+    def recv_into(self, buffer):
+        """
+        Reads the next bytes of a relayed body: those buffered with the head
+        first, then from the socket.
+
+        :param buffer (bytearray): destination.
+
+        :rtype int: bytes read, ``0`` when the peer closed the connection.
+        """
+        pending = self.framer.buffer
+        if pending:
+            n = min(len(pending), len(buffer))
+            buffer[:n] = pending[:n]
+            del pending[:n]
+            return n
+        n = self.conn.recv_into(buffer)
+        self.received += n
+        return n
+
+    def pending(self):
+        """
+        Returns the next request already buffered, without touching the socket.
+
+        :rtype tuple: ``(head, body)``, or ``None``.
+        """
+        return self.framer.next_message()
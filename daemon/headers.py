@@ -0,0 +1,148 @@
+#
+# Copyright (C) 2025 pdnguyen of HCMC University of Technology VNU-HCM.
+# All rights reserved.
+# This file is part of the CO3093/CO3094 course.
+#
+# WeApRous release
+#
+# The authors hereby grant to Licensee personal permission to use
+# and modify the Licensed Source Code for the sole purpose of studying
+# while attending the course
+#
+
+"""
+daemon.headers
+~~~~~~~~~~~~~~~~~
+
+This module provides the response header building used by :class:`Response <Response>`.
+The invariant part of a header block (status line, ``Content-Type``,
+``Content-Encoding``) is encoded once per combination and memoized, and the
+``Date`` header is formatted at most once per second. Building a response head
+is then a join of a few ready-made byte strings; responses with a constant body
+(404, 405, ...) are memoized whole except for the ``Date`` line.
+
+Usage Example:
+--------------
+>>> build_head("200 OK", "text/plain", 2, keep_alive=True)
+b'HTTP/1.1 200 OK\\r\\nContent-Type: text/plain\\r\\nDate: ...\\r\\nContent-Length: 2\\r\\nConnection: keep-alive\\r\\n\\r\\n'
+
+"""
+
+import functools
+import time
+from email.utils import formatdate
+
+#: ``Connection`` header lines indexed by ``keep_alive``.
+CONNECTION = (b"Connection: close\r\n", b"Connection: keep-alive\r\n")
+
+# Second of the cached Date header and its encoded line.
+_date_second = 0
+_date_line = b""
+
+
+def date_header():
+    """
+    Returns the ``Date`` header line for the current second.
+
+    :rtype bytes: e.g. ``b"Date: Mon, 01 Jan 2025 00:00:00 GMT\\r\\n"``.
+    """
+    global _date_second, _date_line
+    now = int(time.time())
+    if now != _date_second:
+        # A racing thread at worst formats the same second twice.
+        _date_line = "Date: {}\r\n".format(formatdate(now, usegmt=True)).encode('ascii')
+        _date_second = now
+    return _date_line
+
+
+@functools.lru_cache(maxsize=64)
+def status_line(status):
+    """
+    :param status (str): status code and reason phrase, e.g. ``"404 Not Found"``.
+
+    :rtype bytes: the encoded status line.
+    """
+    return "HTTP/1.1 {}\r\n".format(status).encode('utf-8')
+
+
+@functools.lru_cache(maxsize=256)
+def header_template(status, content_type, encoding=None):
+    """
+    Returns the invariant start of a header block, encoded once per argument
+    combination.
+
+    :param status (str): status code and reason phrase.
+    :param content_type (str): ``Content-Type`` value, ``None`` to omit it.
+    :param encoding (str): ``Content-Encoding`` value, ``None`` to omit it.
+
+    :rtype bytes: status line followed by the content headers.
+    """
+    head = status_line(status)
+    if content_type:
+        head += "Content-Type: {}\r\n".format(content_type).encode('utf-8')
+    if encoding:
+        head += "Content-Encoding: {}\r\n".format(encoding).encode('utf-8')
+    return head
+
+
+def format_headers(headers, encoding='utf-8'):
+    """
+    Encodes extra header fields.
+
+    :param headers (dict | Headers): header name -> value; every value of a
+        repeated field of a :class:`Headers <Headers>` is written.
+    :param encoding (str): encoding of the header lines.
+
+    :rtype bytes: one CRLF terminated line per header.
+    """
+    fields = headers.multi_items() if hasattr(headers, 'multi_items') else headers.items()
+    return "".join("{}: {}\r\n".format(k, v) for k, v in fields).encode(encoding)
+
+
+def build_head(status, content_type, length, keep_alive, extra=b"", encoding=None):
+    """
+    Builds a complete response header block.
+
+    :param status (str): status code and reason phrase.
+    :param content_type (str): ``Content-Type`` value, ``None`` to omit it.
+    :param length (int): ``Content-Length`` value, ``None`` to omit it.
+    :param keep_alive (bool): whether the connection stays open.
+    :param extra (bytes): additional encoded header lines, see :func:`format_headers`.
+    :param encoding (str): ``Content-Encoding`` value, ``None`` to omit it.
+
+    :rtype bytes: header block terminated by the blank line.
+    """
+    return b"".join((
+        header_template(status, content_type, encoding),
+        date_header(),
+        b"" if length is None else b"Content-Length: %d\r\n" % length,
+        extra,
+        CONNECTION[keep_alive],
+        b"\r\n",
+    ))
+
+
+@functools.lru_cache(maxsize=256)
+def _fixed_parts(status, content_type, body, keep_alive, extra):
+    """The parts of a fixed response around its Date line."""
+    return (header_template(status, content_type),
+            b"".join((b"Content-Length: %d\r\n" % len(body), extra,
+                      CONNECTION[keep_alive], b"\r\n", body)))
+
+
+def fixed_response(status, content_type, body, keep_alive, extra=b""):
+    """
+    Builds a complete response with a constant body (404, 405, 401, ...).
+    Everything but the ``Date`` line is encoded once and memoized.
+
+    :param status (str): status code and reason phrase.
+    :param content_type (str): ``Content-Type`` value.
+    :param body (bytes): response body.
+    :param keep_alive (bool): whether the connection stays open.
+    :param extra (bytes): additional encoded header lines.
+
+    :rtype bytes: the encoded response.
+    """
+    head, tail = _fixed_parts(status, content_type, body, keep_alive, extra)
+    return b"".join((head, date_header(), tail))
+
@@ -0,0 +1,254 @@
+#
+# Copyright (C) 2025 pdnguyen of HCMC University of Technology VNU-HCM.
+# All rights reserved.
+# This file is part of the CO3093/CO3094 course.
+#
+# WeApRous release
+#
+# The authors hereby grant to Licensee personal permission to use
+# and modify the Licensed Source Code for the sole purpose of studying
+# while attending the course
+#
+
+"""
+daemon.health
+~~~~~~~~~~~~~~~~~
+
+This module provides the active health checks of the proxy upstreams. A
+virtual host configured with ``health_check`` has its upstreams probed in the
+background by a :class:`HealthChecker`: every ``interval`` seconds a
+``GET <uri>`` is sent on a new connection, and a ``2xx`` or ``3xx`` answer
+within ``timeout`` seconds passes. An upstream is taken out of rotation after
+``fails`` failed probes in a row and put back after ``passes`` passed ones.
+
+Each backend address is probed by one thread, whatever the number of virtual
+hosts balancing over it, so a slow or dead backend never delays the probes of
+the others. Upstreams start healthy; the passive ejection of
+:mod:`daemon.balancer` covers the time before the first failed probes.
+
+With pre-forked workers the probes run once, in the master: a ``shared``
+checker keeps the health of each backend in memory shared with the workers,
+and each worker applies the changes to its balancers with :meth:`follow
+<HealthChecker.follow>`. The passive ejection stays per worker.
+
+Usage Example:
+--------------
+>>> balancer = create_balancer(["10.0.0.2:9002", "10.0.0.3:9003"], "round-robin",
+...                            "uri=/health interval=2 fails=2 passes=1")
+>>> checker = HealthChecker([balancer])
+>>> checker.start()
+>>> checker.stop()
+
+With pre-forked workers:
+
+>>> checker = HealthChecker([balancer], shared=True)
+>>> checker.start()     # in the master
+>>> checker.follow()    # in each worker
+
+"""
+
+import mmap
+import socket
+import threading
+
+from .log import get_logger
+
+log = get_logger(__name__)
+
+#: Path probed by default.
+URI = "/"
+#: Default seconds between two probes of an upstream.
+INTERVAL = 5.0
+#: Default seconds a probe may take, connection included.
+TIMEOUT = 2.0
+#: Default failed probes in a row that take an upstream out of rotation.
+FAILS = 3
+#: Default passed probes in a row that put it back.
+PASSES = 2
+#: Seconds between two reads of the shared health by :meth:`HealthChecker.follow`.
+FOLLOW_INTERVAL = 0.5
+
+
+class HealthCheck:
+    """
+    The settings of the active health check of a virtual host.
+
+    :param uri (str): path requested by the probes.
+    :param interval (float): seconds between two probes.
+    :param timeout (float): seconds a probe may take.
+    :param fails (int): failed probes in a row marking an upstream unhealthy.
+    :param passes (int): passed probes in a row marking it healthy again.
+    """
+
+    __slots__ = ("uri", "interval", "timeout", "fails", "passes")
+
+    def __init__(self, uri=URI, interval=INTERVAL, timeout=TIMEOUT, fails=FAILS, passes=PASSES):
+        self.uri = uri
+        self.interval = interval
+        self.timeout = timeout
+        self.fails = fails
+        self.passes = passes
+
+    def _key(self):
+        return (self.uri, self.interval, self.timeout, self.fails, self.passes)
+
+    def __eq__(self, other):
+        return isinstance(other, HealthCheck) and self._key() == other._key()
+
+    def __hash__(self):
+        return hash(self._key())
+
+    def __repr__(self):
+        return "HealthCheck(uri={!r}, interval={!r}, timeout={!r}, fails={!r}, passes={!r})".format(
+            *self._key())
+
+
+def parse_health_check(spec):
+    """
+    Parses a ``health_check`` value.
+
+    :param spec (str): space separated ``uri=/path``, ``interval=S``,
+        ``timeout=S`` (seconds, ``5`` or ``5s``), ``fails=N`` and
+        ``passes=N``; an empty value keeps every default.
+
+    :rtype HealthCheck: the settings.
+
+    :raises ValueError: If a parameter is unknown or invalid.
+    """
+    check = HealthCheck()
+    for param in spec.split():
+        name, _, value = param.partition("=")
+        try:
+            if name == "uri" and value.startswith("/"):
+                check.uri = value
+            elif name in ("interval", "timeout") and float(value.rstrip("s")) > 0:
+                setattr(check, name, float(value.rstrip("s")))
+            elif name in ("fails", "passes") and int(value) > 0:
+                setattr(check, name, int(value))
+            else:
+                raise ValueError
+        except ValueError:
+            raise ValueError("Invalid health_check parameter {!r}".format(param)) from None
+    return check
+
+
+def probe(host, port, uri=URI, timeout=TIMEOUT):
+    """
+    Sends one health check request.
+
+    :param host (str): backend IP address or name.
+    :param port (int): backend port.
+    :param uri (str): path requested.
+    :param timeout (float): seconds allowed for the connection and the answer.
+
+    :rtype bool: ``True`` if the backend answered with a ``2xx`` or ``3xx``
+        status.
+    """
+    request = ("GET {} HTTP/1.1\r\nHost: {}:{}\r\nUser-Agent: WeApRous-health\r\n"
+               "Connection: close\r\n\r\n").format(uri, host, port).encode('latin-1')
+    try:
+        with socket.create_connection((host, port), timeout) as sock:
+            sock.settimeout(timeout)
+            sock.sendall(request)
+            data = b""
+            # The status code ends at byte 12 of "HTTP/1.1 200 OK"
+            while len(data) < 12:
+                chunk = sock.recv(64)
+                if not chunk:
+                    break
+                data += chunk
+    except OSError:
+        return False
+    return data.startswith(b"HTTP/") and data[9:10] in (b"2", b"3")
+
+
+class HealthChecker:
+    """
+    Probes the upstreams of the balancers that have a ``health_check`` and
+    reports the results with :meth:`Balancer.set_healthy <Balancer.set_healthy>`.
+
+    :param balancers (iterable): :class:`Balancer <Balancer>` objects; those
+        without a health check are ignored.
+    :param shared (bool): keep the health of the backends in memory shared
+        with the processes forked afterwards, see :meth:`follow`.
+    """
+
+    __attrs__ = [
+        "targets",
+    ]
+
+    def __init__(self, balancers, shared=False):
+        #: ``(host, port, check)`` -> ``[(balancer, upstream), ...]`` probed together.
+        self.targets = {}
+        for balancer in balancers:
+            if balancer.health_check is None:
+                continue
+            for upstream in balancer.upstreams:
+                key = (upstream.host, upstream.port, balancer.health_check)
+                self.targets.setdefault(key, []).append((balancer, upstream))
+        # One byte per target, 1 while healthy
+        size = len(self.targets)
+        self._states = mmap.mmap(-1, max(size, 1)) if shared else bytearray(size)
+        self._states[:size] = b"\x01" * size
+        self._stopped = threading.Event()
+        self._threads = []
+
+    def start(self):
+        """Starts one daemon thread per probed backend."""
+        for index, ((host, port, check), members) in enumerate(self.targets.items()):
+            t = threading.Thread(target=self._run, args=(index, host, port, check, members),
+                                 name="health-{}:{}".format(host, port), daemon=True)
+            t.start()
+            self._threads.append(t)
+        if self.targets:
+            log.info("health checks started", backends=len(self.targets))
+
+    def follow(self):
+        """
+        Starts a daemon thread applying the health published by the probes
+        of another process (a ``shared`` checker started in the pre-fork
+        master) to the balancers of this process.
+        """
+        if not self.targets:
+            return
+        t = threading.Thread(target=self._follow, name="health-follow", daemon=True)
+        t.start()
+        self._threads.append(t)
+
+    def stop(self):
+        """Stops the probes and waits for the threads."""
+        self._stopped.set()
+        for t in self._threads:
+            t.join()
+        self._threads = []
+
+    def _follow(self):
+        applied = [1] * len(self.targets)
+        while not self._stopped.is_set():
+            for index, members in enumerate(self.targets.values()):
+                healthy = self._states[index]
+                if healthy != applied[index]:
+                    applied[index] = healthy
+                    for balancer, upstream in members:
+                        balancer.set_healthy(upstream, bool(healthy))
+            self._stopped.wait(FOLLOW_INTERVAL)
+
+    def _run(self, index, host, port, check, members):
+        healthy = True
+        streak = 0
+        while not self._stopped.is_set():
+            passed = probe(host, port, check.uri, check.timeout)
+            # Count the probes contradicting the current state
+            streak = streak + 1 if passed != healthy else 0
+            if streak >= (check.passes if passed else check.fails):
+                healthy = passed
+                streak = 0
+                self._states[index] = healthy
+                if passed:
+                    log.info("health check passed", backend="{}:{}".format(host, port))
+                else:
+                    log.warning("health check failed", backend="{}:{}".format(host, port),
+                                uri=check.uri)
+                for balancer, upstream in members:
+                    balancer.set_healthy(upstream, healthy)
+            self._stopped.wait(check.interval)
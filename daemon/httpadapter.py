@@ -20,9 +20,41 @@ raw URL paths and RESTful route definitions, and integrates with
 Request and Response objects to handle client-server communication.
 """
 
+import asyncio
+import functools
+import inspect
+import socket
+import time
+
 from .request import Request
 from .response import Response
 from .dictionary import CaseInsensitiveDict
+from . import metrics
+from .log import get_logger
+from .framing import RequestReader, FramingError, MAX_HEADER_SIZE, MAX_BODY_SIZE, SPOOL_SIZE
+
+log = get_logger(__name__)
+
+#: Maximum bytes discarded while lingering on a rejected connection.
+LINGER_BYTES = 1024 * 1024
+
+
+def linger_close(conn, timeout=1.0):
+    """
+    Half-closes a connection and discards what the client is still sending,
+    so that an early error response is not lost to a TCP reset.
+
+    :param conn (socket): The client socket connection.
+    :param timeout (float): Seconds to wait for each read.
+    """
+    conn.shutdown(socket.SHUT_WR)
+    conn.settimeout(timeout)
+    discarded = 0
+    while discarded < LINGER_BYTES:
+        data = conn.recv(65536)
+        if not data:
+            break
+        discarded += len(data)
 
 class HttpAdapter:
     """
@@ -42,8 +74,24 @@ class HttpAdapter:
         routes (dict): Mapping of route paths to handler functions.
         request (Request): Request object for parsing incoming data.
         response (Response): Response object for building and sending replies.
+        keepalive_timeout (float): Seconds an idle persistent connection is kept.
+        max_requests (int): Requests served on one connection before closing it.
+        max_header_size (int): Limit of a request header block in bytes.
+        max_body_size (int): Limit of a request body in bytes.
+        spool_size (int): Request bodies larger than this are spooled to a file.
     """
 
+    #: Seconds an idle persistent connection waits for its next request.
+    keepalive_timeout = 5.0
+    #: Requests served on one connection before it is closed.
+    max_requests = 100
+    #: Limit of a request header block, larger ones get 431.
+    max_header_size = MAX_HEADER_SIZE
+    #: Limit of a request body, larger ones get 413.
+    max_body_size = MAX_BODY_SIZE
+    #: Request bodies larger than this are spooled to a temporary file.
+    spool_size = SPOOL_SIZE
+
     __attrs__ = [
         "ip",
         "port",
@@ -80,53 +128,266 @@ class HttpAdapter:
         #: Response
         self.response = Response()
 
-    def handle_client(self, conn, addr, routes):
+    def handle_client(self, conn, addr, routes, park=False):
         """
         Handle an incoming client connection.
 
-        This method reads the request from the socket, prepares the request object,
-        invokes the appropriate route handler if available, builds the response,
-        and sends it back to the client.
+        This method reads requests from the socket, prepares the request objects,
+        invokes the appropriate route handlers if available, builds the responses,
+        and sends them back to the client.
+
+        The connection is persistent (HTTP/1.1 keep-alive): requests are served
+        in a loop until the client asks for ``Connection: close``, stays idle for
+        :attr:`keepalive_timeout` seconds or reaches :attr:`max_requests`.
+        Pipelined requests already in the buffer are answered in order.
+
+        With ``park``, the method does not wait for the next request: once the
+        buffered requests are answered it returns, and the caller resumes the
+        connection when it becomes readable (see :class:`WorkerPool <WorkerPool>`).
 
         :param conn (socket): The client socket connection.
         :param addr (tuple): The client's address.
         :param routes (dict): The route mapping for dispatching requests.
+        :param park (bool): Hand the idle connection back to the caller.
+
+        :rtype tuple: ``(resume, close)`` when the idle connection is handed
+            back: ``resume(conn, addr)`` serves its next requests the same way
+            and ``close()`` closes it. ``None`` once the connection is closed.
         """
 
         # Connection handler.
         self.conn = conn
         # Connection address.
         self.connaddr = addr
-        # Request handler
-        req = self.request
-        # Response handler
-        resp = self.response
 
-        # Handle the request
-        msg = conn.recv(1024).decode()
-        req.prepare(msg, routes)
+        conn.settimeout(self.keepalive_timeout)
+        self._reader = RequestReader(conn, self.max_header_size, self.max_body_size,
+                                     self.spool_size)
+        self._served = 0
+        metrics.CONNECTIONS.inc()
+        metrics.ACTIVE_CONNECTIONS.inc()
+        return self._serve(conn, routes, park)
+
+    def _serve(self, conn, routes, park):
+        """
+        Serves the requests of :meth:`handle_client` until the connection is
+        closed, or is idle with ``park``.
+        """
+        reader = self._reader
+        keep_alive = True
+        parked = None
+        try:
+            while keep_alive:
+                message = reader.read_message()
+                if message is None:
+                    break
+
+                # Answer every complete (pipelined) request in order
+                out = bytearray()
+                while message is not None and keep_alive:
+                    self._served += 1
+                    now = time.monotonic()
+                    metrics.observe_stage("recv", now - reader.framer.received_at)
+                    out += self.handle_request(message, routes,
+                                               keep_alive=self._served < self.max_requests)
+                    if self.response.file_body is not None or self.response.stream_body is not None:
+                        # Flush headers, then stream the file body zero-copy or
+                        # send chunks as the handler yields them
+                        start = time.perf_counter()
+                        conn.sendall(out)
+                        sent = len(out)
+                        out.clear()
+                        if self.response.file_body is not None:
+                            sent += self.response.send_file(conn)
+                        else:
+                            sent += self.response.send_stream(conn)
+                        metrics.SENT_BYTES.inc(sent)
+                        metrics.observe_stage("send", time.perf_counter() - start)
+                    keep_alive = self.request.keep_alive
+                    message = reader.pending() if keep_alive else None
+
+                if out:
+                    start = time.perf_counter()
+                    conn.sendall(out) #deng: returns the response
+                    metrics.SENT_BYTES.inc(len(out))
+                    metrics.observe_stage("send", time.perf_counter() - start)
+
+                if park and keep_alive and not reader.framer.in_progress():
+                    # Idle between requests: give the thread back
+                    parked = (lambda conn, addr: self._serve(conn, routes, park)), self.close
+                    return parked
+        except FramingError as e:
+            try:
+                conn.sendall(Response().build_error(e.status))
+                linger_close(conn)
+            except OSError:
+                pass
+        except (socket.timeout, OSError):
+            pass
+        finally:
+            if parked is None:
+                self.close()
+        return None
+
+    def close(self):
+        """Closes the client connection of :meth:`handle_client`, once."""
+        if self.conn.fileno() < 0:
+            return
+        metrics.ACTIVE_CONNECTIONS.dec()
+        metrics.RECEIVED_BYTES.inc(self._reader.received)
+        self.conn.close() #deng: completes the response
+
+    def handle_request(self, msg, routes, keep_alive=True):
+        """
+        Process one complete request message and build its response.
+
+        This is the socket-independent half of :meth:`handle_client`, so that
+        other serving engines (e.g. the selector event loop) can reuse the same
+        request preparation, hook dispatching and response building.
+
+        :param msg (tuple): The framed ``(head, body)`` request message.
+        :param routes (dict): The route mapping for dispatching requests.
+        :param keep_alive (bool): ``False`` forces ``Connection: close`` even
+            if the client asked for a persistent connection.
+
+        :rtype bytes: The complete HTTP response.
+        """
+        req = self.prepare_request(msg, routes, keep_alive)
+        middleware = getattr(routes, 'middleware', ())
+        started = self.process_request(req, middleware)
 
         # Handle request hook (call route handler and capture result)
-        if req.hook:
+        if req.hook and req.hook_result is None:
             # try:
             #     print("[HttpAdapter] hook in route-path METHOD {} PATH {}".format(req.hook._route_path,req.hook._route_methods))
             # except Exception:
             #     pass
             try:
-                # provide real headers and body to the route handler
-                result = req.hook(headers=req.headers, body=req.body)
+                # provide real headers and body (or the request) to the route handler
+                args, kwargs = self.hook_arguments(req)
+                result = req.hook(*args, **kwargs)
+                # ``async def`` handlers are run to completion on this thread
+                if inspect.iscoroutine(result):
+                    result = asyncio.run(result)
                 # store result on request for the Response builder to use
                 req.hook_result = result
             except Exception as e:
-                print(f"[HttpAdapter] hook error: {e}")
-                req.hook_result = None
+                log.exception("hook error", method=req.method, path=req.path)
+                req.hook_error = e
 
         # Build response (may use hook_result if present)
-        response = resp.build_response(req)
+        return self.build_and_process(req, middleware, started)
 
-        #print(response)
-        conn.sendall(response) #deng: returns the response
-        conn.close() #deng: completes the response
+    async def handle_request_async(self, msg, routes, keep_alive=True, executor=None):
+        """
+        Coroutine counterpart of :meth:`handle_request` for the asyncio engine.
+
+        ``async def`` route handlers are awaited on the running loop; plain
+        handlers are run in ``executor`` so they cannot block the loop.
+
+        :param msg (tuple): The framed ``(head, body)`` request message.
+        :param routes (dict): The route mapping for dispatching requests.
+        :param keep_alive (bool): ``False`` forces ``Connection: close``.
+        :param executor (Executor): Executor for sync handlers, ``None`` for
+            the loop's default executor.
+
+        :rtype bytes: The complete HTTP response.
+        """
+        req = self.prepare_request(msg, routes, keep_alive)
+        middleware = getattr(routes, 'middleware', ())
+        started = self.process_request(req, middleware)
+
+        if req.hook and req.hook_result is None:
+            try:
+                args, kwargs = self.hook_arguments(req)
+                if inspect.iscoroutinefunction(req.hook):
+                    result = await req.hook(*args, **kwargs)
+                else:
+                    loop = asyncio.get_running_loop()
+                    result = await loop.run_in_executor(
+                        executor, functools.partial(req.hook, *args, **kwargs))
+                    if inspect.iscoroutine(result):
+                        result = await result
+                req.hook_result = result
+            except Exception as e:
+                log.exception("hook error", method=req.method, path=req.path)
+                req.hook_error = e
+
+        return self.build_and_process(req, middleware, started)
+
+    def process_request(self, req, middleware):
+        """
+        Records the prepare stage and runs the middlewares' request hooks. A
+        middleware returning a result answers the request in place of the
+        route handler.
+
+        :param req (Request): the prepared request.
+        :param middleware (list): :class:`Middleware <Middleware>` objects.
+
+        :rtype float: ``time.perf_counter()`` when the hook stage started.
+        """
+        now = time.perf_counter()
+        metrics.observe_stage("prepare", now - req.start_time)
+        for mw in middleware:
+            result = mw.process_request(req)
+            if result is not None:
+                req.hook_result = result
+                break
+        return now
+
+    def build_and_process(self, req, middleware, started):
+        """
+        Builds the response, records the hook and build stages and runs the
+        middlewares' response hooks in reverse order.
+
+        :param req (Request): the request.
+        :param middleware (list): :class:`Middleware <Middleware>` objects.
+        :param started (float): ``time.perf_counter()`` when the hook stage started.
+
+        :rtype bytes: The complete HTTP response.
+        """
+        built = time.perf_counter()
+        response = self.response.build_response(req)
+        now = time.perf_counter()
+        metrics.observe_stage("hook", built - started)
+        metrics.observe_stage("build", now - built)
+        for mw in reversed(middleware):
+            response = mw.process_response(req, response)
+        return response
+
+    @staticmethod
+    def hook_arguments(req):
+        """
+        Builds the arguments of a route handler call: ``(request,)`` for
+        handlers registered with ``with_request=True``, otherwise the
+        ``headers`` and ``body`` keywords. Path parameters are keywords.
+
+        :param req (Request): the prepared request.
+
+        :rtype tuple: ``(args, kwargs)``.
+        """
+        if getattr(req.hook, '_route_with_request', False):
+            return (req,), req.path_params
+        return (), dict(req.path_params, headers=req.headers, body=req.text)
+
+    def prepare_request(self, msg, routes, keep_alive=True):
+        """
+        Resets the request/response pair and prepares the request from ``msg``.
+
+        :param msg (tuple): The framed ``(head, body)`` request message.
+        :param routes (dict): The route mapping for dispatching requests.
+        :param keep_alive (bool): ``False`` forces ``Connection: close``.
+
+        :rtype Request: the prepared request.
+        """
+        self.request = Request()
+        self.response = Response()
+
+        req = self.request
+        req.start_time = time.perf_counter()
+        req.prepare(msg, routes)
+        req.keep_alive = req.keep_alive and keep_alive
+        return req
 
     @property
     def extract_cookie(self, req, resp):
@@ -0,0 +1,300 @@
+#
+# Copyright (C) 2025 pdnguyen of HCMC University of Technology VNU-HCM.
+# All rights reserved.
+# This file is part of the CO3093/CO3094 course.
+#
+# WeApRous release
+#
+# The authors hereby grant to Licensee personal permission to use
+# and modify the Licensed Source Code for the sole purpose of studying
+# while attending the course
+#
+
+"""
+daemon.log
+~~~~~~~~~~~~~~~~~
+
+This module provides the logging of the daemon package: leveled, structured
+records written as JSON lines by a background thread.
+
+Loggers returned by :func:`get_logger` take an event name and keyword fields.
+A call whose level is disabled returns after one cached level check; an
+enabled one only puts the record on a bounded queue. A :class:`QueueListener
+<logging.handlers.QueueListener>` thread formats and writes the records, so
+request threads never wait on stdout. When the writer falls behind and the
+queue is full, records are dropped and counted instead of blocking.
+
+Levels are set per module with :func:`configure`. Access logs are written by the
+:class:`AccessLogMiddleware` for a sampled fraction of requests. They are off
+by default, so requests do not pay for a record nobody asked for; turn them on
+with ``configure(access_sample=1.0)`` (or a fraction such as ``0.01``) or
+``app.run(access_sample=0.01)``.
+
+Usage Example:
+--------------
+>>> log = get_logger(__name__)
+>>> log.info("peer registered", peer="10.0.0.2:9001")
+{"ts": "2025-01-01T00:00:00.000Z", "level": "INFO", "logger": "daemon.tracker", "event": "peer registered", "peer": "10.0.0.2:9001"}
+>>> configure(level="WARNING", levels={"daemon.access": "INFO"}, access_sample=0.01)
+
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import time
+
+from .middleware import Middleware
+
+#: Name of the logger every daemon logger descends from.
+ROOT = "daemon"
+#: Default level of the daemon loggers.
+LEVEL = "INFO"
+#: Maximum records waiting for the writer; further records are dropped.
+QUEUE_SIZE = 10000
+#: Fraction of requests written to the access log, off until configured.
+ACCESS_SAMPLE = 0.0
+
+DEBUG = logging.DEBUG
+INFO = logging.INFO
+WARNING = logging.WARNING
+ERROR = logging.ERROR
+
+
+class JSONFormatter(logging.Formatter):
+    """Formats a record as one JSON object with its structured fields."""
+
+    def format(self, record):
+        entry = {
+            "ts": "{}.{:03d}Z".format(time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)),
+                                      int(record.msecs)),
+            "level": record.levelname,
+            "logger": record.name,
+            "event": record.getMessage(),
+        }
+        fields = getattr(record, "fields", None)
+        if fields:
+            entry.update(fields)
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """
+    Puts records on a bounded queue without formatting them; the writer
+    thread formats. Records are dropped when the queue is full.
+
+    :attrs dropped (int): records dropped so far.
+    """
+
+    def __init__(self, queue):
+        super().__init__(queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class Logger:
+    """
+    A structured logger: ``log.info("event", key=value, ...)``.
+
+    :param name (str): logger name below :data:`ROOT`.
+    """
+
+    __slots__ = ("logger",)
+
+    def __init__(self, name):
+        self.logger = logging.getLogger(name)
+
+    def enabled(self, level):
+        """
+        :param level (int): e.g. :data:`DEBUG`.
+
+        :rtype bool: ``True`` if records of this level are written.
+        """
+        return self.logger.isEnabledFor(level)
+
+    def log(self, level, event, exc_info=None, **fields):
+        """
+        Queues a record if its level is enabled.
+
+        :param level (int): record level.
+        :param event (str): what happened, a short constant message.
+        :param exc_info: exception information, as for :mod:`logging`.
+        :param fields: structured fields of the record.
+        """
+        if self.logger.isEnabledFor(level):
+            self.logger.log(level, event, exc_info=exc_info, extra={"fields": fields})
+
+    # The level check is repeated inline: forwarding ``**fields`` to
+    # :meth:`log` would cost more than the check itself.
+
+    def debug(self, event, **fields):
+        if self.logger.isEnabledFor(DEBUG):
+            self.logger.log(DEBUG, event, extra={"fields": fields})
+
+    def info(self, event, **fields):
+        if self.logger.isEnabledFor(INFO):
+            self.logger.log(INFO, event, extra={"fields": fields})
+
+    def warning(self, event, **fields):
+        if self.logger.isEnabledFor(WARNING):
+            self.logger.log(WARNING, event, extra={"fields": fields})
+
+    def error(self, event, **fields):
+        if self.logger.isEnabledFor(ERROR):
+            self.logger.log(ERROR, event, extra={"fields": fields})
+
+    def exception(self, event, **fields):
+        """Logs an error with the traceback of the exception being handled."""
+        if self.logger.isEnabledFor(ERROR):
+            self.logger.log(ERROR, event, exc_info=True, extra={"fields": fields})
+
+
+def _qualified(name):
+    """Places a logger name below :data:`ROOT`."""
+    if name == ROOT or name.startswith(ROOT + "."):
+        return name
+    return ROOT + "." + name
+
+
+def get_logger(name):
+    """
+    :param name (str): module name (``__name__``) or a short name such as
+        ``"tracker"``, placed below :data:`ROOT`.
+
+    :rtype Logger: the structured logger.
+    """
+    return Logger(_qualified(name))
+
+
+# Writer state: the queue handler and its listener thread.
+_handler = None
+_listener = None
+_settings = {"stream": None, "queue_size": QUEUE_SIZE}
+
+
+def _start_writer():
+    """(Re)creates the queue and starts the writer thread."""
+    global _handler, _listener
+    root = logging.getLogger(ROOT)
+    if _handler is not None:
+        root.removeHandler(_handler)
+
+    output = logging.StreamHandler(_settings["stream"] or sys.stdout)
+    output.setFormatter(JSONFormatter())
+    records = queue.Queue(_settings["queue_size"])
+    _handler = DroppingQueueHandler(records)
+    _listener = logging.handlers.QueueListener(records, output)
+    root.addHandler(_handler)
+    _listener.start()
+
+
+def _stop_writer():
+    """Writes the queued records and stops the writer thread."""
+    if _listener is not None and _listener._thread is not None:
+        _listener.stop()
+
+
+def _restart_in_child():
+    """The writer thread does not survive fork(); start a new one."""
+    global _listener
+    _listener = None
+    _start_writer()
+
+
+def configure(level=None, levels=None, stream=None, access_sample=None, queue_size=None):
+    """
+    Configures the daemon loggers. Arguments left to ``None`` keep their
+    current value.
+
+    :param level (str | int): level of the :data:`ROOT` logger, e.g. ``"INFO"``.
+    :param levels (dict): logger name -> level, e.g. ``{"daemon.proxy": "WARNING"}``.
+    :param stream (file): output of the writer, ``sys.stdout`` by default.
+    :param access_sample (float): fraction of requests written to the access
+        log, ``0`` (the default) to disable it.
+    :param queue_size (int): maximum records waiting for the writer.
+    """
+    global ACCESS_SAMPLE
+    root = logging.getLogger(ROOT)
+    if level is not None:
+        root.setLevel(level)
+    for name, name_level in (levels or {}).items():
+        logging.getLogger(_qualified(name)).setLevel(name_level)
+    if access_sample is not None:
+        ACCESS_SAMPLE = access_sample
+
+    if stream is not None or queue_size is not None or _handler is None:
+        if stream is not None:
+            _settings["stream"] = stream
+        if queue_size is not None:
+            _settings["queue_size"] = queue_size
+        _stop_writer()
+        _start_writer()
+
+
+def shutdown():
+    """
+    Writes the records still queued and stops the writer thread. Called at
+    exit; processes leaving with :func:`os._exit` call it first.
+    """
+    _stop_writer()
+
+
+def dropped():
+    """
+    :rtype int: records dropped because the writer queue was full.
+    """
+    return _handler.dropped if _handler is not None else 0
+
+
+_root = logging.getLogger(ROOT)
+_root.setLevel(LEVEL)
+_root.propagate = False
+configure()
+atexit.register(shutdown)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_restart_in_child)
+
+
+_access = get_logger("access")
+
+
+class AccessLogMiddleware(Middleware):
+    """
+    Writes one ``daemon.access`` record per sampled request.
+
+    :param sample (float): fraction of requests logged; ``None`` follows
+        :data:`ACCESS_SAMPLE` as set by :func:`configure`.
+    """
+
+    __attrs__ = [
+        "sample",
+    ]
+
+    def __init__(self, sample=None):
+        self.sample = sample
+
+    def process_response(self, request, response):
+        sample = ACCESS_SAMPLE if self.sample is None else self.sample
+        if sample <= 0 or not _access.enabled(INFO):
+            return response
+        if sample >= 1 or random.random() < sample:
+            _access.info("request", method=request.method, path=request.path,
+                         status=response[9:12].decode("ascii", "replace"),
+                         duration_ms=round((time.perf_counter() - request.start_time) * 1000, 3),
+                         user=request.user)
+        return response
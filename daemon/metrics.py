@@ -0,0 +1,361 @@
+#
+# Copyright (C) 2025 pdnguyen of HCMC University of Technology VNU-HCM.
+# All rights reserved.
+# This file is part of the CO3093/CO3094 course.
+#
+# WeApRous release
+#
+# The authors hereby grant to Licensee personal permission to use
+# and modify the Licensed Source Code for the sole purpose of studying
+# while attending the course
+#
+
+"""
+daemon.metrics
+~~~~~~~~~~~~~~~~~
+
+This module provides the server metrics exposed in the Prometheus text format
+by the built-in ``/metrics`` route of :class:`WeApRous <WeApRous>`.
+
+Recording is lock free: every thread updates its own shard of a metric (a dict
+of plain lists), and the shards are only summed when the metrics are rendered.
+A counter increment or histogram observation is a thread-local lookup, a dict
+lookup and a few list updates, cheap enough to stay enabled in production.
+
+The serving engines record:
+
+- ``weaprous_stage_duration_seconds{stage}``: time spent receiving a request
+  (from its first byte), preparing it, running the route hook, building the
+  response and sending it. The ``"eventloop"`` engine does not report ``send``.
+- ``weaprous_active_connections`` / ``weaprous_connections_total``.
+- ``weaprous_received_bytes_total`` / ``weaprous_sent_bytes_total``.
+- ``weaprous_pool_active_workers{pool}`` / ``weaprous_pool_queued{pool}`` /
+  ``weaprous_pool_idle{pool}``: busy threads, connections waiting for one and
+  idle persistent connections of each :class:`WorkerPool <WorkerPool>`.
+- ``weaprous_pool_rejected_total{pool}`` / ``weaprous_pool_expired_total{pool}``:
+  connections answered with 503 because the queue was full or they waited
+  longer than the queue timeout.
+
+The :class:`MetricsMiddleware` records the request count and latency per
+method, route pattern and status. Metrics are kept per process: with
+pre-forked workers each worker reports its own.
+
+Usage Example:
+--------------
+>>> REQUESTS.inc(1, ("GET", "/peers", "200"))
+>>> STAGE_DURATION.observe(0.0002, ("hook",))
+>>> print(render())
+# HELP weaprous_requests_total Requests served.
+# TYPE weaprous_requests_total counter
+weaprous_requests_total{method="GET",route="/peers",status="200"} 1
+...
+
+"""
+
+import bisect
+import threading
+import time
+
+from .middleware import Middleware
+
+#: Default histogram bucket upper bounds in seconds.
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+           0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+#: Request methods reported as is; any other is reported as ``"OTHER"``.
+METHODS = frozenset(("GET", "HEAD", "POST", "PUT", "DELETE", "PATCH",
+                     "OPTIONS", "TRACE", "CONNECT"))
+
+#: ``Content-Type`` of the rendered metrics.
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value):
+    """Escapes a label value for the text format."""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_value(value):
+    """Formats a sample value; integral floats without a fraction."""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+class Metric:
+    """
+    A named metric with per-thread shards.
+
+    :param name (str): metric name.
+    :param documentation (str): ``# HELP`` text.
+    :param labelnames (tuple): label names; samples are keyed by the tuple of
+        label values in the same order.
+    """
+
+    kind = "untyped"
+
+    __attrs__ = [
+        "name",
+        "documentation",
+        "labelnames",
+    ]
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._shards = []
+        self._lock = threading.Lock()
+
+    def _shard(self):
+        """Returns the calling thread's shard, creating it on first use."""
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._local.shard = {}
+            with self._lock:
+                self._shards.append(shard)
+            return shard
+
+    def _merged(self):
+        """
+        Sums the shards of every thread.
+
+        :rtype dict: label values -> list of summed cells.
+        """
+        with self._lock:
+            shards = list(self._shards)
+        merged = {}
+        for shard in shards:
+            for labels, cells in list(shard.items()):
+                total = merged.get(labels)
+                if total is None:
+                    merged[labels] = list(cells)
+                else:
+                    for i, cell in enumerate(cells):
+                        total[i] += cell
+        return merged
+
+    def _labels(self, labels, extra=None):
+        """Formats ``{name="value",...}`` for one sample."""
+        pairs = ['{}="{}"'.format(n, _escape(v)) for n, v in zip(self.labelnames, labels)]
+        if extra is not None:
+            pairs.append('{}="{}"'.format(*extra))
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def samples(self):
+        """
+        :rtype list: ``(name, label string, value)`` lines of the metric.
+        """
+        return [(self.name, self._labels(labels), cells[0])
+                for labels, cells in sorted(self._merged().items())]
+
+    def render(self):
+        """
+        :rtype str: the metric in the Prometheus text format.
+        """
+        lines = ["# HELP {} {}".format(self.name, self.documentation),
+                 "# TYPE {} {}".format(self.name, self.kind)]
+        for name, labels, value in self.samples():
+            lines.append("{}{} {}".format(name, labels, _format_value(value)))
+        return "\n".join(lines) + "\n"
+
+
+class Counter(Metric):
+    """A monotonically increasing count."""
+
+    kind = "counter"
+
+    def inc(self, value=1, labels=()):
+        """
+        :param value (int | float): amount to add.
+        :param labels (tuple): label values.
+        """
+        try:
+            cells = self._local.shard[labels]
+        except (AttributeError, KeyError):
+            cells = self._shard().setdefault(labels, [0])
+        cells[0] += value
+
+
+class Gauge(Counter):
+    """
+    A value that goes up and down, or is computed when rendered.
+
+    :param func (callable): returns the current value; replaces the recorded
+        samples when given.
+    """
+
+    kind = "gauge"
+
+    def __init__(self, name, documentation, labelnames=(), func=None):
+        super().__init__(name, documentation, labelnames)
+        self.func = func
+
+    def dec(self, value=1, labels=()):
+        """
+        :param value (int | float): amount to subtract.
+        :param labels (tuple): label values.
+        """
+        self.inc(-value, labels)
+
+    def samples(self):
+        if self.func is not None:
+            return [(self.name, "", self.func())]
+        return super().samples()
+
+
+class Histogram(Metric):
+    """
+    A distribution of observed values over fixed buckets.
+
+    :param buckets (tuple): sorted bucket upper bounds; ``+Inf`` is implied.
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, labels=()):
+        """
+        :param value (float): observed value, e.g. seconds.
+        :param labels (tuple): label values.
+        """
+        try:
+            cells = self._local.shard[labels]
+        except (AttributeError, KeyError):
+            # One count per bucket, the +Inf bucket, then the sum
+            cells = self._shard().setdefault(labels, [0] * (len(self.buckets) + 1) + [0.0])
+        cells[bisect.bisect_left(self.buckets, value)] += 1
+        cells[-1] += value
+
+    def samples(self):
+        samples = []
+        for labels, cells in sorted(self._merged().items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), cells):
+                cumulative += count
+                samples.append((self.name + "_bucket", self._labels(labels, ("le", bound)), cumulative))
+            label_str = self._labels(labels)
+            samples.append((self.name + "_sum", label_str, cells[-1]))
+            samples.append((self.name + "_count", label_str, cumulative))
+        return samples
+
+
+class Registry:
+    """An ordered collection of metrics rendered together."""
+
+    __attrs__ = [
+        "metrics",
+    ]
+
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        """
+        :param metric (Metric): metric to expose.
+
+        :rtype Metric: the registered metric.
+        """
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        """
+        :rtype str: every metric in the Prometheus text format.
+        """
+        return "".join(metric.render() for metric in self.metrics)
+
+
+#: Registry of the server metrics, rendered by ``/metrics``.
+REGISTRY = Registry()
+
+REQUESTS = REGISTRY.register(Counter(
+    "weaprous_requests_total", "Requests served.", ("method", "route", "status")))
+REQUEST_DURATION = REGISTRY.register(Histogram(
+    "weaprous_request_duration_seconds", "Time from request preparation to response built.",
+    ("method", "route", "status")))
+STAGE_DURATION = REGISTRY.register(Histogram(
+    "weaprous_stage_duration_seconds", "Time spent per request handling stage.", ("stage",)))
+ACTIVE_CONNECTIONS = REGISTRY.register(Gauge(
+    "weaprous_active_connections", "Client connections currently open."))
+CONNECTIONS = REGISTRY.register(Counter(
+    "weaprous_connections_total", "Client connections accepted."))
+RECEIVED_BYTES = REGISTRY.register(Counter(
+    "weaprous_received_bytes_total", "Bytes received from clients."))
+SENT_BYTES = REGISTRY.register(Counter(
+    "weaprous_sent_bytes_total", "Bytes sent to clients."))
+POOL_ACTIVE = REGISTRY.register(Gauge(
+    "weaprous_pool_active_workers", "Worker threads handling a connection.", ("pool",)))
+POOL_QUEUED = REGISTRY.register(Gauge(
+    "weaprous_pool_queued", "Connections waiting for a worker thread.", ("pool",)))
+POOL_IDLE = REGISTRY.register(Gauge(
+    "weaprous_pool_idle", "Idle persistent connections waiting for their next request.",
+    ("pool",)))
+POOL_REJECTED = REGISTRY.register(Counter(
+    "weaprous_pool_rejected_total", "Connections shed because the worker queue was full.",
+    ("pool",)))
+POOL_EXPIRED = REGISTRY.register(Counter(
+    "weaprous_pool_expired_total", "Connections shed after waiting longer than the queue timeout.",
+    ("pool",)))
+THREADS = REGISTRY.register(Gauge(
+    "weaprous_threads", "Threads alive in the process.", func=threading.active_count))
+
+
+def observe_stage(stage, seconds):
+    """
+    Records the duration of a request handling stage.
+
+    :param stage (str): ``"recv"``, ``"prepare"``, ``"hook"``, ``"build"`` or ``"send"``.
+    :param seconds (float): duration.
+    """
+    STAGE_DURATION.observe(seconds, (stage,))
+
+
+def render():
+    """
+    :rtype str: the server metrics in the Prometheus text format.
+    """
+    return REGISTRY.render()
+
+
+def route_label(request):
+    """
+    Names the route of a request by its pattern, so that path parameters do
+    not multiply the label values.
+
+    :param request (Request): the prepared request.
+
+    :rtype str: the route pattern, ``"<static>"`` for static files or
+        ``"<unrouted>"``.
+    """
+    hook = request.hook
+    if hook is not None:
+        return getattr(hook, "_route_path", None) or getattr(hook, "__name__", "<hook>")
+    return "<static>" if request.method in ("GET", "HEAD") else "<unrouted>"
+
+
+class MetricsMiddleware(Middleware):
+    """
+    Records the count and latency of every request by method, route pattern
+    and status into :data:`REQUESTS` and :data:`REQUEST_DURATION`. Methods
+    outside :data:`METHODS` share the ``"OTHER"`` label, so that clients
+    cannot create new series.
+    """
+
+    def process_response(self, request, response):
+        status = response[9:12].decode("ascii", "replace")
+        method = request.method if request.method in METHODS else "OTHER"
+        labels = (method, route_label(request), status)
+        REQUESTS.inc(1, labels)
+        REQUEST_DURATION.observe(time.perf_counter() - request.start_time, labels)
+        return response
+
+
+def metrics_handler(headers, body):
+    """Route handler of the built-in ``/metrics`` endpoint."""
+    return render(), "200 OK", CONTENT_TYPE
@@ -0,0 +1,61 @@
+#
+# Copyright (C) 2025 pdnguyen of HCMC University of Technology VNU-HCM.
+# All rights reserved.
+# This file is part of the CO3093/CO3094 course.
+#
+# WeApRous release
+#
+# The authors hereby grant to Licensee personal permission to use
+# and modify the Licensed Source Code for the sole purpose of studying
+# while attending the course
+#
+
+"""
+daemon.middleware
+~~~~~~~~~~~~~~~~~
+
+This module provides the middleware layer of :class:`WeApRous <WeApRous>`. A
+middleware sees every request after it is prepared and every response after it
+is built, for routed requests and static files alike, in all serving engines.
+Middlewares run in registration order on the way in and in reverse order on the
+way out.
+
+Usage Example:
+--------------
+>>> class RequireLogin(Middleware):
+...     def process_request(self, request):
+...         if request.path.startswith('/private') and not request.auth:
+...             return "login required", "401 Unauthorized"
+...
+>>> app.use(RequireLogin())
+
+"""
+
+
+class Middleware:
+    """
+    Base class of middlewares; subclasses override either hook.
+    """
+
+    def process_request(self, request):
+        """
+        Called before the route handler.
+
+        :param request (Request): the prepared request.
+
+        :rtype object: ``None`` to continue, or a handler result (``body``,
+            ``(body, status)``, ...) answered instead of calling the handler.
+        """
+        return None
+
+    def process_response(self, request, response):
+        """
+        Called once the response is built.
+
+        :param request (Request): the request.
+        :param response (bytes): the encoded response (its head only when the
+            body is sent from a file or a stream).
+
+        :rtype bytes: the response to send, usually ``response`` unchanged.
+        """
+        return response
@@ -0,0 +1,333 @@
+#
+# Copyright (C) 2025 pdnguyen of HCMC University of Technology VNU-HCM.
+# All rights reserved.
+# This file is part of the CO3093/CO3094 course.
+#
+# WeApRous release
+#
+# The authors hereby grant to Licensee personal permission to use
+# and modify the Licensed Source Code for the sole purpose of studying
+# while attending the course
+#
+
+"""
+daemon.multipart
+~~~~~~~~~~~~~~~~~
+
+This module provides a streaming ``multipart/form-data`` parser. The request
+body is read from a file object one block at a time and every part is copied to
+its destination as the boundary search advances: text fields into a bounded
+buffer, uploaded files into a :class:`tempfile.SpooledTemporaryFile` that moves
+to disk once it exceeds the spool size. Memory use is bounded by the block size
+and the field limit, not by the size of the upload.
+
+Usage Example:
+--------------
+>>> @app.route('/attach', methods=['POST'], with_request=True)
+... def attach(request):
+...     upload = request.files['attachment']
+...     upload.save(os.path.join('uploads', os.path.basename(upload.filename)))
+...     return {'name': request.form.get('channel'), 'size': upload.size}
+
+"""
+
+import re
+import shutil
+import tempfile
+from urllib.parse import unquote
+
+from .framing import SPOOL_SIZE
+
+#: Bytes read from the body per step.
+BLOCK_SIZE = 64 * 1024
+#: Maximum size of a text field value.
+MAX_FIELD_SIZE = 1024 * 1024
+#: Maximum size of the header block of one part.
+MAX_PART_HEADER_SIZE = 16 * 1024
+#: Maximum number of parts in one body.
+MAX_PARTS = 128
+
+# ``; name=value`` parameters of a header value, quoted strings allowed.
+_PARAM = re.compile(r';\s*([^\s=;]+)\s*=\s*("(?:[^"\\]|\\.)*"|[^;]*)')
+
+
+class MultipartError(ValueError):
+    """The body is not valid ``multipart/form-data`` or exceeds a limit."""
+
+
+def parse_options_header(value):
+    """
+    Splits a header value into its main value and parameters, e.g. a
+    ``Content-Type`` or ``Content-Disposition``.
+
+    RFC 5987 extended parameters (``filename*=UTF-8''...``) are decoded and
+    take precedence over the plain ones.
+
+    :param value (str): header value.
+
+    :rtype tuple: ``(value, params)`` with lower-cased main value and
+        parameter names, e.g. ``('form-data', {'name': 'file', 'filename': 'a.txt'})``.
+    """
+    main, _, rest = value.partition(';')
+    params = {}
+    extended = {}
+    for name, param in _PARAM.findall(';' + rest):
+        name = name.lower()
+        if param[:1] == '"':
+            param = re.sub(r'\\(.)', r'\1', param[1:-1])
+        else:
+            param = param.strip()
+        if name.endswith('*'):
+            charset, _, encoded = param.partition("'")
+            _, _, encoded = encoded.partition("'")
+            extended[name[:-1]] = unquote(encoded, charset or 'utf-8', 'replace')
+        else:
+            params[name] = param
+    params.update(extended)
+    return main.strip().lower(), params
+
+
+def get_boundary(content_type):
+    """
+    Extracts the boundary of a ``multipart/form-data`` content type.
+
+    :param content_type (str): ``Content-Type`` request header.
+
+    :rtype bytes: the boundary.
+
+    :raises MultipartError: If the type is not multipart or has no valid boundary.
+    """
+    mime, params = parse_options_header(content_type or '')
+    boundary = params.get('boundary', '')
+    if not mime.startswith('multipart/'):
+        raise MultipartError("not a multipart body: {!r}".format(mime))
+    if not 0 < len(boundary) <= 70:
+        raise MultipartError("missing or invalid multipart boundary")
+    return boundary.encode('latin-1', 'replace')
+
+
+class UploadFile:
+    """
+    An uploaded file part. The content is held by a spooled temporary file,
+    in memory while small and on disk beyond the spool size.
+
+    :attrs name (str): form field name.
+    :attrs filename (str): file name sent by the client, may be empty.
+    :attrs content_type (str): ``Content-Type`` of the part.
+    :attrs headers (dict): part headers with lower-cased names.
+    :attrs file (file): readable binary file positioned at the start.
+    :attrs size (int): content size in bytes.
+    """
+
+    __attrs__ = [
+        "name",
+        "filename",
+        "content_type",
+        "headers",
+        "file",
+        "size",
+    ]
+
+    def __init__(self, name, filename, content_type, headers, file, size):
+        self.name = name
+        self.filename = filename
+        self.content_type = content_type
+        self.headers = headers
+        self.file = file
+        self.size = size
+
+    def read(self, size=-1):
+        """
+        Reads from the content.
+
+        :param size (int): bytes to read, ``-1`` for the rest.
+
+        :rtype bytes: the data read.
+        """
+        return self.file.read(size)
+
+    def save(self, path):
+        """
+        Copies the whole content to a file, block by block.
+
+        :param path (str): destination path, overwritten if it exists.
+
+        :rtype int: bytes written.
+        """
+        self.file.seek(0)
+        with open(path, 'wb') as out:
+            shutil.copyfileobj(self.file, out, BLOCK_SIZE)
+        self.file.seek(0)
+        return self.size
+
+    def close(self):
+        """Releases the content (deletes the temporary file, if any)."""
+        self.file.close()
+
+    def __repr__(self):
+        return "<UploadFile {!r} ({} bytes)>".format(self.filename, self.size)
+
+
+class MultipartParser:
+    """
+    Iterates over the parts of a ``multipart/form-data`` body read from a file.
+
+    Text fields are yielded as ``(name, value)`` tuples, file parts (those with
+    a ``filename`` parameter) as :class:`UploadFile` objects.
+
+    :param stream (file): readable binary file holding the body.
+    :param boundary (bytes): multipart boundary, see :func:`get_boundary`.
+    :param spool_size (int): uploaded files larger than this go to disk.
+    :param max_field_size (int): limit of a text field value.
+    :param max_parts (int): limit of the number of parts.
+    """
+
+    __attrs__ = [
+        "stream",
+        "boundary",
+        "spool_size",
+        "max_field_size",
+        "max_parts",
+    ]
+
+    def __init__(self, stream, boundary, spool_size=SPOOL_SIZE,
+                 max_field_size=MAX_FIELD_SIZE, max_parts=MAX_PARTS):
+        self.stream = stream
+        self.boundary = boundary
+        self.spool_size = spool_size
+        self.max_field_size = max_field_size
+        self.max_parts = max_parts
+        self._buffer = bytearray()
+
+    def _fill(self):
+        """Reads the next block into the buffer; False at the end of the body."""
+        data = self.stream.read(BLOCK_SIZE)
+        if not data:
+            return False
+        self._buffer += data
+        return True
+
+    def __iter__(self):
+        """
+        :raises MultipartError: If the body is malformed, truncated or exceeds
+            a limit.
+        """
+        buf = self._buffer
+        delimiter = b"--" + self.boundary
+
+        # Skip the preamble up to the first delimiter.
+        while True:
+            found = buf.find(delimiter)
+            if found >= 0:
+                del buf[:found + len(delimiter)]
+                break
+            del buf[:max(0, len(buf) - len(delimiter) + 1)]
+            if not self._fill():
+                raise MultipartError("multipart boundary not found")
+
+        delimiter = b"\r\n" + delimiter
+        parts = 0
+        while True:
+            # After a delimiter: "--" closes the body, else the line ends.
+            line_end = buf.find(b"\r\n")
+            while line_end < 0:
+                if buf[:2] == b"--":
+                    return
+                if len(buf) > 1024 or not self._fill():
+                    raise MultipartError("malformed multipart delimiter")
+                line_end = buf.find(b"\r\n")
+            if buf[:2] == b"--":
+                return
+            if buf[:line_end].strip(b" \t"):
+                raise MultipartError("malformed multipart delimiter")
+            del buf[:line_end + 2]
+
+            parts += 1
+            if parts > self.max_parts:
+                raise MultipartError("more than {} parts".format(self.max_parts))
+
+            headers = self._read_headers()
+            _, disposition = parse_options_header(headers.get('content-disposition', ''))
+            name = disposition.get('name', '')
+            filename = disposition.get('filename')
+            if filename is not None:
+                sink = tempfile.SpooledTemporaryFile(max_size=self.spool_size)
+                limit = None
+            else:
+                sink = bytearray()
+                limit = self.max_field_size
+
+            size = 0
+            while True:
+                found = buf.find(delimiter)
+                end = found if found >= 0 else len(buf) - len(delimiter) + 1
+                if end > 0:
+                    size += end
+                    if limit is not None and size > limit:
+                        raise MultipartError("field {!r} exceeds {} bytes".format(name, limit))
+                    if limit is None:
+                        sink.write(buf[:end])
+                    else:
+                        sink += buf[:end]
+                if found >= 0:
+                    del buf[:found + len(delimiter)]
+                    break
+                if end > 0:
+                    del buf[:end]
+                if not self._fill():
+                    raise MultipartError("multipart body truncated")
+
+            if filename is not None:
+                sink.seek(0)
+                yield UploadFile(name, filename,
+                                 headers.get('content-type', 'application/octet-stream'),
+                                 headers, sink, size)
+            else:
+                _, params = parse_options_header(headers.get('content-type', ''))
+                yield name, bytes(sink).decode(params.get('charset', 'utf-8'), 'replace')
+
+    def _read_headers(self):
+        """Reads the header block of a part; returns lower-cased names."""
+        buf = self._buffer
+        while True:
+            if buf[:2] == b"\r\n":
+                # Part without headers
+                del buf[:2]
+                return {}
+            end = buf.find(b"\r\n\r\n")
+            if end >= 0:
+                break
+            if len(buf) > MAX_PART_HEADER_SIZE or not self._fill():
+                raise MultipartError("malformed or oversized part headers")
+
+        headers = {}
+        for line in bytes(buf[:end]).decode('utf-8', 'replace').split('\r\n'):
+            name, sep, value = line.partition(':')
+            if sep:
+                headers[name.strip().lower()] = value.strip()
+        del buf[:end + 4]
+        return headers
+
+
+def parse_form_data(stream, content_type, spool_size=SPOOL_SIZE):
+    """
+    Parses a whole ``multipart/form-data`` body. A repeated field or file name
+    keeps its last value; iterate a :class:`MultipartParser` to see every part.
+
+    :param stream (file): readable binary file holding the body.
+    :param content_type (str): ``Content-Type`` request header.
+    :param spool_size (int): uploaded files larger than this go to disk.
+
+    :rtype tuple: ``(fields, files)``; ``fields`` maps names to ``str``
+        values, ``files`` maps names to :class:`UploadFile` objects.
+
+    :raises MultipartError: If the body is malformed or exceeds a limit.
+    """
+    fields = {}
+    files = {}
+    for part in MultipartParser(stream, get_boundary(content_type), spool_size):
+        if isinstance(part, UploadFile):
+            files[part.name] = part
+        else:
+            fields[part[0]] = part[1]
+    return fields, files
@@ -0,0 +1,163 @@
+#
+# Copyright (C) 2025 pdnguyen of HCMC University of Technology VNU-HCM.
+# All rights reserved.
+# This file is part of the CO3093/CO3094 course.
+#
+# WeApRous release
+#
+# The authors hereby grant to Licensee personal permission to use
+# and modify the Licensed Source Code for the sole purpose of studying
+# while attending the course
+#
+
+"""
+daemon.prefork
+~~~~~~~~~~~~~~~~~
+
+This module provides a pre-fork multi-process mode for the backend daemon.
+A master process forks N worker processes that serve the same port, either
+by inheriting one listening socket from the master or by each binding its own
+socket with ``SO_REUSEPORT`` so the kernel balances new connections. The
+master supervises the workers, restarts any that die and forwards shutdown
+signals to them.
+
+Notes:
+------
+- Requires ``os.fork`` (Linux, BSD, macOS).
+- Every worker has its own memory: application state kept in module globals
+  (e.g. peers registered on a tracker) is not shared between workers.
+
+Usage Example:
+--------------
+>>> run_prefork("0.0.0.0", 9000, 4, serve)
+
+"""
+
+import os
+import signal
+import socket
+import time
+
+from .log import get_logger, shutdown as shutdown_logging
+
+log = get_logger(__name__)
+
+#: Listen backlog of the shared listening socket.
+BACKLOG = 1024
+#: Minimum seconds between two restarts of the same worker slot.
+RESTART_DELAY = 1.0
+
+
+def bind_listener(ip, port, reuse_port=False, backlog=BACKLOG):
+    """
+    Creates a listening TCP socket.
+
+    :param ip (str): IP address to bind.
+    :param port (int): Port number to listen on.
+    :param reuse_port (bool): Set ``SO_REUSEPORT`` so several processes can bind the port.
+    :param backlog (int): Listen backlog.
+
+    :rtype socket.socket: the listening socket.
+    """
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if reuse_port:
+        server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    server.bind((ip, port))
+    server.listen(backlog)
+    return server
+
+
+def _run_worker(ip, port, serve, server, reuse_port):
+    """Worker process body; never returns."""
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+
+    code = 0
+    try:
+        if reuse_port:
+            server = bind_listener(ip, port, reuse_port=True)
+        serve(server)
+    except BaseException as e:
+        log.error("worker exited", pid=os.getpid(), error=str(e))
+        code = 1
+    finally:
+        shutdown_logging()
+        os._exit(code)
+
+
+def run_prefork(ip, port, workers, serve, reuse_port=False, on_start=None):
+    """
+    Forks ``workers`` processes running ``serve(server)`` and supervises them.
+
+    Dead workers are restarted (at most once per :data:`RESTART_DELAY` per
+    slot). ``SIGTERM`` and ``SIGINT`` received by the master are forwarded to
+    every worker, then the master waits for them to exit.
+
+    :param ip (str): IP address to bind the server.
+    :param port (int): Port number to listen on.
+    :param workers (int): Number of worker processes.
+    :param serve (callable): Called in each worker with the listening socket.
+    :param reuse_port (bool): Let each worker bind its own socket with
+        ``SO_REUSEPORT`` instead of inheriting the master's socket.
+    :param on_start (callable, optional): Called in the master once the
+        workers are forked, e.g. to start threads that work for all of them.
+    """
+    if not hasattr(os, "fork"):
+        raise RuntimeError("Pre-fork mode requires os.fork")
+
+    server = None
+    if not reuse_port:
+        try:
+            server = bind_listener(ip, port)
+        except socket.error as e:
+            log.error("socket error", port=port, error=str(e))
+            return
+
+    children = {}
+    started = {}
+    stopping = False
+
+    def spawn(slot):
+        last = started.get(slot)
+        if last is not None and time.monotonic() - last < RESTART_DELAY:
+            time.sleep(RESTART_DELAY)
+        pid = os.fork()
+        if pid == 0:
+            _run_worker(ip, port, serve, server, reuse_port)
+        children[pid] = slot
+        started[slot] = time.monotonic()
+
+    def forward(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signum)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, forward)
+    signal.signal(signal.SIGINT, forward)
+
+    for slot in range(workers):
+        spawn(slot)
+    log.info("master started", pid=os.getpid(), port=port, workers=workers)
+    if on_start is not None:
+        on_start()
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+
+        slot = children.pop(pid, None)
+        if slot is None or stopping:
+            continue
+
+        log.warning("worker died", pid=pid, status=status)
+        spawn(slot)
+
+    if server is not None:
+        server.close()
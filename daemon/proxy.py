@@ -18,20 +18,41 @@ This module implements a simple proxy server using Python's socket and threading
 It routes incoming HTTP requests to backend services based on hostname mappings and returns
 the corresponding responses to clients.
 
+Only the request head is read before routing. The request body is then relayed to the
+backend, and the response to the client, as the bytes arrive, through bounded buffers:
+the client gets the first response bytes when the backend sends them, and the memory of
+a request does not depend on the size of its payload.
+
 Requirement:
 -----------------
 - socket: provides socket networking interface.
 - threading: enables concurrent client handling via threads.
+- workerpool: bounded worker threads with 503 load shedding.
+- balancer: the ``dist_policy`` load balancing over several ``proxy_pass``.
+- health: active health checks of the ``proxy_pass`` upstreams.
+- upstream: pooled keep-alive connections to the backends.
 - response: customized :class: `Response <Response>` utilities.
 - httpadapter: :class: `HttpAdapter <HttpAdapter >` adapter for HTTP request processing.
-- dictionary: :class: `CaseInsensitiveDict <CaseInsensitiveDict>` for managing headers and cookie.
+- dictionary: :class: `Headers <Headers>` for reading and rewriting the request headers.
+- asyncproxy: the asyncio proxy engine.
+- prefork: multi-process supervisor sharing the listening port.
 
 """
 import socket
 import threading
 from .response import *
-from .httpadapter import HttpAdapter
-from .dictionary import CaseInsensitiveDict
+from .httpadapter import HttpAdapter, linger_close
+from .dictionary import CaseInsensitiveDict, Headers
+from .headers import format_headers
+from .framing import RequestReader, BodyFramer, FramingError
+from .balancer import Balancer, create_balancer
+from .health import HealthChecker
+from .upstream import UpstreamPools, UpstreamError, DownstreamError
+from .workerpool import WorkerPool, MAX_WORKERS, QUEUE_SIZE, QUEUE_TIMEOUT, build_unavailable
+from .prefork import run_prefork
+from .log import get_logger, DEBUG
+
+log = get_logger(__name__)
 
 #: A dictionary mapping hostnames to backend IP and port tuples.
 #: Used to determine routing targets for incoming requests.
@@ -41,86 +62,142 @@ PROXY_PASS = {
     "app2.local": ('192.168.56.103', 9002),
 }
 
+#: Headers that only concern one connection and are never forwarded.
+HOP_BY_HOP = ('Connection', 'Keep-Alive', 'Proxy-Connection', 'TE', 'Trailer', 'Upgrade')
+
+#: Largest request body relayed to a backend.
+MAX_BODY_SIZE = 1024 * 1024 * 1024
+
+#: Answer sent when the host has no ``proxy_pass``.
+NOT_FOUND = (
+    "HTTP/1.1 404 Not Found\r\n"
+    "Content-Type: text/plain\r\n"
+    "Content-Length: 13\r\n"
+    "Connection: close\r\n"
+    "\r\n"
+    "404 Not Found"
+).encode('utf-8')
+
+#: Answer sent when the backend cannot be reached, fails or answers garbage.
+BAD_GATEWAY = (
+    "HTTP/1.1 502 Bad Gateway\r\n"
+    "Content-Type: text/plain\r\n"
+    "Content-Length: 15\r\n"
+    "Connection: close\r\n"
+    "\r\n"
+    "502 Bad Gateway"
+).encode('utf-8')
+
+#: Answer sent when no upstream can take the request: every one is down, or
+#: all the connections to the backend are busy.
+SERVICE_UNAVAILABLE = build_unavailable()
+
+#: Route of the hostnames missing from the routing table.
+DEFAULT_ROUTE = ('127.0.0.1:9000', 'round-robin')
+DEFAULT_BALANCER = create_balancer(*DEFAULT_ROUTE)
+
+#: Backend connection pools used when :func:`run_proxy` is not given any.
+UPSTREAMS = UpstreamPools()
+
+
+def gateway_error(error, fail_open=False):
+    """
+    Chooses the answer to a request whose backend failed before any
+    response byte was relayed.
+
+    :params error (Exception): the failure.
+    :params fail_open (bool): the upstream was chosen while every upstream of
+        the host is down.
 
-def forward_request(host, port, request):
+    :rtype bytes: :data:`SERVICE_UNAVAILABLE` if no upstream could take the
+        request, :data:`BAD_GATEWAY` otherwise.
     """
-    Forwards an HTTP request to a backend server and retrieves the response.
+    if fail_open or isinstance(error, UpstreamError):
+        return SERVICE_UNAVAILABLE
+    return BAD_GATEWAY
 
-    :params host (str): IP address of the backend server.
-    :params port (int): port number of the backend server.
-    :params request (str): incoming HTTP request.
 
-    :rtype bytes: Raw HTTP response from the backend server. If the connection
-                  fails, returns a 404 Not Found response.
+def parse_head(head):
     """
+    Splits a request or response header block once into its first line and
+    headers.
 
-    backend = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    :params head (bytes): request or status line and headers, ending with a
+        blank line.
 
-    try:
-        backend.connect((host, port))
-        backend.sendall(request.encode())
-        response = b""
-        while True:
-            chunk = backend.recv(4096)
-            if not chunk:
-                break
-            response += chunk
-        return response
-    except socket.error as e:
-      print("Socket error: {}".format(e))
-      return (
-            "HTTP/1.1 404 Not Found\r\n"
-            "Content-Type: text/plain\r\n"
-            "Content-Length: 13\r\n"
-            "Connection: close\r\n"
-            "\r\n"
-            "404 Not Found"
-        ).encode('utf-8')
+    :rtype tuple: ``(start_line, headers)``, a str and a :class:`Headers <Headers>`.
+    """
+    start_line, _, fields = head[:-4].decode('latin-1').partition('\r\n')
+    return start_line, Headers.parse(fields.split('\r\n'))
 
 
-def resolve_routing_policy(hostname, routes):
+def rewrite_head(start_line, headers, connection):
+    """
+    Rebuilds a header block for the next hop: the hop-by-hop headers are
+    dropped, and ``Connection`` is set.
+
+    :params start_line (str): request or status line.
+    :params headers (Headers): headers as received, left unchanged.
+    :params connection (str): ``"keep-alive"`` or ``"close"``.
+
+    :rtype bytes: the header block to send.
+    """
+    fields = headers.copy()
+    for name in headers.get('Connection', '').split(','):
+        fields.pop(name.strip(), None)
+    for name in HOP_BY_HOP:
+        fields.pop(name, None)
+    fields['Connection'] = connection
+    return b"".join((start_line.encode('latin-1'), b"\r\n",
+                     format_headers(fields, 'latin-1'), b"\r\n"))
+
+
+def build_routes(routes):
+    """
+    Builds the :class:`Balancer <Balancer>` of every virtual host once, so
+    that the balancing state (turn, requests in flight) is shared by all
+    requests.
+
+    :params routes (dict): hostname -> ``(proxy_pass, dist_policy)``, or
+        ``(proxy_pass, dist_policy, health_check)``, as read from the
+        configuration; entries already built are kept.
+
+    :rtype dict: hostname -> balancer.
+
+    :raises ValueError: If a policy or a ``proxy_pass`` is invalid.
+    """
+    return {hostname: route if isinstance(route, Balancer) else create_balancer(*route)
+            for hostname, route in routes.items()}
+
+
+def resolve_routing_policy(hostname, routes, client=None, headers=None):
     """
     Handles an routing policy to return the matching proxy_pass.
     It determines the target backend to forward the request to.
 
-    :params host (str): IP address of the request target server.
-    :params port (int): port number of the request target server.
-    :params routes (dict): dictionary mapping hostnames and location.
-    """
-
-    print(hostname)
-    proxy_map, policy = routes.get(hostname,('127.0.0.1:9000','round-robin'))
-    print(proxy_map)
-    print(policy)
-
-    proxy_host = ''
-    proxy_port = '9000'
-    if isinstance(proxy_map, list):
-        if len(proxy_map) == 0:
-            print("[Proxy] Emtpy resolved routing of hostname {}".format(hostname))
-            print("Empty proxy_map result")
-            # TODO: implement the error handling for non mapped host
-            #       the policy is design by team, but it can be 
-            #       basic default host in your self-defined system
-            # Use a dummy host to raise an invalid connection
-            proxy_host = '127.0.0.1'
-            proxy_port = '9000'
-        elif len(value) == 1:
-            proxy_host, proxy_port = proxy_map[0].split(":", 2)
-        #elif: # apply the policy handling 
-        #   proxy_map
-        #   policy
-        else:
-            # Out-of-handle mapped host
-            proxy_host = '127.0.0.1'
-            proxy_port = '9000'
-    else:
-        print("[Proxy] resolve route of hostname {} is a singulair to".format(hostname))
-        proxy_host, proxy_port = proxy_map.split(":", 2)
+    The returned upstream is counted in flight until it is given back with
+    ``balancer.release(upstream, failed)``. Upstreams that are down (failed
+    health checks, ejected after failed requests) are not returned.
 
-    return proxy_host, proxy_port
+    :params hostname (str): ``Host`` of the request.
+    :params routes (dict): hostname -> balancer, see :func:`build_routes`.
+        Hostnames not listed use :data:`DEFAULT_ROUTE`.
+    :params client (str): client IP address, for hash policies.
+    :params headers (Headers): request headers, for hash policies.
 
-def handle_client(ip, port, conn, addr, routes):
+    :rtype tuple: ``(balancer, upstream)``; ``upstream`` is ``None`` when the
+        host has no ``proxy_pass``.
+    """
+    balancer = routes.get(hostname, DEFAULT_BALANCER)
+    if not isinstance(balancer, Balancer):
+        # A plain route: balanced alone, without shared state
+        balancer = create_balancer(*balancer)
+    upstream = balancer.acquire(client, headers)
+    if upstream is None:
+        log.warning("empty proxy_pass", host=hostname)
+    return balancer, upstream
+
+def handle_client(ip, port, conn, addr, routes, upstreams=None):
     """
     Handles an individual client connection by parsing the request,
     determining the target backend, and forwarding the request.
@@ -129,89 +206,266 @@ def handle_client(ip, port, conn, addr, routes):
     matches the hostname against known routes. In the matching
     condition,it forwards the request to the appropriate backend.
 
-    The handler sends the backend response back to the client or
-    returns 404 if the hostname is unreachable or is not recognized.
+    The handler sends the backend response back to the client. It answers
+    404 if the host has no ``proxy_pass``, 502 if the backend fails and 503
+    if no upstream can take the request, see :func:`gateway_error`.
 
     :params ip (str): IP address of the proxy server.
     :params port (int): port number of the proxy server.
     :params conn (socket.socket): client connection socket.
     :params addr (tuple): client address (IP, port).
-    :params routes (dict): dictionary mapping hostnames and location.
+    :params routes (dict): hostname -> balancer, see :func:`build_routes`.
+    :params upstreams (UpstreamPools): backend connection pools, defaults
+        to :data:`UPSTREAMS`.
     """
 
-    request = conn.recv(1024).decode()
+    reader = RequestReader(conn, max_body_size=MAX_BODY_SIZE, spool_size=None)
+    try:
+        # The body is relayed as it arrives, see relay()
+        message = reader.read_head()
+    except FramingError as e:
+        try:
+            conn.sendall(Response().build_error(e.status))
+            linger_close(conn)
+        except OSError:
+            pass
+        conn.close()
+        return
+    except OSError:
+        conn.close()
+        return
+
+    if message is None:
+        conn.close()
+        return
+
+    head, length = message
+    request_line, headers = parse_head(head)
+    # 100 Continue was answered by the reader
+    headers.pop('Expect', None)
 
     # Extract hostname
-    for line in request.splitlines():
-        if line.lower().startswith('host:'):
-            hostname = line.split(':', 1)[1].strip()
+    hostname = headers.get('Host', '')
 
-    print("[Proxy] {} at Host: {}".format(addr, hostname))
 
-    # Resolve the matching destination in routes and need conver port
-    # to integer value
-    resolved_host, resolved_port = resolve_routing_policy(hostname, routes)
-    try:
-        resolved_port = int(resolved_port)
-    except ValueError:
-        print("Not a valid integer")
+    # Resolve the matching destination with the dist_policy of the host
+    balancer, upstream = resolve_routing_policy(hostname, routes, addr[0], headers)
 
-    if resolved_host:
-        print("[Proxy] Host name {} is forwarded to {}:{}".format(hostname,resolved_host, resolved_port))
-        response = forward_request(resolved_host, resolved_port, request)
-    else:
-        response = (
-            "HTTP/1.1 404 Not Found\r\n"
-            "Content-Type: text/plain\r\n"
-            "Content-Length: 13\r\n"
-            "Connection: close\r\n"
-            "\r\n"
-            "404 Not Found"
-        ).encode('utf-8')
-    conn.sendall(response)
+    if upstream is None:
+        try:
+            conn.sendall(NOT_FOUND)
+        except OSError:
+            pass
+        conn.close()
+        return
+
+    if log.enabled(DEBUG):
+        log.debug("forward", client=addr, host=hostname, backend=str(upstream))
+    failed = True
+    try:
+        # The backend connection is pooled, ask the backend to keep it open.
+        relay(conn, reader, upstream.host, upstream.port,
+              rewrite_head(request_line, headers, 'keep-alive'), length,
+              request_line.split(' ', 1)[0], upstreams, fail_open=not upstream.up)
+        failed = False
+    except DownstreamError as e:
+        failed = False
+        if isinstance(e.__cause__, FramingError):
+            # Malformed or oversized body: answered before any response byte
+            try:
+                conn.sendall(Response().build_error(e.__cause__.status))
+            except OSError:
+                pass
+        log.debug("client gone", client=addr, error=str(e))
+    except UpstreamError as e:
+        # Every connection to the backend is busy, it did not fail
+        failed = False
+        log.warning("backend busy", backend=str(upstream), error=str(e))
+    except (OSError, FramingError) as e:
+        log.error("backend unreachable", backend=str(upstream), error=str(e))
+    finally:
+        # A failure counts towards ejecting the upstream
+        balancer.release(upstream, failed)
     conn.close()
 
-def run_proxy(ip, port, routes):
+
+def relay(conn, reader, host, port, head, length, method="GET", upstreams=None,
+          fail_open=False):
+    """
+    Relays a request to a backend over a pooled keep-alive connection and
+    its response back to the client, streaming both bodies.
+
+    :params conn (socket.socket): client connection, closed after the response.
+    :params reader (RequestReader): reader of the client connection, past
+        the request head.
+    :params host (str): IP address of the backend server.
+    :params port (int): port number of the backend server.
+    :params head (bytes): request header block to send, see :func:`rewrite_head`.
+    :params length (int): request body length, ``None`` when chunked.
+    :params method (str): request method.
+    :params upstreams (UpstreamPools): backend connection pools, defaults
+        to :data:`UPSTREAMS`.
+    :params fail_open (bool): the backend was chosen while every upstream is
+        down, see :func:`gateway_error`.
+
+    :raises OSError: If the backend cannot be reached or fails. The client
+        is sent :func:`gateway_error` when nothing was relayed to it yet.
+    :raises FramingError: If the response is malformed.
+    :raises DownstreamError: If the client fails, leaves or sends a malformed
+        body.
+    """
+    pool = (UPSTREAMS if upstreams is None else upstreams).get((host, port))
+    body = BodyFramer(length, MAX_BODY_SIZE)
+    pending = reader.framer.buffer
+    try:
+        data = bytes(pending[:body.feed(pending)])
+    except FramingError as e:
+        raise DownstreamError("invalid request body: {}".format(e)) from e
+    del pending[:len(data)]
+
+    try:
+        upstream, response_head, response_length = pool.start_exchange(
+            head, data, body, reader.recv_into, method)
+    except DownstreamError:
+        raise
+    except (OSError, FramingError) as e:
+        try:
+            conn.sendall(gateway_error(e, fail_open))
+        except OSError:
+            pass
+        raise
+
+    reusable = False
+    try:
+        status_line, headers = parse_head(response_head)
+        try:
+            conn.sendall(rewrite_head(status_line, headers, 'close'))
+        except OSError as e:
+            raise DownstreamError("client failed: {}".format(e)) from e
+        upstream.relay_body(response_length, conn.sendall)
+        reusable = upstream.reusable()
+    finally:
+        pool.release(upstream, reusable)
+
+def run_proxy(ip, port, routes, max_workers=MAX_WORKERS, queue_size=QUEUE_SIZE,
+              queue_timeout=QUEUE_TIMEOUT, server=None, health_checker=None,
+              **upstream_options):
     """
     Starts the proxy server and listens for incoming connections. 
 
     The process dinds the proxy server to the specified IP and port.
     In each incomping connection, it accepts the connections and
-    spawns a new thread for each client using `handle_client`.
+    queues it to a bounded :class:`WorkerPool` running `handle_client`.
+    When the queue is full the client gets ``503 Service Unavailable``.
+    The upstreams of the hosts configured with a ``health_check`` are
+    probed by a :class:`HealthChecker <HealthChecker>`.
  
 
     :params ip (str): IP address to bind the proxy server.
     :params port (int): port number to listen on.
-    :params routes (dict): dictionary mapping hostnames and location.
+    :params routes (dict): hostname -> ``(proxy_pass, dist_policy[, health_check])``.
+    :params max_workers (int): number of worker threads.
+    :params queue_size (int): maximum number of connections waiting for a worker.
+    :params queue_timeout (float): maximum seconds a connection may wait for a worker.
+    :params server (socket.socket, optional): an already listening socket, e.g.
+        inherited from a pre-fork master. Defaults to binding a new one.
+    :params health_checker (HealthChecker, optional): the shared checker probing
+        the upstreams of ``routes`` from a pre-fork master; this process only
+        follows it. Defaults to probing from this process.
+    :params upstream_options: backend connection pool settings (``max_idle``,
+        ``max_connections``, ``idle_timeout``, ``connect_timeout``,
+        ``timeout``), see :class:`UpstreamPool <UpstreamPool>`.
 
     """
 
-    proxy = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    routes = build_routes(routes)
+    start_health_checks(routes, health_checker)
 
     try:
-        proxy.bind((ip, port))
-        proxy.listen(50)
-        print("[Proxy] Listening on IP {} port {}".format(ip,port))
+        if server is None:
+            server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            server.bind((ip, port))
+            server.listen(50)
+        log.info("listening", engine="proxy", ip=ip, port=port)
+        upstreams = UpstreamPools(**upstream_options) if upstream_options else UPSTREAMS
+        pool = WorkerPool(lambda conn, addr: handle_client(ip, port, conn, addr, routes, upstreams),
+                          max_workers=max_workers, queue_size=queue_size,
+                          queue_timeout=queue_timeout, name="Proxy")
         while True:
-            conn, addr = proxy.accept()
-            #
-            #  TODO: implement the step of the client incomping connection
-            #        using multi-thread programming with the
-            #        provided handle_client routine
-            #
-
-            t = threading.Thread(target=handle_client, args=(ip, port, conn, addr, routes))
-            t.start()
+            conn, addr = server.accept()
+            pool.submit(conn, addr)
     except socket.error as e:
-      print("Socket error: {}".format(e))
+      log.error("socket error", port=port, error=str(e))
+
+def start_health_checks(routes, health_checker=None):
+    """
+    Starts the health checks of a serving process.
 
-def create_proxy(ip, port, routes):
+    :params routes (dict): hostname -> balancer, see :func:`build_routes`.
+    :params health_checker (HealthChecker, optional): a shared checker run by
+        the pre-fork master for ``routes``; its results are followed.
+        Defaults to probing the upstreams from this process.
+    """
+    if health_checker is None:
+        HealthChecker(routes.values()).start()
+    else:
+        health_checker.follow()
+
+#: Proxy engines selectable from :func:`create_proxy`.
+MODES = ("thread", "asyncio")
+
+def create_proxy(ip, port, routes, mode="thread", workers=1, **options):
     """
     Entry point for launching the proxy server.
 
     :params ip (str): IP address to bind the proxy server.
     :params port (int): port number to listen on.
-    :params routes (dict): dictionary mapping hostnames and location.
+    :params routes (dict): hostname -> ``(proxy_pass, dist_policy[, health_check])``.
+    :params mode (str): proxy engine, ``"thread"`` (a worker thread per
+        client for the whole exchange) or ``"asyncio"`` (every client and
+        backend socket served by one event loop, for many concurrent slow
+        exchanges). Defaults to ``"thread"``.
+    :params workers (int): number of pre-forked processes sharing the port,
+        e.g. one event loop per core. Defaults to 1 (serve from this process).
+        The health checks then run once, in the master, and every worker
+        follows their results; the passive ejection is tracked per worker.
+    :params options: worker pool options of the thread engine (``max_workers``,
+        ``queue_size``, ``queue_timeout``), backend connection pool options
+        (``max_idle``, ``max_connections``, ``idle_timeout``, ...) and
+        ``reuse_port`` to let each worker process bind with ``SO_REUSEPORT``.
+
+    :raises ValueError: If the mode is unknown.
+    """
+
+    if mode not in MODES:
+        raise ValueError("Unknown proxy mode {!r}, expected one of {}".format(mode, MODES))
+
+    if workers > 1:
+        reuse_port = options.pop("reuse_port", False)
+        # Built before forking, so the workers share the checker's view of the upstreams
+        routes = build_routes(routes)
+        checker = HealthChecker(routes.values(), shared=True)
+        run_prefork(ip, port, workers,
+                    lambda server: serve_proxy(ip, port, routes, mode, server=server,
+                                               health_checker=checker, **options),
+                    reuse_port=reuse_port, on_start=checker.start)
+    else:
+        serve_proxy(ip, port, routes, mode, **options)
+
+def serve_proxy(ip, port, routes, mode="thread", **options):
+    """
+    Runs the selected proxy engine in the current process.
+
+    :params ip (str): IP address to bind the proxy server.
+    :params port (int): port number to listen on.
+    :params routes (dict): hostname -> ``(proxy_pass, dist_policy[, health_check])``.
+    :params mode (str): proxy engine, ``"thread"`` or ``"asyncio"``.
+    :params options: engine options, including an optional listening ``server`` socket.
     """
 
-    run_proxy(ip, port, routes)
+    if mode == "thread":
+        run_proxy(ip, port, routes, **options)
+    elif mode == "asyncio":
+        # Imported here: the asyncio engine builds on this module
+        from .asyncproxy import run_proxy_async
+        run_proxy_async(ip, port, routes, **options)
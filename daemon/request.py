@@ -16,9 +16,28 @@ daemon.request
 
 This module provides a Request object to manage and persist 
 request settings (cookie, auth, proxies).
+
+The body, query string, form fields and cookies are parsed lazily, on first
+access of :attr:`Request.text`, :attr:`Request.json`, :attr:`Request.query`,
+:attr:`Request.form` or :attr:`Request.cookies`, and memoized.
+
+Large bodies arrive spooled to a temporary file (see :mod:`daemon.framing`).
+Handlers that read :attr:`Request.stream`, :attr:`Request.form` or
+:attr:`Request.files` process them with bounded memory; :attr:`Request.body`
+reads the whole body into memory.
 """
+import io
+from urllib.parse import parse_qsl
+
 from .authentication import Authentication
-from .dictionary import CaseInsensitiveDict
+from .session import SESSION_COOKIE
+from .dictionary import CaseInsensitiveDict, Headers
+from .framing import FramingError
+from .multipart import parse_form_data
+from . import serializer
+
+#: Marks a lazily decoded attribute that was not computed yet.
+_UNSET = object()
 
 class Request():
     """The fully mutable "class" `Request <Request>` object,
@@ -37,101 +56,331 @@ class Request():
       >>> r
       <Request>
     """
+    #: Credential store and session table shared by every request.
+    authentication = Authentication()
+
     __attrs__ = [
         "method",
         "url",
+        "version",
         "headers",
-        "body",
-        "reason",
+        "path",
+        "query_string",
         "cookie",
         "body",
         "routes",
         "hook",
+        "hook_result",
+        "hook_error",
+        "path_params",
+        "allowed",
+        "keep_alive",
+        "auth",
+        "user",
     ]
 
+    __slots__ = tuple(name for name in __attrs__ if name != "body") + (
+        "content_length", "start_time", "_body", "_file", "_text", "_json", "_query", "_form", "_files", "_cookies")
+
     def __init__(self):
         #: HTTP verb to send to the server.
         self.method = None
         #: HTTP URL to send the request to.
         self.url = None
+        #: HTTP version of the request line.
+        self.version = None
         #: dictionary of HTTP headers.
         self.headers = None
-        #: HTTP path
-        self.path = None        
+        #: HTTP path, without the query string
+        self.path = None
+        #: Raw query string (text after ``?``)
+        self.query_string = ''
         # The cookie set used to create Cookie header
         self.cookie = None
-        #: request body to send to the server.
-        self.body = None
+        #: Size of the request body in bytes.
+        self.content_length = 0
+        #: ``time.perf_counter()`` when the request started to be handled.
+        self.start_time = 0.0
+        # Body bytes, or None until a spooled body is read into memory
+        self._body = b''
+        # Temporary file holding a spooled body
+        self._file = None
+        self._text = None
+        self._json = _UNSET
+        self._query = None
+        self._form = None
+        self._files = None
+        self._cookies = None
         #: Routes
-        self.routes = {}
+        self.routes = None
         #: Hook point for routed mapped-path
         self.hook = None
+        #: Result returned by the hook, consumed by the Response builder
+        self.hook_result = None
+        #: Exception raised by the hook, answered with 500
+        self.hook_error = None
+        #: Typed path parameters captured by the matched route
+        self.path_params = {}
+        #: Methods routed for this path when the request method is not
+        self.allowed = ()
+        #: Whether the connection stays open after the response.
+        self.keep_alive = False
+        #: Whether the request carries a valid session cookie.
+        self.auth = False
+        #: User of the session, ``None`` when not logged in.
+        self.user = None
+
+    def extract_request_line(self, line):
+        """
+        Splits the request line.
+
+        :param line (str): request line without its CRLF.
+
+        :rtype tuple: ``(method, target, version)``.
+
+        :raises FramingError: If the line is not ``METHOD TARGET VERSION``.
+        """
+        parts = line.split()
+        if len(parts) != 3:
+            raise FramingError("malformed request line {!r}".format(line[:64]))
+        return parts
+
+    def prepare_headers(self, lines):
+        """
+        Prepares the HTTP headers.
+
+        :param lines (list): header lines without CRLF.
 
-    def extract_request_line(self, request):
-        try:
-            lines = request.splitlines()
-            first_line = lines[0]
-            method, path, version = first_line.split()
-
-        except Exception as e:
-            print(f"ERROR {e}")
-            return None, None, None
-
-        return method, path, version
-
-    def prepare_headers(self, request):
-        """Prepares the given HTTP headers."""
-        lines = request.split('\r\n')
-        headers = {}
-        for line in lines[1:]:
-            if ': ' in line:
-                key, val = line.split(': ', 1)
-                headers[key.lower()] = val
-        return headers
-
-    def prepare(self, request, routes=None):
-        """Prepares the entire request with the given parameters."""
-
-        # Prepare the request line from the request header
-        self.method, self.path, self.version = self.extract_request_line(request)
-        # print("[Request] {} path {} version {}".format(self.method, self.path, self.version))
-
-        #
-        # @bksysnet Preapring the webapp hook with WeApRous instance
-        # The default behaviour with HTTP server is empty routed
-        #
-        # TODO manage the webapp hook in this mounting point
-        #
-        
-        #uses the routes dictionary to get the corresponding hook
+        :rtype Headers: case-insensitive headers keeping repeated fields.
+        """
+        return Headers.parse(lines)
+
+    def prepare(self, message, routes=None):
+        """
+        Prepares the entire request from a framed message.
+
+        Only the header block is decoded, then split in one pass; the body is
+        kept as bytes and decoded when :attr:`text` or :attr:`json` is read.
+
+        :param message (tuple): ``(head, body)`` as returned by
+            :meth:`RequestFramer.next_message` (``body`` may be a spooled
+            file), or a whole message as bytes or str.
+        :param routes: a :class:`Router <Router>` or a plain dict of route handlers.
+
+        :raises FramingError: If the request line is malformed.
+        """
+        if isinstance(message, tuple):
+            head, body = message
+        else:
+            if isinstance(message, str):
+                message = message.encode('utf-8')
+            head, _, body = message.partition(b'\r\n\r\n')
+
+        lines = head.decode('utf-8', 'replace').split('\r\n')
+        self.method, self.url, self.version = self.extract_request_line(lines[0])
+        self.path, _, self.query_string = self.url.partition('?')
+
+        #uses the routes table to get the corresponding hook
         if routes:
             self.routes = routes
-            self.hook = routes.get((self.method, self.path))
+            self.hook, self.path_params, self.allowed = self.prepare_hook(routes)
 
-        self.headers = self.prepare_headers(request)
-        self.body = self.prepare_body(request, None)
-        self.auth = self.prepare_auth(request)
+        self.headers = self.prepare_headers(lines[1:])
+        self.prepare_body(body, None)
+        self.auth = self.prepare_auth(self.headers)
+        self.keep_alive = self.prepare_keep_alive()
         return
 
+    def prepare_hook(self, routes):
+        """
+        Resolves the route handler for the request method and path.
+
+        :param routes: a :class:`Router <Router>` or a plain dict keyed by
+            ``(method, path)``.
+
+        :rtype tuple: ``(hook, path_params, allowed)`` as returned by
+            :meth:`Router.match`.
+        """
+        if hasattr(routes, 'match'):
+            return routes.match(self.method, self.path)
+        return routes.get((self.method, self.path)), {}, ()
+
     def prepare_body(self, data, files, json=None):
-        lines = data.split('\r\n')
-        body = ''
-        for line in lines[-1:]:
-            if line == '':
-                break
-            else:
-                body += line
+        """
+        Prepares the body: the bytes after the blank line ending the headers.
+
+        :param data (bytes | file): body bytes, or a spooled file positioned
+            at its start.
+        """
+        self._text = None
+        self._json = _UNSET
+        self._form = None
+        self._files = None
 
-        self.prepare_content_length(body)
-        return body
+        if hasattr(data, 'read'):
+            self._file = data
+            self._body = None
+            self.prepare_content_length(data.seek(0, io.SEEK_END))
+            data.seek(0)
+        else:
+            self._file = None
+            self._body = bytes(data)
+            self.prepare_content_length(len(self._body))
 
-    def prepare_content_length(self, body):
-        self.headers["Content-Length"] = len(body)
+    def prepare_content_length(self, length):
+        self.content_length = length
+        self.headers["Content-Length"] = length
         return
 
+    @property
+    def body(self):
+        """
+        The whole body as bytes. A spooled body is read into memory on first
+        use; prefer :attr:`stream` for large uploads.
+
+        :rtype bytes: request body.
+        """
+        if self._body is None:
+            self._file.seek(0)
+            self._body = self._file.read()
+            self._file.seek(0)
+        return self._body
+
+    @property
+    def stream(self):
+        """
+        The body as a readable binary file, rewound to its start on each
+        access. A spooled body is returned as is, without copying it.
+
+        :rtype file: e.g. ``request.stream.read(65536)``.
+        """
+        if self._file is not None:
+            self._file.seek(0)
+            return self._file
+        return io.BytesIO(self._body)
+
+    @property
+    def text(self):
+        """
+        The body decoded as UTF-8 (invalid bytes replaced), decoded on first use.
+
+        :rtype str: body text.
+        """
+        if self._text is None:
+            self._text = self.body.decode('utf-8', 'replace') if self.body else ''
+        return self._text
+
+    @property
+    def json(self):
+        """
+        The body parsed as JSON on first use.
+
+        :rtype object: the decoded value, ``None`` for an empty body.
+
+        :raises ValueError: If the body is not valid JSON.
+        """
+        if self._json is _UNSET:
+            self._json = serializer.loads(self.body) if self.body else None
+        return self._json
+
+    @property
+    def query(self):
+        """
+        The query string parameters, parsed on first use. A repeated name
+        keeps its last value.
+
+        :rtype dict: e.g. ``{'since': '42'}`` for ``/pollinbox?since=42``.
+        """
+        if self._query is None:
+            self._query = dict(parse_qsl(self.query_string, keep_blank_values=True))
+        return self._query
+
+    @property
+    def form(self):
+        """
+        The ``application/x-www-form-urlencoded`` or ``multipart/form-data``
+        body fields, parsed on first use. Uploaded files are in :attr:`files`.
+
+        :rtype dict: form fields, e.g. ``{'username': 'admin', ...}``.
+
+        :raises MultipartError: If a multipart body is malformed.
+        """
+        if self._form is None:
+            if self.is_multipart():
+                self._form, self._files = parse_form_data(
+                    self.stream, self.headers.get('content-type'))
+            else:
+                self._form = dict(parse_qsl(self.text, keep_blank_values=True))
+        return self._form
+
+    @property
+    def files(self):
+        """
+        The files uploaded with a ``multipart/form-data`` body, parsed on first
+        use. The body is streamed through the parser and every file lands in
+        its own spooled temporary file.
+
+        :rtype dict: field name -> :class:`UploadFile <UploadFile>`; empty for
+            other content types.
+
+        :raises MultipartError: If the body is malformed.
+        """
+        if self._files is None:
+            if self.is_multipart():
+                self._form, self._files = parse_form_data(
+                    self.stream, self.headers.get('content-type'))
+            else:
+                self._files = {}
+        return self._files
+
+    def is_multipart(self):
+        """
+        :rtype bool: ``True`` if the body is ``multipart/form-data``.
+        """
+        return self.headers.get('content-type', '').lower().startswith('multipart/form-data')
+
+    @property
+    def cookies(self):
+        """
+        The ``Cookie`` request header, parsed on first use.
+
+        :rtype dict: cookie name -> value.
+        """
+        if self._cookies is None:
+            cookies = {}
+            for pair in self.headers.get("cookie", "").split(";"):
+                name, sep, value = pair.partition("=")
+                if sep:
+                    cookies[name.strip()] = value.strip()
+            self._cookies = cookies
+        return self._cookies
+
+    def prepare_keep_alive(self):
+        """
+        Decides whether the client wants a persistent connection.
+
+        HTTP/1.1 connections are persistent unless ``Connection: close`` is
+        sent; HTTP/1.0 ones only with an explicit ``Connection: keep-alive``.
+        """
+        connection = self.headers.get("connection", "").lower()
+        if self.version == "HTTP/1.1":
+            return "close" not in connection
+        return "keep-alive" in connection
 
     def prepare_auth(self, auth, url=""):
-        return ("auth=true" in self.headers.get("cookie", ""))
+        """
+        Validates the session cookie against :attr:`authentication`; a dict
+        lookup, no file access. Sets :attr:`user`.
+
+        :param auth (dict): request headers.
+
+        :rtype bool: ``True`` if the request belongs to a live session.
+        """
+        cookie = auth.get("cookie")
+        if not cookie or SESSION_COOKIE not in cookie:
+            return False
+        self.user = self.authentication.user(self.cookies.get(SESSION_COOKIE))
+        return self.user is not None
 
     def prepare_cookie(self, cookie):
         self.headers["cookie"] = cookie
@@ -18,16 +18,73 @@ This module provides a :class: `Response <Response>` object to manage and persis
 response settings (cookie, auth, proxies), and to construct HTTP responses
 based on incoming requests. 
 
-The current version supports MIME type detection, content loading and header formatting
+The current version supports MIME type detection, content loading and header formatting.
+Static files are answered from a :class:`StaticCache <StaticCache>` with ETag and
+Last-Modified revalidation; compressible bodies are gzip/deflate encoded
+according to ``Accept-Encoding``.
 """
-import datetime
 import os
 import mimetypes
-from .authentication import Authentication
-from .dictionary import CaseInsensitiveDict
+from .dictionary import CaseInsensitiveDict, Headers
+from .staticcache import StaticCache
+from . import compression
+from . import headers
+from . import serializer
+from . import streaming
+from .log import get_logger
+
+log = get_logger(__name__)
 
 BASE_DIR = ""
 
+#: Static files of at least this size are streamed with ``sendfile``.
+SENDFILE_THRESHOLD = 64 * 1024
+
+#: Encoded ``Vary`` line of responses negotiated on ``Accept-Encoding``.
+VARY_ACCEPT_ENCODING = b"Vary: Accept-Encoding\r\n"
+
+#: Encoded ``Transfer-Encoding`` line of streamed responses.
+TRANSFER_ENCODING_CHUNKED = b"Transfer-Encoding: chunked\r\n"
+
+#: :func:`parse_range` result for a range outside the file.
+RANGE_UNSATISFIABLE = (-1, -1)
+
+
+def parse_range(value, size):
+    """
+    Parses a single-range ``Range`` header value against a file size.
+
+    Multiple ranges and malformed values are ignored (the whole file is sent).
+
+    :params value (str): ``Range`` header value, e.g. ``"bytes=0-99"``.
+    :params size (int): size of the file.
+
+    :rtype tuple: inclusive ``(start, end)``, :data:`RANGE_UNSATISFIABLE`,
+        or ``None`` to send the whole file.
+    """
+    unit, sep, spec = value.partition('=')
+    if not sep or unit.strip().lower() != 'bytes' or ',' in spec:
+        return None
+
+    first, sep, last = spec.strip().partition('-')
+    try:
+        if not first:
+            # Suffix range: the last N bytes
+            suffix = int(last)
+            if suffix <= 0 or size == 0:
+                return RANGE_UNSATISFIABLE
+            return max(0, size - suffix), size - 1
+        start = int(first)
+        end = int(last) if last else None
+    except ValueError:
+        return None
+
+    if end is not None and start > end:
+        return None
+    if start >= size:
+        return RANGE_UNSATISFIABLE
+    return start, size - 1 if end is None else min(end, size - 1)
+
 class Response():   
     """The :class:`Response <Response>` object, which contains a
     server's response to an HTTP request.
@@ -41,13 +98,11 @@ class Response():
     It is used to construct and serve HTTP responses in a custom web server.
 
     :attrs status_code (int): HTTP status code (e.g., 200, 404).
-    :attrs headers (dict): dictionary of response headers.
+    :attrs headers (Headers): case-insensitive response headers.
     :attrs url (str): url of the response.
     :attrsencoding (str): encoding used for decoding response content.
-    :attrs history (list): list of previous Response objects (for redirects).
     :attrs reason (str): textual reason for the status code (e.g., "OK", "Not Found").
     :attrs cookie (CaseInsensitiveDict): response cookie.
-    :attrs elapsed (datetime.timedelta): time taken to complete the request.
     :attrs request (PreparedRequest): the original request object.
 
     Usage::
@@ -63,20 +118,23 @@ class Response():
         "_content",
         "_header",
         "status_code",
-        "method",
         "headers",
         "url",
-        "history",
         "encoding",
         "reason",
         "cookie",
-        "elapsed",
         "request",
-        "body",
-        "reason",
         "auth",
+        "content_length",
+        "file_body",
+        "stream_body",
     ]
 
+    __slots__ = tuple(__attrs__)
+
+    #: Cache of static files shared by every response of the process.
+    static_cache = StaticCache()
+
 
     def __init__(self, request=None):
         """
@@ -86,8 +144,7 @@ class Response():
         """
 
         self._content = False
-        self._content_consumed = False
-        self._next = None
+        self._header = None
 
         #: Integer Code of responded HTTP Status, e.g. 404 or 200.
         self.status_code = None
@@ -95,7 +152,7 @@ class Response():
         #: Case-insensitive Dictionary of Response Headers.
         #: For example, ``headers['content-type']`` will return the
         #: value of a ``'Content-Type'`` response header.
-        self.headers = {}
+        self.headers = Headers()
 
         #: URL location of Response.
         self.url = None
@@ -103,25 +160,27 @@ class Response():
         #: Encoding to decode with when accessing response text.
         self.encoding = None
 
-        #: A list of :class:`Response <Response>` objects from
-        #: the history of the Request.
-        self.history = []
-
         #: Textual reason of responded HTTP Status, e.g. "Not Found" or "OK".
         self.reason = None
 
         #: A of cookie the response headers.
         self.cookie = {}
 
-        #: The amount of time elapsed between sending the request
-        self.elapsed = datetime.timedelta(0)
-
         #: The :class:`PreparedRequest <PreparedRequest>` object to which this
         #: is a response.
         self.request = None
 
         self.auth=""
 
+        #: Content-Length when it differs from ``len(_content)`` (HEAD, sendfile).
+        self.content_length = None
+
+        #: ``(filepath, offset, count)`` of a body to stream with :meth:`send_file`.
+        self.file_body = None
+
+        #: ``(chunks, chunked)`` of a handler stream to send with :meth:`send_stream`.
+        self.stream_body = None
+
 
     def get_mime_type(self, path):
         """
@@ -189,6 +248,21 @@ class Response():
         return base_dir
 
 
+    def resolve_path(self, path, base_dir):
+        """
+        Maps a request path to a file path under ``base_dir``.
+
+        :params path (str): relative path to the file.
+        :params base_dir (str): base directory where the file is located.
+
+        :rtype str: file path, ``index.html`` for directories.
+        """
+        filepath = os.path.join(base_dir, path.lstrip('/'))
+        if os.path.isdir(filepath):
+            filepath = os.path.join(filepath, 'index.html')
+        return filepath
+
+
     def build_content(self, path, base_dir):
         """
         Loads the objects file from storage space.
@@ -198,96 +272,151 @@ class Response():
 
         :rtype tuple: (int, bytes) representing content length and content data.
         """
-        import os
-
-        filepath = os.path.join(base_dir, path.lstrip('/'))
+        filepath = self.resolve_path(path, base_dir)
         # print("[Response] serving the object at location {}".format(filepath))
 
-        #
-        #  TODO: implement the step of fetch the object file
-        #        store in the return value of content
-        #
-
         # --- MODIFICATION ---
         # Authentication logic removed from here and moved to build_response.
         # This function now only loads the file content based on path.
         # --- END MODIFICATION ---
 
-        if os.path.isdir(filepath):
-            filepath = os.path.join(filepath, 'index.html')
-        
+        # Files are served as stored, no text decoding round trip.
         try:
-            if 'images' in filepath or path.endswith(('.png', '.jpg', '.jpeg')):
-                with open(filepath, "rb") as file:
-                    content = file.read()
-            else:
-                with open(filepath, "r", encoding="utf-8") as file:
-                    content = file.read().encode('utf-8')
+            with open(filepath, "rb") as file:
+                content = file.read()
         except FileNotFoundError:
-            print(f"[Response] File not found: {filepath}")
+            log.debug("file not found", path=filepath)
             raise
         except Exception as e:
-            print(f"[Response] Error processing file: {e}")
+            log.error("file read failed", path=filepath, error=str(e))
             raise
 
         return len(content), content
 
 
-    def build_response_header(self, request):
+    def build_file_response(self, request, filepath):
         """
-        Constructs the HTTP response headers based on the class:`Request <Request>
-        and internal attributes.
+        Builds the response for a static file, honoring ``HEAD`` and a single
+        ``Range: bytes=...`` request.
+
+        Files of at least :data:`SENDFILE_THRESHOLD` bytes are not read: the
+        returned bytes hold only the status line and headers, and
+        :attr:`file_body` tells the caller which byte span to stream with
+        :meth:`send_file`.
 
         :params request (class:`Request <Request>`): incoming request object.
+        :params filepath (str): path of the file to serve.
 
-        :rtypes bytes: encoded HTTP response header.
+        :rtype bytes: status line, headers and, for small files, the content.
+
+        :raises OSError: If the file cannot be opened.
         """
-        reqhdr = request.headers
-        rsphdr = self.headers
+        size = os.stat(filepath).st_size
+        self.headers['Accept-Ranges'] = 'bytes'
+
+        start, length, status = 0, size, '200 OK'
+        byte_range = parse_range(request.headers.get('range', ''), size)
+        if byte_range == RANGE_UNSATISFIABLE:
+            return self.build_error('416 Range Not Satisfiable',
+                                    {'Content-Range': 'bytes */{}'.format(size)})
+        if byte_range is not None:
+            start, end = byte_range
+            length = end - start + 1
+            status = '206 Partial Content'
+            self.headers['Content-Range'] = 'bytes {}-{}/{}'.format(start, end, size)
+
+        self.content_length = length
+        if request.method == 'HEAD':
+            self._content = b''
+        elif length >= SENDFILE_THRESHOLD:
+            self._content = b''
+            self.file_body = (filepath, start, length)
+        else:
+            with open(filepath, 'rb') as file:
+                file.seek(start)
+                self._content = file.read(length)
 
-        # print("COOKIES!!!! {}", "; ".join([str(x)+"="+str(y) for x,y in self.cookie.items()]))
+        self._header = self.build_response_header(request, status)
+        return self._header + self._content
 
-        #Build dynamic headers
-        headers = {
-                "Accept": "{}".format(reqhdr.get("Accept", "application/json")),
-                "Accept-Language": "{}".format(reqhdr.get("Accept-Language", "en-US,en;q=0.9")),
-                "Authorization": "{}".format(reqhdr.get("Authorization", "Basic <credentials>")),
-                "Cache-Control": "no-cache",
-                "Content-Type": "{}".format(rsphdr.get('Content-Type', "")),
-                "Content-Length": "{}".format(len(self._content)),
-                #"Cookie": "{}".format(reqhdr.get("Cookie", "sessionid=xyz789")), #dummy cooki
-        #
-        # TODO prepare the request authentication
-        #
-	    # self.auth = ...
-                "Set-Cookie": "; ".join([str(x)+"="+str(y) for x,y in self.cookie.items()]), # 
-                "Date": "{}".format(datetime.datetime.utcnow().strftime("%a, %d %b %Y %H:%M:%S GMT")),
-                "Max-Forward": "10",
-                "Pragma": "no-cache",
-                "Proxy-Authorization": "Basic dXNlcjpwYXNz",  # example base64
-                "Warning": "199 Miscellaneous warning",
-                "User-Agent": "{}".format(reqhdr.get("User-Agent", "Chrome/123.0.0.0")),
-            }
-
-        # Header text alignment
-            #
-            #  TODO: implement the header building to create formated
-            #        header from the provied headers
-            #
-        #
-        # TODO prepare the request authentication
-        #
-	# self.auth = ...
-        
 
-        fmt_header = ''
-        for key in headers:
-            # Don't send empty Set-Cookie header
-            if key == "Set-Cookie" and not headers[key]:
-                continue
-            fmt_header += (key + ': ' + headers[key] + '\n')
-        fmt_header += '\r\n'
-        return fmt_header.encode('utf-8')
+    def build_cached_response(self, request, entry, extra=b""):
+        """
+        Answers a static file request from a :class:`CacheEntry <CacheEntry>`
+        in the encoding negotiated from ``Accept-Encoding``: ``304 Not Modified``
+        when the conditional headers match, the headers only for ``HEAD``,
+        otherwise the precomputed response. Uncached content is left to
+        :meth:`send_file`.
+
+        :params request (class:`Request <Request>`): incoming request object.
+        :params entry (CacheEntry): cached file.
+        :params extra (bytes): additional encoded header lines (e.g. ``Set-Cookie``);
+            such responses are never answered with 304.
+
+        :rtype bytes: encoded response.
+        """
+        keep_alive = self.keep_alive()
+        variant = entry.select(request.headers.get('accept-encoding', ''))
+        if not extra and entry.is_fresh(request.headers, variant):
+            return variant.not_modified(keep_alive)
+        if request.method == 'HEAD':
+            return variant.header(keep_alive, extra)
+        if variant.content is None:
+            self.file_body = (entry.filepath, 0, entry.size)
+        return variant.response(keep_alive, extra)
+
+
+    def send_file(self, conn):
+        """
+        Streams :attr:`file_body` to a blocking socket with ``sendfile``,
+        straight from the file descriptor.
+
+        :params conn (socket.socket): the client connection.
+
+        :rtype int: bytes sent.
+        """
+        filepath, offset, count = self.file_body
+        with open(filepath, 'rb') as file:
+            return conn.sendfile(file, offset, count)
+
+
+    def build_response_header(self, request, status='200 OK'):
+        """
+        Constructs the HTTP response head from a prepared header template, the
+        content length, the cookie and the headers set while preparing the
+        content (``Accept-Ranges``, ``Content-Range``, ...).
+
+        :params request (class:`Request <Request>`): incoming request object.
+        :params status (str): status code and reason phrase.
+
+        :rtypes bytes: encoded status line and HTTP response header.
+        """
+        extra = self.headers.copy()
+        extra.pop('Content-Type', None)
+        if self.cookie:
+            extra.add('Set-Cookie', "; ".join([str(x)+"="+str(y) for x,y in self.cookie.items()]))
+
+        length = len(self._content) if self.content_length is None else self.content_length
+        return headers.build_head(status, self.headers.get('Content-Type'), length,
+                                  self.keep_alive(), headers.format_headers(extra))
+
+
+    def keep_alive(self):
+        """
+        Tells whether the connection stays open after this response.
+
+        :rtype bool: ``True`` if the originating request asked for keep-alive.
+        """
+        return bool(self.request is not None and getattr(self.request, 'keep_alive', False))
+
+
+    def build_connection_header(self):
+        """
+        Constructs the ``Connection`` header line matching :meth:`keep_alive`.
+
+        :rtype bytes: ``Connection`` header line terminated by CRLF.
+        """
+        return headers.CONNECTION[self.keep_alive()]
 
 
     def build_notfound(self):
@@ -297,34 +426,184 @@ class Response():
         :rtype bytes: Encoded 404 response.
         """
 
-        return (
-                "HTTP/1.1 404 Not Found\r\n"
-                "Accept-Ranges: bytes\r\n"
-                "Content-Type: text/html\r\n"
-                "Content-Length: 13\r\n"
-                "Cache-Control: max-age=86000\r\n"
-                "Connection: close\r\n"
-                "\r\n"
-                "404 Not Found"
-            ).encode('utf-8')
+        return headers.fixed_response('404 Not Found', 'text/html', b'404 Not Found', self.keep_alive())
+
+
+    def build_method_not_allowed(self, allowed):
+        """
+        Constructs a 405 Method Not Allowed HTTP response.
+
+        :params allowed (iterable): methods routed for the requested path.
+
+        :rtype bytes: Encoded 405 response with an ``Allow`` header.
+        """
+
+        allow = "Allow: {}\r\n".format(", ".join(allowed)).encode('utf-8')
+        return headers.fixed_response('405 Method Not Allowed', 'text/plain',
+                                      b'405 Method Not Allowed', self.keep_alive(), allow)
+
+
+    def build_unrouted(self):
+        """
+        Answers a request no route or file matched: 405 if the path is routed
+        for other methods, 404 otherwise.
+
+        :rtype bytes: Encoded 405 or 404 response.
+        """
+        allowed = getattr(self.request, 'allowed', ())
+        if allowed:
+            return self.build_method_not_allowed(allowed)
+        return self.build_notfound()
+
+
+    def build_no_content(self):
+        """
+        Constructs the ``204 No Content`` response of a route handler that
+        returned ``None``.
+
+        :rtype bytes: Encoded 204 response.
+        """
+        return headers.build_head('204 No Content', None, None, self.keep_alive())
+
+
+    def build_error(self, status, extra=None):
+        """
+        Constructs a plain-text error response for the given status line,
+        e.g. ``"400 Bad Request"`` or ``"413 Payload Too Large"``.
+
+        :params status (str): status code and reason phrase.
+        :params extra (dict): optional extra headers.
+
+        :rtype bytes: Encoded error response.
+        """
+        return headers.fixed_response(status, 'text/plain', status.encode('utf-8'),
+                                      self.keep_alive(), headers.format_headers(extra or {}))
 
 
     def build_unauthorized(self):
         # [cite: 352, 356]
-        return (
-                "HTTP/1.1 401 Unauthorized\r\n"
-                "Accept-Ranges: bytes\r\n"
-                "Content-Type: text/html\r\n"
-                "Content-Length: 16\r\n"
-                "Cache-Control: max-age=86000\r\n"
-                "Connection: close\r\n"
-                "\r\n"
-                "401 Unauthorized"
-            ).encode('utf-8')
-        
+        return headers.fixed_response('401 Unauthorized', 'text/html', b'401 Unauthorized', self.keep_alive())
+
     def return_peers(self):
         return "".encode('utf-8')
 
+    def build_hook_response(self, request, hook_res):
+        """
+        Builds the response for a route handler result.
+
+        The result is ``body``, ``(body, status)`` or ``(body, status, content_type)``:
+
+        - ``dict`` / ``list``: serialized with :mod:`serializer <daemon.serializer>`.
+        - :class:`JSONResponse <JSONResponse>`: its cached encoding (and cached
+          compressed variant) is sent as is.
+        - ``bytes`` / ``bytearray`` / ``memoryview``: sent untouched,
+          ``application/octet-stream`` unless a content type is given.
+        - an iterator / generator of chunks, or a :class:`StreamingResponse
+          <StreamingResponse>`: streamed, see :meth:`build_stream_response`.
+        - anything else: ``str()`` as ``text/plain``.
+
+        :params request (class:`Request <Request>`): incoming request object.
+        :params hook_res: the value returned by the route handler.
+
+        :rtype bytes: complete HTTP response.
+        """
+        content_type = None
+        if isinstance(hook_res, tuple):
+            body = hook_res[0]
+            status = hook_res[1] if len(hook_res) > 1 else None
+            if len(hook_res) > 2:
+                content_type = hook_res[2]
+        else:
+            body = hook_res
+            status = None
+
+        if isinstance(body, streaming.StreamingResponse) or streaming.is_stream(body):
+            return self.build_stream_response(request, body, status, content_type)
+
+        encoding = None
+        extra = VARY_ACCEPT_ENCODING
+        if isinstance(body, serializer.JSONResponse):
+            status = status or body.status
+            content_type = content_type or 'application/json'
+            body_bytes = body.encoded()
+            if len(body_bytes) >= compression.MIN_SIZE:
+                encoding = compression.negotiate(request.headers.get('accept-encoding', ''))
+                if encoding is not None:
+                    body_bytes = body.encoded(encoding)
+        elif isinstance(body, (bytes, bytearray, memoryview)):
+            content_type = content_type or 'application/octet-stream'
+            body_bytes = memoryview(body).cast('B') if isinstance(body, memoryview) else body
+            extra = b''
+        else:
+            if isinstance(body, (dict, list)):
+                body_bytes = serializer.dumps(body)
+                content_type = content_type or 'application/json'
+            else:
+                body_bytes = str(body).encode('utf-8')
+                content_type = content_type or 'text/plain'
+            body_bytes, encoding = compression.encode_body(
+                body_bytes, content_type, request.headers.get('accept-encoding', ''))
+
+        header = headers.build_head(status or '200 OK', content_type, len(body_bytes),
+                                    self.keep_alive(), extra, encoding)
+        if request.method == 'HEAD':
+            return header
+        return header + body_bytes
+
+
+    def build_stream_response(self, request, body, status=None, content_type=None):
+        """
+        Builds the head of a streamed handler result and records the chunks
+        in :attr:`stream_body` for the serving engine.
+
+        The body is sent with its declared ``Content-Length``, else with
+        ``Transfer-Encoding: chunked``; HTTP/1.0 clients get a body delimited
+        by closing the connection.
+
+        :params request (class:`Request <Request>`): incoming request object.
+        :params body: chunk iterator or :class:`StreamingResponse <StreamingResponse>`.
+        :params status (str): status overriding the stream's one.
+        :params content_type (str): content type overriding the stream's one.
+
+        :rtype bytes: status line and headers.
+        """
+        if not isinstance(body, streaming.StreamingResponse):
+            body = streaming.StreamingResponse(body)
+
+        extra = b''
+        chunked = body.length is None and request.version == 'HTTP/1.1'
+        if chunked:
+            extra = TRANSFER_ENCODING_CHUNKED
+        elif body.length is None:
+            request.keep_alive = False
+
+        header = headers.build_head(status or body.status, content_type or body.content_type,
+                                    body.length, self.keep_alive(), extra)
+        if request.method == 'HEAD':
+            streaming.close_stream(body.chunks)
+        else:
+            self.stream_body = (body.chunks, chunked)
+        return header
+
+
+    def send_stream(self, conn):
+        """
+        Sends :attr:`stream_body` to a blocking socket, one chunk at a time;
+        ``sendall`` blocks until the client has room for the next one.
+
+        :params conn (socket.socket): the client connection.
+
+        :rtype int: bytes sent.
+
+        :raises StreamAborted: If the handler's iterator raises.
+        """
+        sent = 0
+        for data in streaming.iter_wire(*self.stream_body):
+            conn.sendall(data)
+            sent += len(data)
+        return sent
+
+
     def build_response(self, request):
         """
         Builds a full HTTP response including headers and content based on the request.
@@ -339,31 +618,15 @@ class Response():
         # If a route handler (WeApRous hook) produced a result, return it directly
         hook_res = getattr(request, 'hook_result', None)
         if hook_res is not None:
-            import json as _json
+            return self.build_hook_response(request, hook_res)
 
-            # Accept either (body, status) or body only
-            if isinstance(hook_res, tuple):
-                body = hook_res[0]
-                status = hook_res[1] if len(hook_res) > 1 else '200 OK'
-            else:
-                body = hook_res
-                status = '200 OK'
-
-            if isinstance(body, (dict, list)):
-                body_bytes = _json.dumps(body).encode('utf-8')
-                content_type = 'application/json'
-            else:
-                body_bytes = str(body).encode('utf-8')
-                content_type = 'text/plain'
-
-            header = (
-                f"HTTP/1.1 {status}\r\n"
-                f"Content-Type: {content_type}\r\n"
-                f"Content-Length: {len(body_bytes)}\r\n"
-                "Connection: close\r\n"
-                "\r\n"
-            ).encode('utf-8')
-            return header + body_bytes
+        # A routed request never falls back to the static files
+        if request.hook is not None:
+            if request.hook_error is not None:
+                return self.build_error('500 Internal Server Error')
+            return self.build_no_content()
+        if request.allowed:
+            return self.build_method_not_allowed(request.allowed)
 
         path = request.path
         mime_type = self.get_mime_type(path)
@@ -372,30 +635,29 @@ class Response():
         # --- START MODIFICATION (Task 1A) ---
         # Handle POST /login for authentication 
         if path == '/login' and request.method == 'POST':
-            authe = Authentication()
-            # Check credentials (e.g., admin/password) [cite: 350]
-            if authe.authenticate(self.request.body):
+            # Credentials are checked in memory, the session lives in memory
+            session = request.authentication.login(self.request.form)
+            if session is not None:
                 # Task 1A: Valid credentials
-                print("[Response] Authentication successful for /login")
-                # Set cookie for header 
-                self.cookie["auth"] = 'true'
-                
-                # Task 1A: Respond with index page 
-                path = '/index.html' # Serve index.html
-                mime_type = 'text/html'
-                
-                try:
-                    base_dir = self.prepare_content_type(mime_type)
-                    c_len, self._content = self.build_content(path, base_dir)
-                    self._header = self.build_response_header(request)
-                    status = 'HTTP/1.1 200 OK\r\n'.encode('utf-8')
-                    return status + self._header + self._content
-                except Exception:
-                    return self.build_notfound() # If index.html is missing
+                log.info("login", user=session.username)
+                # Set the session cookie
+                cookie = headers.format_headers(
+                    {'Set-Cookie': request.authentication.sessions.cookie(session)})
+
+                # Task 1A: Respond with index page from the static cache
+                entry = self.static_cache.get('/index.html')
+                if entry is None:
+                    try:
+                        base_dir = self.prepare_content_type(mime_type = 'text/html')
+                        entry = self.static_cache.load(
+                            '/index.html', self.resolve_path('/index.html', base_dir), 'text/html')
+                    except Exception:
+                        return self.build_notfound() # If index.html is missing
+                return self.build_cached_response(request, entry, extra=cookie)
 
             else:
                 # Task 1A: Invalid credentials, respond with 401 
-                print("[Response] Authentication failed for /login")
+                log.warning("login failed", client=request.headers.get('x-forwarded-for'))
                 return self.build_unauthorized()
 
         # --- END MODIFICATION ---
@@ -415,6 +677,18 @@ class Response():
             
         # --- END MODIFICATION ---
 
+        # Only GET/HEAD fall back to static files; unrouted requests with
+        # other methods are answered without touching the filesystem.
+        if request.method not in ('GET', 'HEAD'):
+            return self.build_unrouted()
+
+        # Range requests are served from disk, everything else from the cache
+        ranged = 'range' in request.headers
+        if not ranged:
+            entry = self.static_cache.get(path)
+            if entry is not None:
+                return self.build_cached_response(request, entry)
+
         base_dir = ""
 
         # Try to prepare content type and get base directory
@@ -432,19 +706,18 @@ class Response():
                 # Default attempt for other types
                 base_dir = self.prepare_content_type(mime_type)
         except ValueError: # Catches unsupported MIME types
-            print(f"Unsupported MIME type: {mime_type}")
+            log.debug("unsupported mime type", path=path, mime_type=mime_type)
             return self.build_notfound()
         except Exception as e: # Catch other potential errors
-            print(f"Error preparing content type: {e}")
+            log.error("content type failed", path=path, error=str(e))
             return self.build_notfound()
 
         # Try to build the content
         try:
-            c_len, self._content = self.build_content(path, base_dir)
+            filepath = self.resolve_path(path, base_dir)
+            if ranged:
+                return self.build_file_response(request, filepath)
+            entry = self.static_cache.load(path, filepath, self.headers['Content-Type'])
+            return self.build_cached_response(request, entry)
         except Exception: # Catch file not found, etc.
-            return self.build_notfound()
-
-        self._header = self.build_response_header(request)
-        status = 'HTTP/1.1 200 OK\r\n'.encode('utf-8')
-
-        return status + self._header + self._content
\ No newline at end of file
+            return self.build_unrouted()
\ No newline at end of file
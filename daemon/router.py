@@ -0,0 +1,233 @@
+#
+# Copyright (C) 2025 pdnguyen of HCMC University of Technology VNU-HCM.
+# All rights reserved.
+# This file is part of the CO3093/CO3094 course.
+#
+# WeApRous release
+#
+# The authors hereby grant to Licensee personal permission to use
+# and modify the Licensed Source Code for the sole purpose of studying
+# while attending the course
+#
+
+"""
+daemon.router
+~~~~~~~~~~~~~~~~~
+
+This module provides the compiled routing table used by :class:`WeApRous <WeApRous>`.
+Route patterns are split into path segments and stored in a segment trie, so a
+lookup walks one node per segment of the request path. Segments written as
+``<name>`` or ``<type:name>`` capture typed path parameters:
+
+- ``<name>`` / ``<str:name>``: one non-empty segment.
+- ``<int:name>``: one segment of digits, converted to ``int``.
+- ``<float:name>``: one segment converted to ``float``.
+- ``<path:name>``: the rest of the path, slashes included.
+
+The :class:`Router` is also a mapping of ``(method, pattern)`` to handler, so
+code that treats routes as a plain dict keeps working.
+
+Usage::
+
+  >>> router = Router()
+  >>> router[('GET', '/channels/<name>')] = get_channel
+  >>> router.match('GET', '/channels/general')
+  (<function get_channel>, {'name': 'general'}, ())
+  >>> router.match('POST', '/channels/general')
+  (None, {}, ('GET',))
+"""
+
+from collections.abc import MutableMapping
+
+
+def _convert_str(value):
+    if not value:
+        raise ValueError("empty segment")
+    return value
+
+
+#: Converters for typed path parameters.
+CONVERTERS = {
+    "str": _convert_str,
+    "int": int,
+    "float": float,
+    "path": _convert_str,
+}
+
+
+class _Node:
+    """One path segment of the routing trie."""
+
+    __slots__ = ("static", "params", "catchall", "handlers")
+
+    def __init__(self):
+        #: Literal segment -> child node.
+        self.static = {}
+        #: ``(name, converter, child)`` for ``<type:name>`` segments.
+        self.params = []
+        #: ``(name, handlers)`` for a trailing ``<path:name>`` segment.
+        self.catchall = None
+        #: HTTP method -> handler for routes ending at this node.
+        self.handlers = {}
+
+
+def _split(path):
+    """Splits a path into its segments, ignoring the leading slash."""
+    return path.strip("/").split("/") if path.strip("/") else []
+
+
+def _parse_param(segment):
+    """
+    Parses a ``<type:name>`` segment.
+
+    :rtype tuple: ``(type, name)``, or ``None`` for a literal segment.
+
+    :raises ValueError: If the converter type is unknown.
+    """
+    if not (segment.startswith("<") and segment.endswith(">")):
+        return None
+    kind, sep, name = segment[1:-1].partition(":")
+    if not sep:
+        kind, name = "str", kind
+    if kind not in CONVERTERS:
+        raise ValueError("Unknown path parameter type {!r} in {!r}".format(kind, segment))
+    return kind, name
+
+
+class Router(MutableMapping):
+    """
+    A compiled routing table mapping ``(method, pattern)`` to handlers.
+
+    Patterns without parameters are also kept in an exact-match dict, so the
+    common case is a single hash lookup.
+
+    The table also carries the :class:`Middleware <Middleware>` list applied
+    to every request served with it.
+    """
+
+    def __init__(self, routes=None):
+        #: Middlewares in registration order.
+        self.middleware = []
+        self._routes = {}
+        self._exact = {}
+        self._root = _Node()
+        if routes:
+            self.update(routes)
+
+    def __getitem__(self, key):
+        return self._routes[key]
+
+    def __setitem__(self, key, handler):
+        method, pattern = key
+        method = method.upper()
+        self._routes[(method, pattern)] = handler
+        self._insert(method, pattern, handler)
+
+    def __delitem__(self, key):
+        del self._routes[key]
+        self._rebuild()
+
+    def __iter__(self):
+        return iter(self._routes)
+
+    def __len__(self):
+        return len(self._routes)
+
+    def __repr__(self):
+        return "Router({!r})".format(self._routes)
+
+    def _rebuild(self):
+        """Recompiles the trie from the registered routes."""
+        self._exact = {}
+        self._root = _Node()
+        for (method, pattern), handler in self._routes.items():
+            self._insert(method, pattern, handler)
+
+    def _insert(self, method, pattern, handler):
+        """Adds one route to the trie."""
+        segments = _split(pattern)
+        if not any(_parse_param(s) for s in segments):
+            self._exact[(method, "/" + "/".join(segments))] = handler
+
+        node = self._root
+        for i, segment in enumerate(segments):
+            param = _parse_param(segment)
+            if param is None:
+                node = node.static.setdefault(segment, _Node())
+                continue
+
+            kind, name = param
+            if kind == "path":
+                if i != len(segments) - 1:
+                    raise ValueError("<path:{}> must be the last segment of {!r}".format(name, pattern))
+                if node.catchall is None:
+                    node.catchall = (name, {})
+                node.catchall[1][method] = handler
+                return
+
+            for p_name, p_conv, child in node.params:
+                if p_name == name and p_conv is CONVERTERS[kind]:
+                    node = child
+                    break
+            else:
+                child = _Node()
+                node.params.append((name, CONVERTERS[kind], child))
+                node = child
+
+        node.handlers[method] = handler
+
+    def match(self, method, path):
+        """
+        Resolves a request path.
+
+        :param method (str): HTTP method of the request.
+        :param path (str): request path, without query string.
+
+        :rtype tuple: ``(handler, params, allowed)``. ``handler`` is ``None``
+            when nothing matched; ``allowed`` then lists the methods that
+            would match the path (empty for an unknown path).
+        """
+        handler = self._exact.get((method, path))
+        if handler is not None:
+            return handler, {}, ()
+
+        segments = _split(path)
+        params = {}
+        handlers = self._walk(self._root, segments, 0, params)
+        if handlers is None:
+            return None, {}, ()
+        if method in handlers:
+            return handlers[method], params, ()
+        if method == "HEAD" and "GET" in handlers:
+            return handlers["GET"], params, ()
+        return None, {}, tuple(sorted(handlers))
+
+    def _walk(self, node, segments, i, params):
+        """Depth-first trie walk; literal segments win over parameters."""
+        if i == len(segments):
+            return node.handlers or None
+
+        segment = segments[i]
+        child = node.static.get(segment)
+        if child is not None:
+            found = self._walk(child, segments, i + 1, params)
+            if found is not None:
+                return found
+
+        for name, convert, child in node.params:
+            try:
+                value = convert(segment)
+            except ValueError:
+                continue
+            params[name] = value
+            found = self._walk(child, segments, i + 1, params)
+            if found is not None:
+                return found
+            del params[name]
+
+        if node.catchall is not None:
+            name, handlers = node.catchall
+            params[name] = "/".join(segments[i:])
+            return handlers
+
+        return None
@@ -0,0 +1,156 @@
+#
+# Copyright (C) 2025 pdnguyen of HCMC University of Technology VNU-HCM.
+# All rights reserved.
+# This file is part of the CO3093/CO3094 course.
+#
+# WeApRous release
+#
+# The authors hereby grant to Licensee personal permission to use
+# and modify the Licensed Source Code for the sole purpose of studying
+# while attending the course
+#
+
+"""
+daemon.serializer
+~~~~~~~~~~~~~~~~~
+
+This module provides the JSON serialization used for route handler results and
+request bodies. The standard :mod:`json` module is the default; ``orjson`` or
+``ujson`` are used instead when installed, or selected with :func:`configure`.
+
+A :class:`JSONResponse` keeps the encoded bytes (and their compressed variants)
+of a value that many clients poll, e.g. the tracker's peer list, until
+:meth:`JSONResponse.invalidate` reports that the data changed.
+
+Usage Example:
+--------------
+>>> dumps({"a": 1})
+b'{"a": 1}'
+>>> peers = JSONResponse(lambda: list(active_peers.values()))
+>>> peers.body          # encoded once
+>>> peers.invalidate()  # after active_peers changed
+
+"""
+
+import json
+import threading
+
+from . import compression
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+#: Serializer backends in order of preference, when installed.
+BACKENDS = ("orjson", "ujson", "json")
+
+
+def _backend_functions(name):
+    """Returns ``(dumps, loads)`` of a backend; ``dumps`` returns bytes."""
+    if name == "orjson" and orjson is not None:
+        return (lambda obj: orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)), orjson.loads
+    if name == "ujson" and ujson is not None:
+        return (lambda obj: ujson.dumps(obj, ensure_ascii=False).encode('utf-8')), ujson.loads
+    if name == "json":
+        return (lambda obj: json.dumps(obj).encode('utf-8')), json.loads
+    raise ValueError("JSON backend {!r} is not available".format(name))
+
+
+def configure(backend=None):
+    """
+    Selects the JSON backend.
+
+    :param backend (str): ``"orjson"``, ``"ujson"`` or ``"json"``; ``None``
+        picks the first installed one of :data:`BACKENDS`.
+
+    :raises ValueError: If the backend is unknown or not installed.
+    """
+    global BACKEND, dumps, loads
+    if backend is None:
+        backend = next(name for name in BACKENDS
+                       if name == "json" or globals()[name] is not None)
+    dumps, loads = _backend_functions(backend)
+    BACKEND = backend
+
+
+#: Name of the selected backend.
+BACKEND = None
+#: ``dumps(obj) -> bytes`` of the selected backend.
+dumps = None
+#: ``loads(bytes | str) -> object`` of the selected backend.
+loads = None
+
+configure()
+
+
+class JSONResponse:
+    """
+    A JSON handler result whose encoding is cached.
+
+    The body is encoded on first use and reused for every response until
+    :meth:`invalidate` (or :meth:`set`) bumps the data version. Compressed
+    variants are cached per version as well.
+
+    :param data: the value to serialize, or a callable returning it (called
+        when the cache is stale).
+    :param status (str): status code and reason phrase.
+    """
+
+    __attrs__ = [
+        "data",
+        "status",
+        "version",
+    ]
+
+    def __init__(self, data=None, status="200 OK"):
+        self.data = data
+        self.status = status
+        #: Bumped whenever the underlying data changes.
+        self.version = 0
+        self._cached_version = -1
+        self._variants = {}
+        self._lock = threading.Lock()
+
+    def set(self, data):
+        """
+        Replaces the data and invalidates the cached encoding.
+
+        :param data: the new value or callable.
+        """
+        self.data = data
+        self.invalidate()
+
+    def invalidate(self):
+        """Marks the data as changed; the next response re-encodes it."""
+        self.version += 1
+
+    def encoded(self, encoding=None):
+        """
+        Returns the encoded body for the current data version.
+
+        :param encoding (str): content encoding, ``None`` for the identity body.
+
+        :rtype bytes: the JSON body, compressed when ``encoding`` is given.
+        """
+        with self._lock:
+            if self._cached_version != self.version:
+                version = self.version
+                data = self.data() if callable(self.data) else self.data
+                self._variants = {None: dumps(data)}
+                self._cached_version = version
+
+            body = self._variants.get(encoding)
+            if body is None:
+                body = self._variants[encoding] = compression.compress(self._variants[None], encoding)
+            return body
+
+    @property
+    def body(self):
+        """The identity JSON body, see :meth:`encoded`."""
+        return self.encoded()
@@ -0,0 +1,153 @@
+#
+# Copyright (C) 2025 pdnguyen of HCMC University of Technology VNU-HCM.
+# All rights reserved.
+# This file is part of the CO3093/CO3094 course.
+#
+# WeApRous release
+#
+# The authors hereby grant to Licensee personal permission to use
+# and modify the Licensed Source Code for the sole purpose of studying
+# while attending the course
+#
+
+"""
+daemon.session
+~~~~~~~~~~~~~~~~~
+
+This module provides the server-side session table used after ``/login``. A
+successful login creates a session under a random identifier which the client
+keeps in the ``sid`` cookie; validating a request is then one dict lookup and
+an expiry comparison. Sessions expire :data:`SESSION_TTL` seconds after they are
+created, and expired sessions are swept at most once per :data:`PURGE_INTERVAL`.
+
+Sessions live in the memory of the serving process: with pre-forked workers a
+session is only known to the worker that created it.
+
+Usage Example:
+--------------
+>>> sessions = SessionTable(ttl=3600)
+>>> session = sessions.create("admin")
+>>> sessions.get(session.sid).username
+'admin'
+>>> sessions.cookie(session)
+'sid=...; Path=/; Max-Age=3600; HttpOnly; SameSite=Lax'
+
+"""
+
+import secrets
+import threading
+import time
+
+#: Default lifetime of a session in seconds.
+SESSION_TTL = 3600
+#: Name of the cookie carrying the session identifier.
+SESSION_COOKIE = "sid"
+#: Seconds between two sweeps of expired sessions.
+PURGE_INTERVAL = 60.0
+
+
+class Session:
+    """
+    One logged in client.
+
+    :attrs sid (str): random session identifier.
+    :attrs username (str): authenticated user.
+    :attrs expires (float): monotonic expiry time.
+    """
+
+    __slots__ = ("sid", "username", "expires")
+
+    def __init__(self, sid, username, expires):
+        self.sid = sid
+        self.username = username
+        self.expires = expires
+
+
+class SessionTable:
+    """
+    A thread-safe table of :class:`Session` objects keyed by identifier.
+
+    :param ttl (float): session lifetime in seconds.
+    :param purge_interval (float): seconds between two sweeps of expired sessions.
+    """
+
+    __attrs__ = [
+        "ttl",
+        "purge_interval",
+    ]
+
+    def __init__(self, ttl=SESSION_TTL, purge_interval=PURGE_INTERVAL):
+        self.ttl = ttl
+        self.purge_interval = purge_interval
+        self._sessions = {}
+        self._lock = threading.Lock()
+        self._next_purge = time.monotonic() + purge_interval
+
+    def create(self, username):
+        """
+        Opens a session for an authenticated user.
+
+        :param username (str): authenticated user.
+
+        :rtype Session: the new session.
+        """
+        now = time.monotonic()
+        session = Session(secrets.token_urlsafe(32), username, now + self.ttl)
+        with self._lock:
+            self._sessions[session.sid] = session
+        if now >= self._next_purge:
+            self.purge(now)
+        return session
+
+    def get(self, sid):
+        """
+        Validates a session identifier.
+
+        :param sid (str): identifier from the session cookie, may be ``None``.
+
+        :rtype Session: the live session, or ``None`` if unknown or expired.
+        """
+        session = self._sessions.get(sid)
+        if session is None:
+            return None
+        if session.expires <= time.monotonic():
+            self.revoke(sid)
+            return None
+        return session
+
+    def revoke(self, sid):
+        """
+        Ends a session (logout).
+
+        :param sid (str): session identifier.
+        """
+        with self._lock:
+            self._sessions.pop(sid, None)
+
+    def purge(self, now=None):
+        """
+        Drops every expired session.
+
+        :param now (float): current monotonic time.
+
+        :rtype int: number of sessions dropped.
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            expired = [sid for sid, session in self._sessions.items() if session.expires <= now]
+            for sid in expired:
+                del self._sessions[sid]
+            self._next_purge = now + self.purge_interval
+        return len(expired)
+
+    def cookie(self, session):
+        """
+        :param session (Session): session to hand to the client.
+
+        :rtype str: ``Set-Cookie`` value carrying the session identifier.
+        """
+        return "{}={}; Path=/; Max-Age={}; HttpOnly; SameSite=Lax".format(
+            SESSION_COOKIE, session.sid, int(self.ttl))
+
+    def __len__(self):
+        return len(self._sessions)
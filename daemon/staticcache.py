@@ -0,0 +1,331 @@
+#
+# Copyright (C) 2025 pdnguyen of HCMC University of Technology VNU-HCM.
+# All rights reserved.
+# This file is part of the CO3093/CO3094 course.
+#
+# WeApRous release
+#
+# The authors hereby grant to Licensee personal permission to use
+# and modify the Licensed Source Code for the sole purpose of studying
+# while attending the course
+#
+
+"""
+daemon.staticcache
+~~~~~~~~~~~~~~~~~
+
+This module provides an in-memory cache of static files for :class:`Response <Response>`.
+An entry keeps the file content together with fully encoded response headers
+(``ETag``, ``Last-Modified``, ...) for keep-alive and close connections, so a
+cached request is answered with a dict lookup, the cached ``Date`` line and
+one send. Conditional
+requests (``If-None-Match``, ``If-Modified-Since``) get a precomputed
+``304 Not Modified``. Compressible files are gzip/deflate encoded once, when
+they are loaded, and the variant is picked from ``Accept-Encoding``.
+
+Entries are evicted in least recently used order once the cached bytes exceed
+a budget, and dropped when the file's mtime or size changes.
+
+Usage Example:
+--------------
+>>> cache = StaticCache(max_bytes=32 * 1024 * 1024)
+>>> entry = cache.get("/index.html") or cache.load("/index.html", "www/index.html", "text/html")
+>>> entry.select("gzip").response(keep_alive=True)
+b'HTTP/1.1 200 OK\\r\\nContent-Type: text/html\\r\\n...'
+
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from email.utils import formatdate, parsedate_to_datetime
+
+from . import compression
+from . import headers
+
+#: Default byte budget of the cache (content plus headers).
+MAX_BYTES = 32 * 1024 * 1024
+#: Default size above which only the headers of a file are cached.
+MAX_ENTRY_SIZE = 64 * 1024
+#: Default seconds between two mtime checks of the same entry.
+CHECK_INTERVAL = 1.0
+#: Default ``Cache-Control: max-age`` of static files; 0 makes clients revalidate.
+MAX_AGE = 0
+
+
+class Variant:
+    """
+    One content encoding of a cached file with its precomputed responses.
+
+    :attrs encoding (str): ``Content-Encoding``, ``None`` for the identity body.
+    :attrs etag (str): quoted entity tag of this representation.
+    :attrs content (bytes): body, or ``None`` for files streamed with sendfile.
+    """
+
+    __slots__ = ("encoding", "etag", "content", "_heads", "_not_modified")
+
+    _OK = headers.status_line("200 OK")
+    _NOT_MODIFIED = headers.status_line("304 Not Modified")
+
+    def __init__(self, encoding, etag, content, head, validators):
+        self.encoding = encoding
+        self.etag = etag
+        self.content = content
+
+        validators = ("ETag: {}\r\n".format(etag) + validators).encode('utf-8')
+        head = head.encode('utf-8') + validators
+
+        # Headers after the Date line, indexed by keep_alive
+        self._heads = tuple(head + c + b"\r\n" for c in headers.CONNECTION)
+        self._not_modified = tuple(validators + c + b"\r\n" for c in headers.CONNECTION)
+
+    @property
+    def nbytes(self):
+        """Memory held by this variant: body plus encoded headers."""
+        return len(self.content or b'') + len(self._heads[1]) + len(self._not_modified[1])
+
+    def header(self, keep_alive, extra=b""):
+        """
+        :param keep_alive (bool): whether the connection stays open.
+        :param extra (bytes): additional encoded header lines.
+
+        :rtype bytes: status line and headers of the ``200 OK`` response.
+        """
+        return b"".join((self._OK, headers.date_header(), extra, self._heads[keep_alive]))
+
+    def response(self, keep_alive, extra=b""):
+        """
+        :param keep_alive (bool): whether the connection stays open.
+        :param extra (bytes): additional encoded header lines.
+
+        :rtype bytes: the complete ``200 OK`` response (headers only when
+            :attr:`content` is not cached).
+        """
+        if self.content is None:
+            return self.header(keep_alive, extra)
+        return b"".join((self._OK, headers.date_header(), extra, self._heads[keep_alive], self.content))
+
+    def not_modified(self, keep_alive):
+        """
+        :param keep_alive (bool): whether the connection stays open.
+
+        :rtype bytes: the ``304 Not Modified`` response.
+        """
+        return b"".join((self._NOT_MODIFIED, headers.date_header(), self._not_modified[keep_alive]))
+
+
+class CacheEntry:
+    """
+    One cached static file. Compressible files also keep their ``gzip`` and
+    ``deflate`` variants, compressed once when the file is loaded.
+
+    :attrs filepath (str): path of the file on disk.
+    :attrs mtime (int): modification time in whole seconds.
+    :attrs size (int): file size in bytes.
+    :attrs variants (dict): content encoding (``None`` for identity) -> :class:`Variant`.
+    """
+
+    __slots__ = ("filepath", "mtime", "mtime_ns", "size", "variants", "checked", "nbytes")
+
+    def __init__(self, filepath, stat, content_type, content, max_age):
+        self.filepath = filepath
+        self.mtime_ns = stat.st_mtime_ns
+        self.mtime = int(stat.st_mtime)
+        self.size = stat.st_size
+        self.checked = time.monotonic()
+
+        etag = '"{:x}-{:x}"'.format(self.mtime_ns, self.size)
+        compressible = (content is not None and len(content) >= compression.MIN_SIZE
+                        and compression.is_compressible(content_type))
+        validators = (
+                "Last-Modified: {}\r\n"
+                "Cache-Control: {}\r\n"
+                "{}"
+            ).format(formatdate(self.mtime, usegmt=True),
+                     "max-age={}".format(max_age) if max_age else "no-cache",
+                     "Vary: Accept-Encoding\r\n" if compressible else "")
+
+        self.variants = {None: Variant(None, etag, content, (
+                "Content-Type: {}\r\n"
+                "Content-Length: {}\r\n"
+                "Accept-Ranges: bytes\r\n"
+            ).format(content_type, self.size), validators)}
+
+        if compressible:
+            for encoding in compression.ENCODINGS:
+                body = compression.compress(content, encoding)
+                if len(body) >= len(content):
+                    continue
+                self.variants[encoding] = Variant(encoding, etag[:-1] + '-' + encoding + '"', body, (
+                        "Content-Type: {}\r\n"
+                        "Content-Encoding: {}\r\n"
+                        "Content-Length: {}\r\n"
+                    ).format(content_type, encoding, len(body)), validators)
+
+        self.nbytes = sum(variant.nbytes for variant in self.variants.values())
+
+    def select(self, accept_encoding):
+        """
+        Picks the representation for an ``Accept-Encoding`` request header.
+
+        :param accept_encoding (str): ``Accept-Encoding`` value, may be empty.
+
+        :rtype Variant: the compressed variant the client prefers, else identity.
+        """
+        if len(self.variants) > 1:
+            encoding = compression.negotiate(
+                accept_encoding, [e for e in compression.ENCODINGS if e in self.variants])
+            if encoding is not None:
+                return self.variants[encoding]
+        return self.variants[None]
+
+    def is_fresh(self, headers, variant):
+        """
+        Evaluates the conditional request headers against a representation.
+
+        ``If-None-Match`` takes precedence over ``If-Modified-Since``.
+
+        :param headers (Headers): request headers.
+        :param variant (Variant): representation selected for the request.
+
+        :rtype bool: ``True`` if the client copy is current (answer 304).
+        """
+        if_none_match = headers.get('if-none-match')
+        if if_none_match is not None:
+            tags = [tag.strip() for tag in if_none_match.split(',')]
+            return '*' in tags or any(
+                (tag[2:] if tag.startswith('W/') else tag) == variant.etag for tag in tags)
+
+        if_modified_since = headers.get('if-modified-since')
+        if if_modified_since:
+            try:
+                since = parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+            return self.mtime <= since
+        return False
+
+
+class StaticCache:
+    """
+    A thread-safe LRU cache of :class:`CacheEntry` objects with a byte budget.
+
+    :param max_bytes (int): budget of cached content plus headers.
+    :param max_entry_size (int): files larger than this keep only their headers
+        cached; their content is streamed with sendfile.
+    :param check_interval (float): seconds during which an entry is served
+        without checking the file's mtime again.
+    :param max_age (int): ``Cache-Control: max-age`` sent with static files.
+    """
+
+    __attrs__ = [
+        "max_bytes",
+        "max_entry_size",
+        "check_interval",
+        "max_age",
+        "hits",
+        "misses",
+    ]
+
+    def __init__(self, max_bytes=MAX_BYTES, max_entry_size=MAX_ENTRY_SIZE,
+                 check_interval=CHECK_INTERVAL, max_age=MAX_AGE):
+        self.max_bytes = max_bytes
+        self.max_entry_size = max_entry_size
+        self.check_interval = check_interval
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Returns the entry cached for a request path, if it is still current.
+
+        :param key (str): request path.
+
+        :rtype CacheEntry: the entry, or ``None`` on a miss.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+
+        now = time.monotonic()
+        if now - entry.checked >= self.check_interval:
+            try:
+                stat = os.stat(entry.filepath)
+            except OSError:
+                stat = None
+            if stat is None or stat.st_mtime_ns != entry.mtime_ns or stat.st_size != entry.size:
+                self.invalidate(key)
+                self.misses += 1
+                return None
+            entry.checked = now
+
+        self.hits += 1
+        return entry
+
+    def load(self, key, filepath, content_type):
+        """
+        Reads a file and caches it under a request path.
+
+        :param key (str): request path.
+        :param filepath (str): path of the file on disk.
+        :param content_type (str): ``Content-Type`` of the file.
+
+        :rtype CacheEntry: the new entry.
+
+        :raises OSError: If the file cannot be read.
+        """
+        with open(filepath, 'rb') as file:
+            stat = os.fstat(file.fileno())
+            content = file.read() if stat.st_size <= self.max_entry_size else None
+        entry = CacheEntry(filepath, stat, content_type, content, self.max_age)
+
+        if entry.nbytes > self.max_bytes:
+            return entry
+
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old.nbytes
+            self._entries[key] = entry
+            self._bytes += entry.nbytes
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.nbytes
+        return entry
+
+    def invalidate(self, key=None):
+        """
+        Drops one entry, or every entry when ``key`` is ``None``.
+
+        :param key (str): request path.
+        """
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+                self._bytes = 0
+                return
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._bytes -= entry.nbytes
+
+    def stats(self):
+        """
+        Returns a snapshot of the cache state.
+
+        :rtype dict: entries, bytes, budget and hit/miss counters.
+        """
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
@@ -0,0 +1,165 @@
+#
+# Copyright (C) 2025 pdnguyen of HCMC University of Technology VNU-HCM.
+# All rights reserved.
+# This file is part of the CO3093/CO3094 course.
+#
+# WeApRous release
+#
+# The authors hereby grant to Licensee personal permission to use
+# and modify the Licensed Source Code for the sole purpose of studying
+# while attending the course
+#
+
+"""
+daemon.streaming
+~~~~~~~~~~~~~~~~~
+
+This module provides streamed route handler results. A handler may return an
+iterator or generator of ``bytes``/``str`` chunks, or a :class:`StreamingResponse`
+wrapping one, instead of a fully built body. The serving engines send chunks as
+they are produced, with ``Transfer-Encoding: chunked`` or, when the handler
+declares it, a known ``Content-Length``. Every engine waits for the socket to
+accept a chunk before pulling the next one, so memory stays bounded whatever
+the response size.
+
+Async generators are supported by the ``"asyncio"`` engine only.
+
+Usage Example:
+--------------
+>>> @app.route('/history', methods=['GET'])
+... def history(headers, body):
+...     for msg in messages:
+...         yield json.dumps(msg) + "\\n"
+
+"""
+
+import asyncio
+from collections.abc import AsyncIterator, Iterator
+
+from .log import get_logger
+
+log = get_logger(__name__)
+
+#: Terminating chunk of a chunked body.
+LAST_CHUNK = b"0\r\n\r\n"
+
+# Returned by next() in the executor once a sync iterator is exhausted.
+_END = object()
+
+
+class StreamAborted(ConnectionError):
+    """The handler's iterator raised; the connection must be dropped."""
+
+
+class StreamingResponse:
+    """
+    A streamed route handler result.
+
+    :param chunks (iterator): ``bytes``/``str`` chunks; an async iterator in
+        ``"asyncio"`` mode.
+    :param content_type (str): ``Content-Type`` of the body.
+    :param length (int): total body size when known; sent as ``Content-Length``
+        instead of chunked encoding.
+    :param status (str): status code and reason phrase.
+    """
+
+    __attrs__ = [
+        "chunks",
+        "content_type",
+        "length",
+        "status",
+    ]
+
+    def __init__(self, chunks, content_type="application/octet-stream", length=None, status="200 OK"):
+        self.chunks = chunks
+        self.content_type = content_type
+        self.length = length
+        self.status = status
+
+
+def is_stream(body):
+    """
+    Tells whether a handler result is a chunk iterator.
+
+    :rtype bool: ``True`` for iterators, generators and async iterators.
+    """
+    return isinstance(body, (Iterator, AsyncIterator))
+
+
+def close_stream(chunks):
+    """Closes a generator that will not be consumed (e.g. for ``HEAD``)."""
+    close = getattr(chunks, "close", None) or getattr(chunks, "aclose", None)
+    if close is not None:
+        result = close()
+        if hasattr(result, "close"):
+            # aclose() coroutine that will never be awaited
+            result.close()
+
+
+def _frame(chunk, chunked):
+    """Encodes one chunk for the wire; ``None`` for an empty chunk."""
+    data = chunk.encode("utf-8") if isinstance(chunk, str) else bytes(chunk)
+    if not data:
+        return None
+    if chunked:
+        return b"%x\r\n%b\r\n" % (len(data), data)
+    return data
+
+
+def iter_wire(chunks, chunked):
+    """
+    Yields the wire encoding of a synchronous chunk iterator.
+
+    :param chunks (iterator): ``bytes``/``str`` chunks.
+    :param chunked (bool): apply chunked transfer coding.
+
+    :raises StreamAborted: If the iterator raises.
+    """
+    if not isinstance(chunks, Iterator):
+        raise StreamAborted("async iterators are only streamed by the asyncio engine")
+    try:
+        for chunk in chunks:
+            data = _frame(chunk, chunked)
+            if data is not None:
+                yield data
+    except Exception as e:
+        log.exception("handler stream failed")
+        raise StreamAborted(str(e)) from e
+    if chunked:
+        yield LAST_CHUNK
+
+
+async def aiter_wire(chunks, chunked, executor=None):
+    """
+    Coroutine counterpart of :func:`iter_wire`, accepting async iterators too.
+
+    The chunks of a synchronous iterator are produced in ``executor``, so a
+    slow or blocking generator does not stall the event loop.
+
+    :param chunks (iterator | async iterator): ``bytes``/``str`` chunks.
+    :param chunked (bool): apply chunked transfer coding.
+    :param executor (Executor): executor running a synchronous iterator,
+        ``None`` for the loop's default executor.
+
+    :raises StreamAborted: If the iterator raises.
+    """
+    try:
+        if isinstance(chunks, AsyncIterator):
+            async for chunk in chunks:
+                data = _frame(chunk, chunked)
+                if data is not None:
+                    yield data
+        else:
+            loop = asyncio.get_running_loop()
+            while True:
+                chunk = await loop.run_in_executor(executor, next, chunks, _END)
+                if chunk is _END:
+                    break
+                data = _frame(chunk, chunked)
+                if data is not None:
+                    yield data
+    except Exception as e:
+        log.exception("handler stream failed")
+        raise StreamAborted(str(e)) from e
+    if chunked:
+        yield LAST_CHUNK
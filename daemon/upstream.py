@@ -0,0 +1,454 @@
+#
+# Copyright (C) 2025 pdnguyen of HCMC University of Technology VNU-HCM.
+# All rights reserved.
+# This file is part of the CO3093/CO3094 course.
+#
+# WeApRous release
+#
+# The authors hereby grant to Licensee personal permission to use
+# and modify the Licensed Source Code for the sole purpose of studying
+# while attending the course
+#
+
+"""
+daemon.upstream
+~~~~~~~~~~~~~~~~~
+
+This module provides the persistent connections of the proxy to its backends.
+An :class:`UpstreamPool` keeps up to ``max_idle`` idle keep-alive connections
+to one backend and caps the connections open to it at ``max_connections``;
+:class:`UpstreamPools` holds one pool per backend address.
+
+Responses are framed by ``Content-Length`` or chunked coding with a
+:class:`ResponseFramer <ResponseFramer>`, so a connection is reused as soon as
+its response is complete instead of being read until the backend closes it.
+An idle connection is checked before reuse: one closed by the backend, or with
+unexpected bytes pending, is discarded. A request that fails on a reused
+connection before any response byte arrived (the backend closed it in the
+meantime) is retried once on a new connection when its method is idempotent.
+
+:meth:`UpstreamPool.start_exchange` streams the request body from
+the client to the backend and returns once the response head is read, then
+:meth:`UpstreamConnection.relay_body` passes the response body on to the
+client as it arrives. Both directions go through one reusable receive buffer
+per connection, so the memory of a relay does not grow with the payload, and
+the client gets the first bytes as soon as the backend sends them.
+
+Usage Example:
+--------------
+>>> pools = UpstreamPools(max_idle=16, max_connections=128)
+>>> pool = pools.get(('127.0.0.1', 9000))
+>>> conn, head, length = pool.start_exchange(
+...     b"GET /peers HTTP/1.1\\r\\nHost: app1.local\\r\\n\\r\\n", method="GET")
+>>> conn.relay_body(length, client.sendall)
+>>> pool.release(conn, conn.reusable())
+
+"""
+
+import collections
+import select
+import socket
+import threading
+import time
+
+from .framing import ResponseFramer, BodyFramer, FramingError, RECV_SIZE, UNTIL_CLOSE
+from .log import get_logger
+
+log = get_logger(__name__)
+
+#: Idle connections kept per backend.
+MAX_IDLE = 32
+#: Connections open to a backend, idle or in use.
+MAX_CONNECTIONS = 256
+#: Seconds an idle connection is kept before it is closed.
+IDLE_TIMEOUT = 30.0
+#: Seconds allowed to connect to a backend.
+CONNECT_TIMEOUT = 5.0
+#: Seconds a backend may stay silent while a response is read.
+READ_TIMEOUT = 30.0
+#: Methods retried on a new connection when a reused one turns out closed.
+IDEMPOTENT_METHODS = frozenset(("GET", "HEAD", "OPTIONS", "PUT", "DELETE", "TRACE"))
+
+
+class UpstreamError(OSError):
+    """No connection to the backend could be obtained."""
+
+
+class DownstreamError(OSError):
+    """The client of a relayed exchange failed or left; the backend is not at fault."""
+
+
+def _deliver(send, data):
+    """Sends relayed bytes to the client, telling its failures apart."""
+    try:
+        send(data)
+    except OSError as e:
+        raise DownstreamError("client failed mid-response: {}".format(e)) from e
+
+
+class UpstreamConnection:
+    """
+    One keep-alive connection to a backend.
+
+    :param sock (socket.socket): the connected socket.
+
+    :attrs requests (int): requests completed on the connection.
+    :attrs received (int): bytes received for the current request.
+    :attrs idle_since (float): monotonic time the connection became idle.
+    :attrs interrupted (bool): the last request was not sent or its response
+        not read in full, so the connection cannot be reused.
+    """
+
+    __slots__ = ("sock", "framer", "requests", "received", "idle_since", "interrupted",
+                 "_chunk", "_view")
+
+    def __init__(self, sock):
+        self.sock = sock
+        self.framer = ResponseFramer()
+        self.requests = 0
+        self.received = 0
+        self.idle_since = None
+        self.interrupted = False
+        self._chunk = bytearray(RECV_SIZE)
+        self._view = memoryview(self._chunk)
+
+    def is_usable(self):
+        """
+        Checks an idle connection without blocking: the backend must not
+        have closed it nor sent anything since the last response.
+
+        :rtype bool: ``True`` if the connection can carry a request.
+        """
+        poller = select.poll()
+        poller.register(self.sock, select.POLLIN)
+        # Readable while idle: closed by the backend, or a stray response
+        return not poller.poll(0)
+
+    def relay_request(self, head, data=b"", body=None, recv_into=None):
+        """
+        Sends a request whose body is relayed from the client as it arrives.
+
+        The backend may answer before the whole body is sent, e.g. with
+        ``413``: the relay then stops and the connection is not reused.
+
+        :param head (bytes): request header block.
+        :param data (bytes): body bytes already received with the head.
+        :param body (BodyFramer): framing of the body, already fed with
+            ``data``; ``None`` when the request has no more body.
+        :param recv_into (callable): reads the next body bytes from the
+            client into a buffer, returns ``0`` when the client closed.
+
+        :raises OSError: If the backend connection fails.
+        :raises DownstreamError: If the client fails, closes mid-body or sends
+            a malformed body (the :class:`FramingError <FramingError>` is its
+            ``__cause__``).
+        """
+        self.received = 0
+        self.interrupted = True
+        self.sock.sendall(head + data if data else head)
+        if body is not None and not body.done:
+            chunk, view = self._chunk, self._view
+            poller = select.poll()
+            poller.register(self.sock, select.POLLIN)
+            while not body.done:
+                if poller.poll(0):
+                    # Early answer (or close) from the backend
+                    return
+                try:
+                    n = recv_into(chunk)
+                except OSError as e:
+                    raise DownstreamError("client failed mid-request: {}".format(e)) from e
+                if n == 0:
+                    raise DownstreamError("client closed mid-request")
+                try:
+                    take = body.feed(view[:n])
+                except FramingError as e:
+                    raise DownstreamError("invalid request body: {}".format(e)) from e
+                try:
+                    self.sock.sendall(view[:take])
+                except OSError:
+                    # The backend stopped reading, e.g. answered and closed:
+                    # read_head() gets the answer or reports the failure
+                    return
+        self.interrupted = False
+
+    def read_head(self, method):
+        """
+        Reads the head of the response to the request just sent, skipping
+        interim ``1xx`` responses.
+
+        :param method (str): request method, ``HEAD`` responses have no body.
+
+        :rtype tuple: ``(head, length)``, ``length`` as for
+            :class:`BodyFramer <BodyFramer>`; the body is read with
+            :meth:`relay_body`.
+
+        :raises OSError: If the connection fails or times out.
+        :raises FramingError: If the response is malformed or the backend
+            closed the connection before it.
+        """
+        framer = self.framer
+        framer.method = method
+        while True:
+            message = framer.next_head()
+            if message is not None:
+                return message
+            n = self.sock.recv_into(self._chunk)
+            if n == 0:
+                raise FramingError("connection closed before the response")
+            self.received += n
+            framer.feed(self._view[:n])
+
+    def relay_body(self, length, send):
+        """
+        Passes the response body on as it arrives, unchanged.
+
+        :param length (int): body length from :meth:`read_head`.
+        :param send (callable): writes bytes to the client.
+
+        :rtype int: body bytes relayed.
+
+        :raises OSError: If the backend connection fails or times out.
+        :raises FramingError: If the backend closed the connection mid-body.
+        :raises DownstreamError: If ``send`` fails.
+        """
+        body = BodyFramer(length)
+        buffered = self.framer.buffer
+        chunk, view = self._chunk, self._view
+        if buffered and not body.done:
+            # Body bytes received along with the head
+            n = body.feed(buffered)
+            _deliver(send, buffered[:n])
+            del buffered[:n]
+        while not body.done:
+            n = self.sock.recv_into(chunk)
+            if n == 0:
+                if length != UNTIL_CLOSE:
+                    raise FramingError("connection closed mid-response")
+                break
+            self.received += n
+            take = body.feed(view[:n])
+            _deliver(send, view[:take])
+            if take < n:
+                # Bytes after the response: the connection is not reused
+                buffered += view[take:n]
+        self.requests += 1
+        return body.received
+
+    def reusable(self):
+        """
+        :rtype bool: ``True`` if the last response left the connection open
+            with nothing else buffered.
+        """
+        return (not self.interrupted and self.framer.keep_alive
+                and not self.framer.in_progress())
+
+    def close(self):
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+
+
+class UpstreamPool:
+    """
+    The connections of the proxy to one backend.
+
+    :param address (tuple): backend ``(host, port)``.
+    :param max_idle (int): idle connections kept for reuse.
+    :param max_connections (int): connections open at once, idle or in use;
+        further requests wait for one to be released.
+    :param idle_timeout (float): seconds an idle connection is kept.
+    :param connect_timeout (float): seconds allowed to connect.
+    :param timeout (float): seconds the backend may stay silent mid-response.
+    """
+
+    __attrs__ = [
+        "address",
+        "max_idle",
+        "max_connections",
+        "idle_timeout",
+        "connect_timeout",
+        "timeout",
+        "created",
+        "reused",
+    ]
+
+    def __init__(self, address, max_idle=MAX_IDLE, max_connections=MAX_CONNECTIONS,
+                 idle_timeout=IDLE_TIMEOUT, connect_timeout=CONNECT_TIMEOUT,
+                 timeout=READ_TIMEOUT):
+        self.address = address
+        self.max_idle = max_idle
+        self.max_connections = max_connections
+        self.idle_timeout = idle_timeout
+        self.connect_timeout = connect_timeout
+        self.timeout = timeout
+        #: Connections opened so far.
+        self.created = 0
+        #: Requests sent on an already used connection.
+        self.reused = 0
+        # Idle connections, the most recently released last
+        self._idle = collections.deque()
+        self._open = 0
+        self._cond = threading.Condition()
+
+    def acquire(self, fresh=False):
+        """
+        Takes an idle connection that passes :meth:`UpstreamConnection.is_usable`,
+        or opens a new one.
+
+        :param fresh (bool): always open a new connection.
+
+        :rtype UpstreamConnection: a connection for one request.
+
+        :raises UpstreamError: If ``max_connections`` are busy for ``timeout``
+            seconds.
+        :raises OSError: If the backend cannot be reached.
+        """
+        with self._cond:
+            deadline = None
+            while True:
+                while self._idle and not fresh:
+                    conn = self._idle.pop()
+                    if (time.monotonic() - conn.idle_since < self.idle_timeout
+                            and conn.is_usable()):
+                        self.reused += 1
+                        return conn
+                    self._discard(conn)
+                if self._open < self.max_connections:
+                    self._open += 1
+                    self.created += 1
+                    break
+                if deadline is None:
+                    deadline = time.monotonic() + self.timeout
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self._cond.wait(remaining):
+                    raise UpstreamError("all {} connections to {}:{} are busy".format(
+                        self.max_connections, *self.address))
+
+        try:
+            sock = socket.create_connection(self.address, self.connect_timeout)
+            sock.settimeout(self.timeout)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        except OSError:
+            with self._cond:
+                self._open -= 1
+                self._cond.notify()
+            raise
+        return UpstreamConnection(sock)
+
+    def release(self, conn, reusable):
+        """
+        Returns a connection after its request.
+
+        :param conn (UpstreamConnection): connection from :meth:`acquire`.
+        :param reusable (bool): ``False`` closes it, e.g. after an error.
+        """
+        now = time.monotonic()
+        with self._cond:
+            if reusable and len(self._idle) < self.max_idle:
+                conn.idle_since = now
+                self._idle.append(conn)
+            else:
+                self._discard(conn)
+            # Close connections idle for too long, the oldest first
+            while self._idle and now - self._idle[0].idle_since >= self.idle_timeout:
+                self._discard(self._idle.popleft())
+            self._cond.notify()
+
+    def _discard(self, conn):
+        """Closes a connection taken out of the pool; called with the lock held."""
+        conn.close()
+        self._open -= 1
+
+    def start_exchange(self, head, data=b"", body=None, recv_into=None, method="GET"):
+        """
+        Sends a request on a pooled connection, relaying its body from the
+        client, and reads the response head. The caller relays the body with
+        :meth:`UpstreamConnection.relay_body` and gives the connection back
+        with :meth:`release`.
+
+        A reused connection found closed by the backend is replaced once for
+        idempotent methods, as long as no body byte had to be read from the
+        client yet.
+
+        :param head (bytes): request header block, asking for keep-alive.
+        :param data (bytes): body bytes received with the head.
+        :param body (BodyFramer): framing of the rest of the body, or ``None``.
+        :param recv_into (callable): reads more body bytes from the client.
+        :param method (str): request method.
+
+        :rtype tuple: ``(conn, head, length)``: the connection, the response
+            head and its body length.
+
+        :raises OSError: If the backend cannot be reached or fails.
+        :raises FramingError: If the response head is malformed.
+        :raises DownstreamError: If the client fails mid-body.
+        """
+        replayable = body is None or body.done
+        fresh = False
+        while True:
+            conn = self.acquire(fresh)
+            try:
+                conn.relay_request(head, data, body, recv_into)
+                response_head, length = conn.read_head(method)
+            except DownstreamError:
+                self.release(conn, False)
+                raise
+            except (OSError, FramingError):
+                self.release(conn, False)
+                if (replayable and not fresh and conn.requests and not conn.received
+                        and method in IDEMPOTENT_METHODS):
+                    log.debug("retry on new connection", backend="{}:{}".format(*self.address))
+                    fresh = True
+                    continue
+                raise
+            return conn, response_head, length
+
+    def close(self):
+        """Closes the idle connections."""
+        with self._cond:
+            while self._idle:
+                self._discard(self._idle.pop())
+
+    def __len__(self):
+        return len(self._idle)
+
+
+class UpstreamPools:
+    """
+    One :class:`UpstreamPool` per backend address, created on first use.
+
+    :param options: :class:`UpstreamPool` settings shared by every pool,
+        e.g. ``max_idle`` or ``max_connections``.
+    """
+
+    __attrs__ = [
+        "options",
+    ]
+
+    def __init__(self, **options):
+        self.options = options
+        self._pools = {}
+        self._lock = threading.Lock()
+
+    def get(self, address):
+        """
+        :param address (tuple): backend ``(host, port)``.
+
+        :rtype UpstreamPool: the pool of the backend.
+        """
+        pool = self._pools.get(address)
+        if pool is None:
+            with self._lock:
+                pool = self._pools.get(address)
+                if pool is None:
+                    pool = self._pools[address] = UpstreamPool(address, **self.options)
+        return pool
+
+    def close(self):
+        """Closes the idle connections of every pool."""
+        with self._lock:
+            pools = list(self._pools.values())
+        for pool in pools:
+            pool.close()
@@ -18,6 +18,14 @@ This module provides a WeApRous object to deploy RESTful url web app with routin
 """
 
 from .backend import create_backend
+from .metrics import MetricsMiddleware, metrics_handler
+from .log import AccessLogMiddleware, get_logger
+from .router import Router
+
+#: Path of the built-in Prometheus metrics endpoint.
+METRICS_PATH = '/metrics'
+
+log = get_logger(__name__)
 
 class WeApRous:
     """The fully mutable :class:`WeApRous <WeApRous>` object, which is a lightweight,
@@ -40,20 +48,46 @@ class WeApRous:
       >>> def hello(headers, body):
       >>>     return {'message': 'Hello, world!'}
 
-      >>> app.run()
+      >>> @app.route('/fanout', methods=['POST'])
+      >>> async def fanout(headers, body):
+      >>>     await asyncio.gather(*(notify(peer) for peer in peers))
+      >>>     return {'message': 'sent'}
+
+      >>> app.run(mode='asyncio')
+
+    Every app serves its request, latency and connection metrics in the
+    Prometheus text format at ``GET /metrics``; registering another handler
+    for that path replaces it.
     """
 
     def __init__(self):
         """
         Initialize a new WeApRous instance.
 
-        Sets up an empty route registry and prepares placeholders for IP and port.
+        Sets up a route registry holding the built-in ``/metrics`` route and
+        the :class:`MetricsMiddleware <MetricsMiddleware>`, and prepares
+        placeholders for IP and port.
         """
-        self.routes = {}
+        self.routes = Router()
+        self.route(METRICS_PATH, methods=['GET'])(metrics_handler)
+        self.routes.middleware.append(MetricsMiddleware())
+        self.routes.middleware.append(AccessLogMiddleware())
         self.ip = None
         self.port = None
         return
 
+    def use(self, middleware):
+        """
+        Registers a :class:`Middleware <Middleware>` run around every request.
+
+        :param middleware (Middleware): object with ``process_request`` and
+            ``process_response`` hooks.
+
+        :rtype Middleware: the registered middleware.
+        """
+        self.routes.middleware.append(middleware)
+        return middleware
+
     def prepare_address(self, ip, port):
         """
         Configure the IP address and port for the backend server.
@@ -64,12 +98,31 @@ class WeApRous:
         self.ip = ip
         self.port = port
 
-    def route(self, path, methods=['GET']):
+    def route(self, path, methods=['GET'], with_request=False):
         """
         Decorator to register a route handler for a specific path and HTTP methods.
 
+        Handlers may be plain functions or ``async def`` coroutine functions.
+        Coroutine handlers are awaited by the ``"asyncio"`` engine and run to
+        completion on the serving thread by the other engines.
+
+        Paths may contain typed parameters such as ``/channels/<name>`` or
+        ``/peers/<int:id>``; captured values are passed to the handler as
+        keyword arguments next to ``headers`` and ``body``.
+
+        With ``with_request=True`` the handler is called as
+        ``handler(request, **path_params)`` and reads what it needs from the
+        lazily parsed :class:`Request <Request>` (``request.json``,
+        ``request.query``, ``request.form``, ``request.cookies``). Such
+        handlers can also read the body as a stream (``request.stream``) or
+        take ``multipart/form-data`` uploads (``request.files``) without
+        loading them into memory; large bodies are spooled to a temporary
+        file while they are received.
+
         :param path (str): The URL path to route.
         :param methods (list): A list of HTTP methods (e.g., ['GET', 'POST']) to bind.
+        :param with_request (bool): Pass the request object instead of
+            ``headers`` and ``body``.
 
         :rtype: function - A decorator that registers the handler function.
         """
@@ -80,22 +133,32 @@ class WeApRous:
             # Optional attach route metadata to the function
             func._route_path = path
             func._route_methods = methods
+            func._route_with_request = with_request
 
             return func
         return decorator
 
-    def run(self):
+    def run(self, mode="thread", workers=1, **options):
         """
         Start the backend server and begin handling requests.
 
         This method launches the TCP server using the configured IP and port,
         and dispatches incoming requests to the registered route handlers.
 
+        :param mode (str): Serving engine passed to :func:`create_backend`,
+            ``"thread"``, ``"eventloop"`` or ``"asyncio"``.
+        :param workers (int): Number of pre-forked worker processes sharing the
+            port. Route handlers then run in separate processes and do not
+            share module state.
+        :param options: Engine options forwarded to :func:`create_backend`,
+            e.g. ``max_workers``, ``queue_size``, ``queue_timeout``,
+            ``log_level`` or ``access_sample`` (the access log is off unless
+            it is set).
+
         :raise: Error if IP or port has not been configured.
         """
         if not self.ip or not self.port:
-            print("Rous app need to preapre address"
-                  "by calling app.prepare_address(ip,port)")
+            log.error("address not prepared, call app.prepare_address(ip, port)")
 
-        create_backend(self.ip, self.port, self.routes)
+        create_backend(self.ip, self.port, self.routes, mode=mode, workers=workers, **options)
         
@@ -0,0 +1,315 @@
+#
+# Copyright (C) 2025 pdnguyen of HCMC University of Technology VNU-HCM.
+# All rights reserved.
+# This file is part of the CO3093/CO3094 course.
+#
+# WeApRous release
+#
+# The authors hereby grant to Licensee personal permission to use
+# and modify the Licensed Source Code for the sole purpose of studying
+# while attending the course
+#
+
+"""
+daemon.workerpool
+~~~~~~~~~~~~~~~~~
+
+This module provides a bounded worker pool with admission control used by the
+accept loops of the backend and the proxy. Accepted connections are queued to
+a fixed number of worker threads; when the queue is full, or a connection has
+waited longer than the queue timeout, the client is answered with a
+precomputed ``503 Service Unavailable`` instead of piling up more work.
+
+The queue timeout is enforced from the accept side: every :meth:`submit` and
+a watcher thread shed the connections queued for too long, so clients get their
+503 even while every worker is stuck. Idle persistent connections wait on the
+watcher thread, not on a worker. The busy workers, the queue depth, the idle
+connections and the shed connections are exported by :mod:`daemon.metrics`
+per pool name.
+
+Usage Example:
+--------------
+>>> pool = WorkerPool(handler, max_workers=64, queue_size=256)
+>>> pool.submit(conn, addr)
+>>> pool.stats()
+{'workers': 64, 'active': 0, 'queued': 0, ...}
+
+"""
+
+import collections
+import selectors
+import socket
+import threading
+import time
+
+from . import metrics
+from .log import get_logger
+
+log = get_logger(__name__)
+
+#: Default number of worker threads.
+MAX_WORKERS = 64
+#: Default number of accepted connections waiting for a worker.
+QUEUE_SIZE = 256
+#: Default seconds a connection may wait in the queue before being shed.
+QUEUE_TIMEOUT = 10.0
+#: Default ``Retry-After`` value (seconds) sent with shed connections.
+RETRY_AFTER = 1
+#: Default seconds an idle persistent connection is kept.
+IDLE_TIMEOUT = 5.0
+#: Seconds between two sweeps for expired queued and idle connections.
+REAP_INTERVAL = 0.5
+
+
+def build_unavailable(retry_after=RETRY_AFTER):
+    """
+    Constructs the ``503 Service Unavailable`` response sent to shed clients.
+
+    :param retry_after (int): seconds the client should wait before retrying.
+
+    :rtype bytes: Encoded 503 response.
+    """
+    return (
+            "HTTP/1.1 503 Service Unavailable\r\n"
+            "Content-Type: text/plain\r\n"
+            "Content-Length: 23\r\n"
+            "Retry-After: {}\r\n"
+            "Connection: close\r\n"
+            "\r\n"
+            "503 Service Unavailable"
+        ).format(retry_after).encode('utf-8')
+
+
+class WorkerPool:
+    """
+    A fixed-size pool of worker threads fed by a bounded connection queue.
+
+    A persistent connection does not hold a worker while it waits for its
+    next request: the handler gives it back to the pool, a watcher thread
+    polls it with the other idle connections and queues it again once the
+    client sends something.
+
+    :param handler (callable): called as ``handler(conn, addr)`` by a worker.
+        Returns ``None`` once done with the connection, or a
+        ``(resume, close)`` pair to hand an idle persistent connection back:
+        ``resume(conn, addr)`` is queued like a new connection (and follows
+        the same protocol) when the connection becomes readable, ``close()``
+        is called instead if it stays idle for ``idle_timeout`` seconds or
+        is shed.
+    :param max_workers (int): number of worker threads.
+    :param queue_size (int): maximum number of queued connections.
+    :param queue_timeout (float): maximum seconds a connection may wait
+        before it is shed; ``None`` waits forever.
+    :param retry_after (int): ``Retry-After`` value of the 503 response.
+    :param idle_timeout (float): seconds an idle persistent connection is kept.
+    :param name (str): label used in thread names and :meth:`stats`.
+    """
+
+    __attrs__ = [
+        "handler",
+        "max_workers",
+        "queue_size",
+        "queue_timeout",
+        "idle_timeout",
+        "name",
+        "rejected",
+        "expired",
+        "completed",
+    ]
+
+    def __init__(self, handler, max_workers=MAX_WORKERS, queue_size=QUEUE_SIZE,
+                 queue_timeout=QUEUE_TIMEOUT, retry_after=RETRY_AFTER,
+                 idle_timeout=IDLE_TIMEOUT, name="pool"):
+        self.handler = handler
+        self.max_workers = max_workers
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.idle_timeout = idle_timeout
+        self.name = name
+
+        #: Connections refused because the queue was full.
+        self.rejected = 0
+        #: Connections shed after waiting longer than ``queue_timeout``.
+        self.expired = 0
+        #: Handler calls completed by a worker.
+        self.completed = 0
+
+        self._active = 0
+        self._lock = threading.Lock()
+        self._ready = threading.Condition(self._lock)
+        #: ``(conn, addr, queued_at, handler, close)`` waiting for a worker, oldest first.
+        self._queue = collections.deque()
+        #: ``(conn, addr, resume, close)`` handed back, not yet watched.
+        self._parking = []
+        self._idle = 0
+        self._wakeup, self._wakeup_send = socket.socketpair()
+        self._wakeup_send.setblocking(False)
+        self._unavailable = build_unavailable(retry_after)
+        self._labels = (name,)
+
+        for i in range(max_workers):
+            t = threading.Thread(target=self._work, name="{}-worker-{}".format(name, i),
+                                 daemon=True)
+            t.start()
+
+        threading.Thread(target=self._watch, name="{}-watcher".format(name),
+                         daemon=True).start()
+
+    def submit(self, conn, addr):
+        """
+        Queues an accepted connection, or sheds it if the queue is full.
+
+        :param conn (socket.socket): client connection socket.
+        :param addr (tuple): client address (IP, port).
+
+        :rtype bool: ``True`` if queued, ``False`` if answered with 503.
+        """
+        return self._enqueue((conn, addr, time.monotonic(), self.handler, conn.close))
+
+    def stats(self):
+        """
+        Returns a snapshot of the pool state.
+
+        :rtype dict: workers, active, queued, idle, capacity and shedding counters.
+        """
+        return {
+            "name": self.name,
+            "workers": self.max_workers,
+            "active": self._active,
+            "queued": len(self._queue),
+            "idle": self._idle,
+            "capacity": self.queue_size,
+            "rejected": self.rejected,
+            "expired": self.expired,
+            "completed": self.completed,
+        }
+
+    def _enqueue(self, item):
+        """Queues ``(conn, addr, queued_at, handler, close)``, or sheds it if the queue is full."""
+        with self._lock:
+            expired = self._expire(item[2])
+            queued = len(self._queue) < self.queue_size
+            if queued:
+                self._queue.append(item)
+                metrics.POOL_QUEUED.inc(1, self._labels)
+                self._ready.notify()
+            else:
+                self.rejected += 1
+        for stale in expired:
+            self._shed(stale)
+        if not queued:
+            metrics.POOL_REJECTED.inc(1, self._labels)
+            self._shed(item)
+        return queued
+
+    def _expire(self, now):
+        """
+        Removes the connections queued for longer than ``queue_timeout``.
+        Must be called with the pool lock held.
+
+        :rtype list: the expired queue items, to be shed without the lock.
+        """
+        expired = []
+        if self.queue_timeout is None:
+            return expired
+        deadline = now - self.queue_timeout
+        while self._queue and self._queue[0][2] < deadline:
+            expired.append(self._queue.popleft())
+        if expired:
+            self.expired += len(expired)
+            metrics.POOL_QUEUED.dec(len(expired), self._labels)
+            metrics.POOL_EXPIRED.inc(len(expired), self._labels)
+        return expired
+
+    def _park(self, conn, addr, resume, close):
+        """Hands an idle persistent connection to the watcher thread."""
+        with self._lock:
+            self._parking.append((conn, addr, resume, close))
+        try:
+            self._wakeup_send.send(b"\0")
+        except BlockingIOError:
+            # The watcher has wake-ups pending already
+            pass
+
+    def _watch(self):
+        """
+        Watcher thread body: polls the idle connections, queues those that
+        become readable and closes those idle for too long. It also sheds
+        the expired queued connections while no client arrives.
+        """
+        selector = selectors.DefaultSelector()
+        selector.register(self._wakeup, selectors.EVENT_READ, None)
+        while True:
+            for key, _ in selector.select(REAP_INTERVAL):
+                if key.data is None:
+                    self._wakeup.recv(4096)
+                    with self._lock:
+                        parking, self._parking = self._parking, []
+                    now = time.monotonic()
+                    for conn, addr, resume, close in parking:
+                        selector.register(conn, selectors.EVENT_READ,
+                                          (conn, addr, resume, close, now))
+                    self._set_idle(len(parking))
+                    continue
+                conn, addr, resume, close, _ = key.data
+                selector.unregister(conn)
+                self._set_idle(-1)
+                self._enqueue((conn, addr, time.monotonic(), resume, close))
+
+            now = time.monotonic()
+            deadline = now - self.idle_timeout
+            idle = [key.data for key in selector.get_map().values()
+                    if key.data is not None and key.data[4] < deadline]
+            for conn, _, _, close, _ in idle:
+                selector.unregister(conn)
+                close()
+            self._set_idle(-len(idle))
+
+            with self._lock:
+                expired = self._expire(now)
+            for item in expired:
+                self._shed(item)
+
+    def _set_idle(self, delta):
+        """Updates the count of idle connections watched."""
+        if delta:
+            self._idle += delta
+            metrics.POOL_IDLE.inc(delta, self._labels)
+
+    def _shed(self, item):
+        """Answers a queue item with the precomputed 503 without blocking the caller."""
+        conn, close = item[0], item[4]
+        try:
+            conn.setblocking(False)
+            conn.send(self._unavailable)
+            # Drain what the client already sent so close() does not reset
+            # the connection before the 503 is read.
+            conn.shutdown(socket.SHUT_WR)
+            conn.recv(65536)
+        except OSError:
+            pass
+        finally:
+            close()
+
+    def _work(self):
+        """Worker thread body: take a queued connection and handle it."""
+        while True:
+            with self._lock:
+                while not self._queue:
+                    self._ready.wait()
+                conn, addr, _, handler, close = self._queue.popleft()
+                self._active += 1
+            metrics.POOL_QUEUED.dec(1, self._labels)
+            metrics.POOL_ACTIVE.inc(1, self._labels)
+            try:
+                parked = handler(conn, addr)
+                if parked is not None:
+                    self._park(conn, addr, *parked)
+            except Exception:
+                log.exception("worker error", pool=self.name)
+                close()
+            finally:
+                metrics.POOL_ACTIVE.dec(1, self._labels)
+                with self._lock:
+                    self._active -= 1
+                    self.completed += 1
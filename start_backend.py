@@ -40,6 +40,8 @@ if __name__ == "__main__":
 
     :arg --server-ip (str): IP address to bind the server (default: 127.0.0.1).
     :arg --server-port (int): Port number to bind the server (default: 9000).
+    :arg --mode (str): Serving engine, thread, eventloop or asyncio (default: thread).
+    :arg --workers (int): Number of pre-forked worker processes (default: 1).
     """
 
     parser = argparse.ArgumentParser(
@@ -58,9 +60,21 @@ if __name__ == "__main__":
         default=PORT,
         help='Port number to bind the server. Default is {}.'.format(PORT)
     )
+    parser.add_argument(
+        '--mode',
+        choices=['thread', 'eventloop', 'asyncio'],
+        default='thread',
+        help='Serving engine. Default is thread.'
+    )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=1,
+        help='Number of pre-forked worker processes sharing the port. Default is 1.'
+    )
  
     args = parser.parse_args()
     ip = args.server_ip
     port = args.server_port
 
-    create_backend(ip, port)
+    create_backend(ip, port, mode=args.mode, workers=args.workers)
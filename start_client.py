@@ -25,14 +25,24 @@ and can be configured via command-line arguments.
 """
 
 import argparse
+import asyncio
 import json
 import socket
 from datetime import datetime
 from typing import Any, Dict, List, Optional, Tuple
 
-from common import Address, parse_address, send_http_request, stringify_address
+from common import (
+    Address,
+    async_send_http_request,
+    parse_address,
+    send_http_request,
+    stringify_address,
+)
+from daemon.log import get_logger
 from daemon.weaprous import WeApRous
 
+log = get_logger("client")
+
 PORT = 8000  # Default port
 app: WeApRous = WeApRous()
 ip = "0.0.0.0"
@@ -105,10 +115,10 @@ def listpeers(headers, body):
     return res
 
 
-@app.route("/inbox", methods=["POST"])
-def peerinbox(headers, body):
+@app.route("/inbox", methods=["POST"], with_request=True)
+def peerinbox(request):
     try:
-        data = json.loads(body)
+        data = request.json
         sender = data["sender"]
         message = data["message"]
         channel = data.get("channel", "")
@@ -228,21 +238,36 @@ def get(headers, body):
 
 
 @app.route("/broadcast", methods=["POST"])
-def broadcast(headers, body):
+async def broadcast(headers, body):
     try:
         message = body
         sender = stringify_address((ip, port))
 
-        for recvaddr in PEERS_CONNECTED:
-            send_http_request(
-                recvaddr,
-                "POST",
-                "/inbox",
-                {
-                    "sender": sender,
-                    "message": message,
-                },
-            )
+        peers = list(PEERS_CONNECTED)
+        results = await asyncio.gather(
+            *(
+                async_send_http_request(
+                    recvaddr,
+                    "POST",
+                    "/inbox",
+                    {
+                        "sender": sender,
+                        "message": message,
+                    },
+                )
+                for recvaddr in peers
+            ),
+            return_exceptions=True,
+        )
+
+        # One unreachable peer must not fail the delivery to the others
+        for recvaddr, result in zip(peers, results):
+            if isinstance(result, Exception):
+                log.warning(
+                    "broadcast failed",
+                    peer=stringify_address(recvaddr),
+                    error=str(result),
+                )
 
         return (
             {"status": "success", "message": f"Message send successfully"},
@@ -290,7 +315,7 @@ def joinchannel(headers, body):
 
 
 @app.route("/sendchannel", methods=["POST"])
-def send_channel(headers, body):
+async def send_channel(headers, body):
     try:
         data = json.loads(body or "{}")
         channel_name = data.get("channel")
@@ -303,7 +328,9 @@ def send_channel(headers, body):
             )
 
         # 1. (Client) Hỏi Tracker để lấy danh sách TẤT CẢ các kênh và thành viên
-        all_channels_info = send_http_request(tracker, "GET", "/listchannels", {})
+        all_channels_info = await async_send_http_request(
+            tracker, "GET", "/listchannels", {}
+        )
 
         target_peers = []
 
@@ -329,10 +356,10 @@ def send_channel(headers, body):
         # 3. (P2P) Gửi tin nhắn P2P trực tiếp đến tất cả peer trong kênh
         sender_id = stringify_address((ip, port))
 
-        for recv_addr in target_peers:
+        async def deliver(recv_addr):
             try:
                 # Gửi thẳng đến API /inbox của peer đó
-                send_http_request(
+                await async_send_http_request(
                     recv_addr,
                     "POST",
                     "/inbox",
@@ -341,6 +368,8 @@ def send_channel(headers, body):
             except Exception as e:
                 print(f"Gửi tin nhắn P2P đến {recv_addr} thất bại: {e}")
 
+        await asyncio.gather(*(deliver(recv_addr) for recv_addr in target_peers))
+
         return ({"status": "success", "message": "Message sent to channel"}, "200 OK")
 
     except json.JSONDecodeError as e:
@@ -358,6 +387,9 @@ if __name__ == "__main__":
     parser.add_argument("--username", default="guest")
     parser.add_argument("--addr", default="localhost:8000")
     parser.add_argument("--tracker", default="localhost:9998")
+    parser.add_argument(
+        "--mode", choices=["thread", "eventloop", "asyncio"], default="thread"
+    )
 
     args = parser.parse_args()
     addr = args.addr
@@ -383,4 +415,4 @@ if __name__ == "__main__":
 
     # Prepare and launch the RESTful application
     app.prepare_address(ip, port)
-    app.run()
+    app.run(mode=args.mode)
@@ -68,18 +68,26 @@ def parse_virtual_hosts(config_file):
         proxy_map = {}
 
         # Find all proxy_pass entries
-        proxy_passes = re.findall(r'proxy_pass\s+http://([^\s;]+);', block)
+        # e.g. ``proxy_pass http://192.168.1.7:9002 weight=2 max_fails=3 fail_timeout=10s;``
+        proxy_passes = [spec.strip() for spec in
+                        re.findall(r'proxy_pass\s+http://([^;\n]+);', block)]
         map = proxy_map.get(host,[])
         map = map + proxy_passes
         proxy_map[host] = map
 
         # Find dist_policy if present
-        policy_match = re.search(r'dist_policy\s+(\w+)', block)
+        # e.g. ``dist_policy least-connections`` or ``dist_policy hash X-User-Id``
+        policy_match = re.search(r'dist_policy[ \t]+([\w-]+(?:[ \t]+[\w$-]+)?)', block)
         if policy_match:
             dist_policy_map = policy_match.group(1)
         else: #default policy is round_robin
             dist_policy_map = 'round-robin'
 
+        # Find health_check if present
+        # e.g. ``health_check uri=/health interval=5 fails=3 passes=2;``
+        health_match = re.search(r'health_check\b[ \t]*([^;\n]*)', block)
+        health_check = health_match.group(1).strip() if health_match else None
+
         # @bksysnet: Build the mapping and policy
         # TODO: this policy varies among scenarios 
         #       the default policy is provided with one proxy_pass
@@ -94,6 +102,8 @@ def parse_virtual_hosts(config_file):
         #
         else:
             routes[host] = (proxy_map.get(host,[]), dist_policy_map) #gets all the routes
+        if health_check is not None:
+            routes[host] += (health_check,)
 
     for key, value in routes.items():
         print(key, value)
@@ -115,6 +125,10 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(prog='Proxy', description='', epilog='Proxy daemon')
     parser.add_argument('--server-ip', default='0.0.0.0')
     parser.add_argument('--server-port', type=int, default=PROXY_PORT)
+    parser.add_argument('--mode', choices=['thread', 'asyncio'], default='thread',
+                        help='Proxy engine. Default is thread.')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Number of pre-forked worker processes sharing the port. Default is 1.')
  
     args = parser.parse_args()
     ip = args.server_ip
@@ -122,4 +136,4 @@ if __name__ == "__main__":
 
     routes = parse_virtual_hosts("config/proxy.conf")
 
-    create_proxy(ip, port, routes)
+    create_proxy(ip, port, routes, mode=args.mode, workers=args.workers)
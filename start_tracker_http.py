@@ -16,8 +16,11 @@ from typing import Any, Dict, List, Tuple
 
 from common import Address, parse_address, send_http_request, stringify_address
 from daemon.weaprous import WeApRous
+from daemon.serializer import JSONResponse
+from daemon.log import get_logger
 
 app = WeApRous()
+log = get_logger("tracker")
 
 # Keep peers in a dict to avoid duplicates. Key = ip:port
 active_peers = {}
@@ -40,14 +43,15 @@ class Channel:
 
     def accept_peer(self, addr: Address):
         if addr in self.connected_peers:
-            print("Peer already in channel")
+            log.debug("peer already in channel", channel=self.name, peer=addr)
             return
 
         self.connected_peers.append(addr)
+        channels_json.invalidate()
 
     def accept_message(self, sender: Address, message: str):
         if sender not in self.connected_peers:
-            print("Peer not in channel")
+            log.debug("peer not in channel", channel=self.name, peer=sender)
             return
 
     def __broadcast(self, msg: Message):
@@ -74,11 +78,15 @@ class Channel:
 
 channels = [Channel("general"), Channel("IT"), Channel("Music")]
 
+# Polled by every client: encoded once per change, not per request
+peers_json = JSONResponse(lambda: list(active_peers.values()))
+channels_json = JSONResponse(lambda: [c.dump() for c in channels])
 
-@app.route("/register", methods=["POST"])
-def register_peer(headers, body):
+
+@app.route("/register", methods=["POST"], with_request=True)
+def register_peer(request):
     try:
-        peer_info = json.loads(body or "{}")
+        peer_info = request.json or {}
         ip = peer_info.get("ip")
         port = peer_info.get("port")
         username = peer_info.get("username", "unknown")
@@ -97,7 +105,8 @@ def register_peer(headers, body):
                 "port": port,
                 "username": username,
             }
-            print(f"Peer mới đăng ký: {peer_id}")
+            peers_json.invalidate()
+            log.info("peer registered", peer=peer_id, username=username)
 
         return (
             {"status": "success", "message": f"Peer {peer_id} registered"},
@@ -112,8 +121,7 @@ def register_peer(headers, body):
 @app.route("/peers", methods=["GET"])
 def get_peers(headers, body):
     try:
-        peers = list(active_peers.values())
-        return (peers, "200 OK")
+        return peers_json
     except Exception as e:
         return ({"status": "error", "message": str(e)}, "500 Internal Server Error")
 
@@ -128,14 +136,13 @@ def get_channels(headers, body):
         return ({"status": "error", "message": str(e)}, "500 Internal Server Error")
 
 
-@app.route("/joinchannel", methods=["POST"])
-def join_channels(headers, body):
+@app.route("/joinchannel", methods=["POST"], with_request=True)
+def join_channels(request):
     try:
         global channels
 
-        print(body)
-
-        data = json.loads(body)
+        data = request.json
+        log.debug("join channel", request=data)
         peeraddr = parse_address(data["addr"])
         channelname = data["channel"]
 
@@ -159,8 +166,7 @@ def join_channels(headers, body):
 @app.route("/listchannels", methods=["GET"])
 def poll_channel(headers, body):
     try:
-        global channels
-        return ([c.dump() for c in channels], "200 OK")
+        return channels_json
 
     except json.JSONDecodeError as e:
         return ({"status": "error", "message": str(e)}, "400 Bad Request")